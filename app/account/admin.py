@@ -3,7 +3,9 @@ from django.contrib.auth.admin import UserAdmin
 
 from django.utils.translation import gettext_lazy as _
 
+from account.exports import export_users_data
 from account.models import CustomUser
+from core.exports import export_response
 
 
 class CustomUserAdmin(UserAdmin):
@@ -29,6 +31,7 @@ class CustomUserAdmin(UserAdmin):
         (_('Important dates'), {'fields': ('date_joined', 'last_login',)}),
     )
     readonly_fields = ['date_joined', 'last_login']
+    actions = ['export_personal_data']
     add_fieldsets = (
         (None, {
             'classes': ('wide',),
@@ -45,5 +48,10 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
 
+    @admin.action(description='Download personal data of selected users')
+    def export_personal_data(self, request, queryset):
+        return export_response(export_users_data(queryset),
+                               'personal-data.zip', 'zip')
+
 
 admin.site.register(CustomUser, CustomUserAdmin)
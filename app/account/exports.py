@@ -0,0 +1,50 @@
+"""
+Personal data archive: a ZIP of what is stored about a user, their
+profile, subscription and, for writers, articles. See core.exports.
+"""
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from client.exports import SUBSCRIBER_COLUMNS, subscriber_rows
+from client.models import Subscription
+from core.exports import keyset_rows, zip_stream
+from writer.exports import export_articles
+
+PROFILE_COLUMNS = ('id', 'email', 'first_name', 'last_name', 'is_writer',
+                   'date_joined', 'last_login')
+
+
+def to_json(columns, row) -> str:
+    return DjangoJSONEncoder(indent=2).encode(
+        dict(zip(columns, row)) if row is not None else None
+    )
+
+
+def personal_data_members(user, folder: str = ''):
+    """(name, chunks) members of the archive of the user."""
+
+    yield f'{folder}profile.json', [to_json(
+        PROFILE_COLUMNS, [getattr(user, column) for column in PROFILE_COLUMNS]
+    )]
+    yield f'{folder}subscription.json', [to_json(
+        SUBSCRIBER_COLUMNS,
+        next(subscriber_rows(Subscription.objects.filter(user=user)), None)
+    )]
+    if user.is_writer:
+        yield f'{folder}articles.csv', export_articles(user)
+
+
+def export_personal_data(user):
+    """Chunks of the archive of the user."""
+
+    return zip_stream(personal_data_members(user))
+
+
+def export_users_data(queryset):
+    """Chunks of one archive of the users, a folder each."""
+
+    return zip_stream(
+        member
+        for user in keyset_rows(queryset)
+        for member in personal_data_members(user, f'{user.email}/')
+    )
@@ -2,7 +2,10 @@
 Tests for account web pages.
 Command: pytest account/tests --cov=account --cov-report term-missing:skip-covered
 """
+import io
+import json
 import os
+import zipfile
 
 import pytest
 
@@ -252,3 +255,43 @@ def test_delete_account_success(client, sample_user):
     users = get_user_model().objects.filter(pk=user_pk)
 
     assert not users.exists()
+
+
+def test_export_account_data(client, user_writer, article):
+    """Test a user downloads an archive of their own data."""
+
+    article(user_writer, title='Written')
+    client.force_login(user_writer)
+
+    r = client.get(reverse('export_account_data'))
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(r.streaming_content)))
+
+    assert r['Content-Type'] == 'application/zip'
+    assert archive.namelist() == ['profile.json', 'subscription.json',
+                                  'articles.csv']
+    assert json.loads(archive.read('profile.json'))['email'] == (
+        user_writer.email
+    )
+    assert json.loads(archive.read('subscription.json')) is None
+    assert 'Written' in archive.read('articles.csv').decode()
+
+
+def test_admin_exports_personal_data(client, superuser, sample_user,
+                                     user_writer):
+    """Test the admin action archives each selected user in a folder."""
+
+    client.force_login(superuser)
+
+    r = client.post(reverse('admin:account_customuser_changelist'), {
+        'action': 'export_personal_data',
+        '_selected_action': [sample_user.pk, user_writer.pk],
+    })
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(r.streaming_content)))
+
+    assert archive.namelist() == [
+        f'{sample_user.email}/profile.json',
+        f'{sample_user.email}/subscription.json',
+        f'{user_writer.email}/profile.json',
+        f'{user_writer.email}/subscription.json',
+        f'{user_writer.email}/articles.csv',
+    ]
@@ -13,6 +13,8 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('account/', views.AccountView.as_view(), name='account'),
     path('delete-account', views.delete_account, name='delete_account'),
+    path('export-account-data/', views.export_account_data,
+         name='export_account_data'),
 
     # ----------- Password management --------------
 
@@ -18,6 +18,11 @@ from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 
 from django.views.generic import TemplateView, View, RedirectView
 
+from core.exports import export_response
+
+from client.plan_migration import awaiting_approval
+
+from account.exports import export_personal_data
 from account.forms import CreateUserForm, UpdateUserForm
 from account.token import user_tokenizer_generate
 
@@ -107,6 +112,11 @@ class AccountView(LoginRequiredMixin, View):
     def get(self, request):  # noqa
         form = UpdateUserForm(instance=request.user)
         context = {'account_form': form, 'title': 'Edenthought | Account'}
+
+        subscription = request.entitlement.subscription
+        if subscription is not None:
+            context['plan_change'] = awaiting_approval(subscription)
+
         return render(request, 'account/account.html', context)
 
     def post(self, request):  # noqa
@@ -132,6 +142,15 @@ def delete_account(request):
     return redirect(reverse('index'))
 
 
+@login_required(login_url='login')
+def export_account_data(request):
+    return export_response(
+        export_personal_data(request.user),
+        'edenthought-data.zip',
+        'zip'
+    )
+
+
 class EmailVerificationView(RedirectView):
 
     def dispatch(self, request, *args, **kwargs):
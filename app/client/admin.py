@@ -1,6 +1,62 @@
 from django.contrib import admin
 
-from client.models import SubscriptionPlan, Subscription
+from client.exports import export_subscribers
+from client.models import (SubscriptionPlan, Subscription, WebhookEvent,
+                           PayPalOperation, PlanMigration, PlanMigrationItem)
+from core.exports import export_response
 
 admin.site.register(SubscriptionPlan)
-admin.site.register(Subscription)
+
+
+@admin.register(Subscription)
+class SubscriptionAdmin(admin.ModelAdmin):
+    actions = ('export_csv', 'export_ndjson')
+
+    @admin.action(description='Export selected subscribers as CSV')
+    def export_csv(self, request, queryset):
+        return export_response(export_subscribers(queryset, 'csv'),
+                               'subscribers.csv', 'csv')
+
+    @admin.action(description='Export selected subscribers as NDJSON')
+    def export_ndjson(self, request, queryset):
+        return export_response(export_subscribers(queryset, 'ndjson'),
+                               'subscribers.ndjson', 'ndjson')
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('event_type', 'resource_id', 'event_time', 'processed_at')
+    list_filter = ('event_type',)
+    search_fields = ('event_id', 'resource_id')
+
+
+@admin.register(PayPalOperation)
+class PayPalOperationAdmin(admin.ModelAdmin):
+    list_display = ('action', 'paypal_subscription_id', 'status', 'attempts',
+                    'next_attempt_at', 'updated_at')
+    list_filter = ('status', 'action')
+    search_fields = ('paypal_subscription_id', 'request_id')
+
+
+class PlanMigrationItemInline(admin.TabularInline):
+    model = PlanMigrationItem
+    fields = ('paypal_subscription_id', 'status', 'attempts', 'last_error',
+              'updated_at')
+    readonly_fields = fields
+    can_delete = False
+    extra = 0
+    show_change_link = True
+
+
+@admin.register(PlanMigration)
+class PlanMigrationAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'created_at', 'finished_at')
+    inlines = (PlanMigrationItemInline,)
+
+
+@admin.register(PlanMigrationItem)
+class PlanMigrationItemAdmin(admin.ModelAdmin):
+    list_display = ('paypal_subscription_id', 'migration', 'status',
+                    'attempts', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('paypal_subscription_id',)
@@ -0,0 +1,52 @@
+"""
+Title suggestions for the article search box.
+
+Suggestions are cached per (tier, typed text) for a short time: typeahead
+requests repeat the same few prefixes, and a suggestion list a few seconds
+old is good enough.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import reverse
+
+from client.tiers import tier_articles
+from writer.search import autocomplete_titles
+
+MAX_LENGTH = 64
+
+
+def normalize(text: str) -> str:
+    """Lowercase `text` and collapse its whitespace."""
+
+    return ' '.join(text.split()).lower()[:MAX_LENGTH]
+
+
+def cache_key(tier: int, fragment: str) -> str:
+    digest = hashlib.md5(fragment.encode()).hexdigest()
+    return f'client:autocomplete:{tier}:{digest}'
+
+
+def suggest_titles(tier: int, text: str) -> list[dict]:
+    """Return titles and URLs of articles of the tier matching `text`."""
+
+    fragment = normalize(text)
+    if len(fragment) < settings.AUTOCOMPLETE_MIN_LENGTH:
+        return []
+
+    key = cache_key(tier, fragment)
+    results = cache.get(key)
+
+    if results is None:
+        results = [
+            {'title': title,
+             'url': reverse('client:article_detail', args=[slug])}
+            for title, slug in autocomplete_titles(
+                tier_articles(tier), fragment, settings.AUTOCOMPLETE_LIMIT
+            )
+        ]
+        cache.set(key, results, settings.AUTOCOMPLETE_CACHE_TTL)
+
+    return results
@@ -0,0 +1,37 @@
+"""
+Helpers shared by the benchmark commands.
+"""
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+from client.models import SubscriptionPlan
+from writer.models import BASIC_TIER, PREMIUM_TIER
+
+
+def check_bench_database():
+    """Refuse to benchmark a database not marked as a bench one."""
+
+    if not settings.BENCHMARK_DATABASE:
+        raise CommandError(
+            'Benchmarks create and delete data: run them against a bench '
+            'database, with BENCHMARK_DATABASE=1.'
+        )
+
+
+def ensure_plans() -> list[SubscriptionPlan]:
+    """Create the standard and premium plans benchmarks subscribe to, if
+    missing; return those created, for the benchmark to delete."""
+
+    created = []
+    for name, cost, tier in (('standard', 4.99, BASIC_TIER),
+                             ('premium', 9.99, PREMIUM_TIER)):
+        plan, is_new = SubscriptionPlan.objects.get_or_create(
+            name=name,
+            defaults={'paypal_plan_id': f'P-BENCH-{name.upper()}',
+                      'cost': cost, 'tier': tier}
+        )
+        if is_new:
+            created.append(plan)
+
+    return created
@@ -0,0 +1,97 @@
+"""
+In-process catalog of subscription plans.
+
+Plans change rarely, so they are loaded once per process and looked up
+without a query. Saving or deleting a plan invalidates the catalog of the
+process (see client.signals) and bumps a version in the shared cache, which
+other processes check at most every PLAN_CATALOG_CHECK_INTERVAL seconds.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from client.models import SubscriptionPlan
+
+VERSION_KEY = 'client:plan_catalog:version'
+
+
+class PlanCatalog:
+    """Subscription plans by id, name and PayPal plan id."""
+
+    def __init__(self, check_interval: float | None = None):
+        self.check_interval = check_interval
+        self._plans = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def all(self) -> list[SubscriptionPlan]:
+        """Plans ordered by cost."""
+
+        return self._load()['all']
+
+    def by_id(self, pk) -> SubscriptionPlan | None:
+        return self._load()['id'].get(pk)
+
+    def by_name(self, name) -> SubscriptionPlan | None:
+        return self._load()['name'].get(name)
+
+    def by_paypal_id(self, paypal_plan_id) -> SubscriptionPlan | None:
+        return self._load()['paypal_id'].get(paypal_plan_id)
+
+    def switch_plan(self, plan) -> SubscriptionPlan | None:
+        """The plan to switch `plan` to: the cheapest plan of the next tier
+        up, or of the lowest tier from the top one."""
+
+        plans = self.all()
+        higher = [p for p in plans if p.tier > plan.tier]
+        tier = (min(p.tier for p in higher) if higher
+                else min((p.tier for p in plans), default=None))
+
+        return next((p for p in plans
+                     if p.tier == tier and p.pk != plan.pk), None)
+
+    def invalidate(self, shared: bool = False):
+        """Drop loaded plans; with `shared`, in all processes."""
+
+        with self._lock:
+            self._plans = None
+
+        if shared:
+            if cache.add(VERSION_KEY, 1, timeout=None):
+                return
+            try:
+                cache.incr(VERSION_KEY)
+            except ValueError:
+                cache.set(VERSION_KEY, 1, timeout=None)
+
+    def _load(self) -> dict:
+        interval = (self.check_interval if self.check_interval is not None
+                    else settings.PLAN_CATALOG_CHECK_INTERVAL)
+        now = time.monotonic()
+
+        with self._lock:
+            if self._plans is not None and now - self._checked_at >= interval:
+                self._checked_at = now
+                if cache.get(VERSION_KEY) != self._version:
+                    self._plans = None
+
+            if self._plans is None:
+                version = cache.get(VERSION_KEY)
+                plans = list(SubscriptionPlan.objects.order_by('cost', 'pk'))
+                self._plans = {
+                    'all': plans,
+                    'id': {p.pk: p for p in plans},
+                    'name': {p.name: p for p in plans},
+                    'paypal_id': {p.paypal_plan_id: p for p in plans},
+                }
+                self._version = version
+                self._checked_at = now
+
+            return self._plans
+
+
+plan_catalog = PlanCatalog()
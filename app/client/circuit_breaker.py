@@ -0,0 +1,234 @@
+"""
+Circuit breaker and bulkheads guarding calls to PayPal.
+"""
+
+import logging
+import threading
+import time
+
+from collections import deque
+
+from django.db import connection
+
+from client.exceptions import PayPalUnavailableException
+
+logger = logging.getLogger(__name__)
+
+
+class SharedBulkhead:
+    """Cap calls in flight across all processes sharing the database.
+
+    A call holds one of `slots` PostgreSQL session advisory locks on the
+    database connection of its thread; the locks of a process that dies go
+    with its connections. While all slots are taken, they are tried again
+    every `poll_interval` seconds.
+    """
+
+    # Advisory lock ids (LOCK_CLASS, slot) of the slots.
+    LOCK_CLASS = 0x70617970
+
+    def __init__(self, slots: int, poll_interval: float = 0.01):
+        self.slots = slots
+        self.poll_interval = poll_interval
+
+    def acquire(self, timeout: float) -> int | None:
+        """Take a free slot and return it, None if none freed up within
+        `timeout` seconds."""
+
+        deadline = time.monotonic() + timeout
+
+        while True:
+            # The LIMIT stops taking locks at the first free slot.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT slot FROM generate_series(0, %s) AS slot '
+                    'WHERE pg_try_advisory_lock(%s, slot) LIMIT 1',
+                    [self.slots - 1, self.LOCK_CLASS]
+                )
+                row = cursor.fetchone()
+
+            if row is not None:
+                return row[0]
+            if time.monotonic() >= deadline:
+                return None
+
+            time.sleep(self.poll_interval)
+
+    def release(self, slot: int):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s, %s)',
+                           [self.LOCK_CLASS, slot])
+
+
+class CircuitBreaker:
+    """Stop calling PayPal while it is failing or too slow.
+
+    Outcomes of the calls of the last `window` seconds are kept. Once at
+    least `min_calls` were made and the failure rate or the rate of calls
+    slower than `slow_call_duration` reaches its threshold, the circuit
+    opens and calls are rejected at once for `open_seconds`. Then up to
+    `half_open_probes` probe calls are let through: the circuit closes when
+    all of them succeed and opens again on the first failure.
+
+    The bulkhead caps how many threads of the process may be inside a
+    PayPal call at the same time; others wait at most `bulkhead_timeout`
+    seconds for a slot and are rejected after that. With
+    `max_concurrent_total`, calls of all processes also share that many
+    slots of a SharedBulkhead, within the same timeout.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_rate=0.5, slow_call_rate=0.5,
+                 slow_call_duration=5.0, window=60, min_calls=10,
+                 open_seconds=30, half_open_probes=2, max_concurrent=4,
+                 max_concurrent_total=None, bulkhead_timeout=0.5):
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_duration = slow_call_duration
+        self.window = window
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.max_concurrent = max_concurrent
+        self.max_concurrent_total = max_concurrent_total
+        self.bulkhead_timeout = bulkhead_timeout
+
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.trips = 0
+        self.rejected = 0
+
+        self._calls = deque()  # (timestamp, failed, slow)
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._bulkhead = threading.BoundedSemaphore(max_concurrent)
+        self._shared_bulkhead = (SharedBulkhead(max_concurrent_total)
+                                 if max_concurrent_total else None)
+        # Shared slot held by the call of each thread.
+        self._local = threading.local()
+
+    def before_call(self):
+        """Admit a call or raise PayPalUnavailableException."""
+
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    raise PayPalUnavailableException()
+
+                self.state = self.HALF_OPEN
+                self._probes_started = 0
+                self._probes_succeeded = 0
+
+            if self.state == self.HALF_OPEN:
+                if self._probes_started >= self.half_open_probes:
+                    self.rejected += 1
+                    raise PayPalUnavailableException()
+                self._probes_started += 1
+
+        deadline = time.monotonic() + self.bulkhead_timeout
+        admitted = self._bulkhead.acquire(timeout=self.bulkhead_timeout)
+
+        if admitted and self._shared_bulkhead is not None:
+            self._local.slot = self._shared_bulkhead.acquire(
+                max(deadline - time.monotonic(), 0)
+            )
+            if self._local.slot is None:
+                self._bulkhead.release()
+                admitted = False
+
+        if not admitted:
+            with self._lock:
+                self.rejected += 1
+                if self.state == self.HALF_OPEN:
+                    self._probes_started -= 1
+            raise PayPalUnavailableException('Too many concurrent PayPal calls!')
+
+        with self._lock:
+            self._in_flight += 1
+
+    def after_call(self, duration: float, success: bool):
+        """Record outcome of an admitted call."""
+
+        if self._shared_bulkhead is not None:
+            self._shared_bulkhead.release(self._local.slot)
+        self._bulkhead.release()
+        now = time.monotonic()
+        slow = duration >= self.slow_call_duration
+
+        with self._lock:
+            self._in_flight -= 1
+
+            if self.state == self.HALF_OPEN:
+                if not success or slow:
+                    self._open(now, 'probe call failed')
+                else:
+                    self._probes_succeeded += 1
+                    if self._probes_succeeded >= self.half_open_probes:
+                        self.state = self.CLOSED
+                        self._calls.clear()
+                        logger.info('PayPal circuit breaker closed')
+                return
+
+            if self.state == self.OPEN:
+                return
+
+            self._calls.append((now, not success, slow))
+            self._expire(now)
+
+            calls = len(self._calls)
+            if calls < self.min_calls:
+                return
+
+            failures = sum(1 for _, failed, _ in self._calls if failed)
+            slow_calls = sum(1 for _, _, is_slow in self._calls if is_slow)
+
+            if failures / calls >= self.failure_rate:
+                self._open(now, f'{failures}/{calls} calls failed')
+            elif slow_calls / calls >= self.slow_call_rate:
+                self._open(now, f'{slow_calls}/{calls} calls were slow')
+
+    def retry_in(self) -> float:
+        """Seconds until the open circuit lets a probe call through."""
+
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0
+            return max(self.open_seconds - (time.monotonic() - self.opened_at), 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            calls = len(self._calls)
+
+            return {
+                'state': self.state,
+                'trips': self.trips,
+                'rejected': self.rejected,
+                'calls_in_window': calls,
+                'failure_rate': round(
+                    sum(1 for c in self._calls if c[1]) / calls, 4
+                ) if calls else None,
+                'slow_call_rate': round(
+                    sum(1 for c in self._calls if c[2]) / calls, 4
+                ) if calls else None,
+                'in_flight': self._in_flight,
+                'max_concurrent': self.max_concurrent,
+                'max_concurrent_total': self.max_concurrent_total,
+            }
+
+    def _open(self, now, reason):
+        self.state = self.OPEN
+        self.opened_at = now
+        self.trips += 1
+        self._calls.clear()
+        logger.error('PayPal circuit breaker opened: %s', reason)
+
+    def _expire(self, now):
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
@@ -0,0 +1,82 @@
+"""
+Short-lived cache of PayPal subscription details.
+"""
+
+import threading
+
+from django.core.cache import caches
+
+
+class SubscriptionDetailCache:
+    """Keep subscription detail payloads for `ttl` seconds.
+
+    Payloads are stored in the Django cache, keyed by subscription id, so
+    all workers share them. Unknown subscriptions (404) are remembered as
+    well, for `not_found_ttl` seconds. Our own changes of a subscription
+    (cancel, suspend, activate, revise) and webhook events invalidate it.
+    """
+
+    key_prefix = 'paypal:subscription:'
+
+    def __init__(self, ttl=60, not_found_ttl=30, cache_alias='default'):
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.cache_alias = cache_alias
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        self._stats_lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get(self, sub_id: str, fetch) -> dict | None:
+        """Return cached details or call `fetch()`, which returns the
+        response of the subscription detail endpoint.
+
+        Returns None for an unknown subscription or an unexpected response;
+        only successful and 404 responses are cached.
+        """
+
+        entry = self.cache.get(self.key(sub_id))
+        if entry is not None:
+            self._count('hits')
+            return entry['payload']
+
+        self._count('misses')
+        r = fetch()
+
+        if r.status_code == 200:
+            payload = r.json()
+            self.cache.set(self.key(sub_id), {'payload': payload}, self.ttl)
+            return payload
+
+        if r.status_code == 404:
+            self.cache.set(self.key(sub_id), {'payload': None},
+                           self.not_found_ttl)
+
+        return None
+
+    def invalidate(self, *sub_ids: str):
+        self.cache.delete_many([self.key(sub_id) for sub_id in sub_ids])
+        self._count('invalidations', len(sub_ids))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def key(self, sub_id: str) -> str:
+        return f'{self.key_prefix}{sub_id}'
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
@@ -0,0 +1,165 @@
+"""
+What the user of a request may read, resolved once per request.
+
+EntitlementMiddleware sets `request.entitlement`, a lazy Entitlement loaded
+with one query on first use; templates get it as `entitlement`. With
+ENTITLEMENT_SESSION_CACHE, it is also kept in the session, stamped with a
+per-user version in the shared cache. Every change of a subscription drops
+the version of its user (see client.signals and the bulk writers in
+client.outbox, client.webhooks, client.reconcile and client.plan_migration),
+so sessions reload it on their next request.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject
+
+from client.catalog import plan_catalog
+from client.models import Subscription
+
+SESSION_KEY = '_entitlement'
+VERSION_KEY = 'client:entitlement:{}:version'
+
+# Subscription fields kept in the session.
+SESSION_FIELDS = ('id', 'subscription_plan_id', 'paypal_subscription_id',
+                  'subscriber_name', 'is_active', 'pending_action')
+
+
+class Entitlement:
+    """The user's subscription, its plan and the tier it covers."""
+
+    def __init__(self, subscription: Subscription | None = None):
+        self.subscription = subscription
+
+    @property
+    def plan(self):
+        if self.subscription is None:
+            return None
+
+        return self.subscription.subscription_plan
+
+    @property
+    def switch_plan(self):
+        """The plan an update of the subscription switches to."""
+
+        if self.plan is None:
+            return None
+
+        return plan_catalog.switch_plan(self.plan)
+
+    @property
+    def is_active(self) -> bool:
+        return self.subscription is not None and self.subscription.is_active
+
+    @property
+    def tier(self) -> int | None:
+        """Tier of articles the user may read; None without an active
+        subscription."""
+
+        if not self.is_active:
+            return None
+
+        return self.plan.tier
+
+
+def load_entitlement(user) -> Entitlement:
+    if not user.is_authenticated:
+        return Entitlement()
+
+    return Entitlement(
+        Subscription.objects.select_related(
+            'subscription_plan'
+        ).filter(user=user).first()
+    )
+
+
+def get_entitlement(request) -> Entitlement:
+    """Return the entitlement of the request user, from the session if it
+    is cached there and still current."""
+
+    user = request.user
+
+    if not settings.ENTITLEMENT_SESSION_CACHE or not user.is_authenticated:
+        return load_entitlement(user)
+
+    version = current_version(user.pk)
+    cached = request.session.get(SESSION_KEY)
+
+    if cached and cached['version'] == version:
+        entitlement = from_session(user, cached['subscription'])
+        if entitlement is not None:
+            return entitlement
+
+    entitlement = load_entitlement(user)
+    request.session[SESSION_KEY] = {
+        'version': version,
+        'subscription': (
+            {field: getattr(entitlement.subscription, field)
+             for field in SESSION_FIELDS}
+            if entitlement.subscription else None
+        ),
+    }
+
+    return entitlement
+
+
+def from_session(user, data: dict | None) -> Entitlement | None:
+    """Rebuild the entitlement; None when its plan no longer exists."""
+
+    if data is None:
+        return Entitlement()
+
+    plan = plan_catalog.by_id(data['subscription_plan_id'])
+    if plan is None:
+        return None
+
+    subscription = Subscription(user=user, **data)
+    subscription.subscription_plan = plan
+
+    return Entitlement(subscription)
+
+
+def current_version(user_id) -> str:
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+def invalidate_entitlements(*user_ids):
+    """Make sessions of the users reload their entitlement.
+
+    Done again on commit, so that a reload meanwhile does not keep the
+    subscription of before the change.
+    """
+
+    keys = [VERSION_KEY.format(user_id) for user_id in user_ids]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class EntitlementMiddleware:
+    """Set a lazily loaded `request.entitlement`."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.entitlement = SimpleLazyObject(
+            lambda: get_entitlement(request)
+        )
+        return self.get_response(request)
+
+
+def entitlement(request) -> dict:
+    """Context processor adding the entitlement of the request user."""
+
+    return {'entitlement': getattr(request, 'entitlement', None)}
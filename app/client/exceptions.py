@@ -5,3 +5,8 @@ class PayPalAPIException(Exception):
 class SubscriptionNotDeletedException(PayPalAPIException):
     def __init__(self):
         super().__init__('Subscription has not been deleted!')
+
+
+class PayPalUnavailableException(PayPalAPIException):
+    def __init__(self, reason='PayPal is temporarily unavailable!'):
+        super().__init__(reason)
@@ -0,0 +1,43 @@
+"""
+Export of subscribers with their plan and status. See core.exports.
+"""
+
+from client.models import Subscription
+from core.exports import STREAMS, keyset_rows
+
+SUBSCRIBER_COLUMNS = ('id', 'subscriber_name', 'email', 'first_name',
+                      'last_name', 'plan', 'tier', 'cost', 'status',
+                      'paypal_subscription_id', 'date_joined')
+
+
+def subscription_status(is_active: bool, pending_action: str) -> str:
+    """Status as shown on the account page."""
+
+    if pending_action:
+        return f'{pending_action} pending'
+    return 'active' if is_active else 'locked'
+
+
+def subscriber_rows(queryset=None):
+    """Rows of the subscriptions (all by default), fetched lazily with
+    their user and plan in one query."""
+
+    if queryset is None:
+        queryset = Subscription.objects.all()
+
+    rows = keyset_rows(queryset.values_list(
+        'pk', 'subscriber_name', 'user__email', 'user__first_name',
+        'user__last_name', 'subscription_plan__name',
+        'subscription_plan__tier', 'subscription_plan__cost', 'is_active',
+        'pending_action', 'paypal_subscription_id', 'user__date_joined'
+    ))
+
+    for row in rows:
+        yield row[:8] + (subscription_status(row[8], row[9]),) + row[10:]
+
+
+def export_subscribers(queryset=None, export_format: str = 'csv'):
+    """Chunks of the export of the subscriptions (all by default)."""
+
+    return STREAMS[export_format](SUBSCRIBER_COLUMNS,
+                                  subscriber_rows(queryset))
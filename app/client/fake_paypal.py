@@ -0,0 +1,243 @@
+"""
+Local stand-in for the PayPal REST API, for tests and load benchmarks.
+
+Covers the endpoints used by client.paypal: oauth2 token, subscription
+details, cancel, suspend, activate and revise. Latency, error rate and
+rate limiting can be injected.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUBSCRIPTION_PATH = re.compile(
+    r'^/v1/billing/subscriptions/(?P<sub_id>[^/]+)(?:/(?P<action>\w+))?$'
+)
+
+STATUS_AFTER = {
+    'cancel': 'CANCELLED',
+    'suspend': 'SUSPENDED',
+    'activate': 'ACTIVE',
+}
+
+# Statuses from which an action is allowed, as on PayPal.
+ALLOWED_FROM = {
+    'cancel': {'ACTIVE', 'SUSPENDED'},
+    'suspend': {'ACTIVE'},
+    'activate': {'SUSPENDED'},
+    'revise': {'ACTIVE', 'SUSPENDED'},
+}
+
+
+class FakePayPal:
+    """State and behaviour of the fake PayPal API."""
+
+    def __init__(self, latency=0.0, latency_jitter=0.0, error_rate=0.0,
+                 rate_limit=None, token_ttl=32400, default_plan_id='P-FAKE',
+                 auto_create=True, auto_approve=True):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.token_ttl = token_ttl
+        self.default_plan_id = default_plan_id
+        self.auto_create = auto_create
+        self.auto_approve = auto_approve
+
+        self.subscriptions = {}
+        self.pending_plans = {}
+        self.tokens = set()
+        self.requests = []
+
+        self._replies = {}
+        self._allowance = rate_limit or 0
+        self._last_check = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add_subscription(self, sub_id, plan_id=None, status='ACTIVE'):
+        with self._lock:
+            self.subscriptions[sub_id] = {
+                'id': sub_id,
+                'plan_id': plan_id or self.default_plan_id,
+                'status': status,
+            }
+
+    def approve(self, sub_id):
+        """Approve a plan revision, as the subscriber would on PayPal."""
+
+        with self._lock:
+            plan_id = self.pending_plans.pop(sub_id)
+            self.subscriptions[sub_id]['plan_id'] = plan_id
+
+    def handle(self, method, path, headers, body) -> tuple[int, dict, dict | None]:
+        """Return status code, extra headers and JSON body of the reply."""
+
+        with self._lock:
+            self.requests.append((method, path))
+
+        if self.latency or self.latency_jitter:
+            time.sleep(self.latency + random.uniform(0, self.latency_jitter))
+
+        if not self._admit():
+            return 429, {'Retry-After': '1'}, {'name': 'RATE_LIMIT_REACHED'}
+
+        if self.error_rate and random.random() < self.error_rate:
+            return 503, {}, {'name': 'SERVICE_UNAVAILABLE'}
+
+        if method == 'POST' and path == '/v1/oauth2/token':
+            token = uuid.uuid4().hex
+            with self._lock:
+                self.tokens.add(token)
+            return 200, {}, {
+                'access_token': token,
+                'token_type': 'Bearer',
+                'expires_in': self.token_ttl,
+            }
+
+        token = headers.get('Authorization', '').removeprefix('Bearer ')
+        if token not in self.tokens:
+            return 401, {}, {'error': 'invalid_token'}
+
+        match = SUBSCRIPTION_PATH.match(path)
+        if not match:
+            return 404, {}, {'name': 'RESOURCE_NOT_FOUND'}
+
+        request_id = headers.get('PayPal-Request-Id')
+        if method == 'POST' and request_id:
+            with self._lock:
+                if request_id in self._replies:
+                    return self._replies[request_id]
+
+        reply = self._subscription(method, match['sub_id'], match['action'],
+                                   body)
+
+        if method == 'POST' and request_id:
+            with self._lock:
+                self._replies[request_id] = reply
+
+        return reply
+
+    def _subscription(self, method, sub_id, action, body):
+        with self._lock:
+            subscription = self.subscriptions.get(sub_id)
+            if subscription is None and self.auto_create:
+                subscription = self.subscriptions[sub_id] = {
+                    'id': sub_id,
+                    'plan_id': self.default_plan_id,
+                    'status': 'ACTIVE',
+                }
+
+            if subscription is None:
+                return 404, {}, {'name': 'RESOURCE_NOT_FOUND'}
+
+            if method == 'GET' and action is None:
+                return 200, {}, dict(subscription)
+
+            if method != 'POST' or action not in ALLOWED_FROM:
+                return 404, {}, {'name': 'RESOURCE_NOT_FOUND'}
+
+            if subscription['status'] not in ALLOWED_FROM[action]:
+                return 422, {}, {'name': 'UNPROCESSABLE_ENTITY',
+                                 'details': [{'issue': 'SUBSCRIPTION_STATUS_INVALID'}]}
+
+            if action == 'revise':
+                plan_id = json.loads(body or b'{}').get('plan_id')
+                if self.auto_approve:
+                    subscription['plan_id'] = plan_id
+                else:
+                    self.pending_plans[sub_id] = plan_id
+                return 200, {}, {
+                    'plan_id': plan_id,
+                    'links': [{
+                        'rel': 'approve',
+                        'href': f'https://www.sandbox.paypal.com/webapps/'
+                                f'billing/subscriptions/update?ba_token={sub_id}',
+                        'method': 'GET',
+                    }],
+                }
+
+            subscription['status'] = STATUS_AFTER[action]
+            return 204, {}, None
+
+    def _admit(self) -> bool:
+        """Token bucket of `rate_limit` requests per second."""
+
+        if not self.rate_limit:
+            return True
+
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(
+                self.rate_limit,
+                self._allowance + (now - self._last_check) * self.rate_limit
+            )
+            self._last_check = now
+
+            if self._allowance < 1:
+                return False
+
+            self._allowance -= 1
+            return True
+
+
+class FakePayPalHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):  # noqa
+        self.reply('GET')
+
+    def do_POST(self):  # noqa
+        self.reply('POST')
+
+    def reply(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        status, headers, payload = self.server.paypal.handle(
+            method, self.path, self.headers, body
+        )
+        content = json.dumps(payload).encode() if payload is not None else b''
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if content:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):  # noqa
+        pass
+
+
+class FakePayPalServer(ThreadingHTTPServer):
+    """HTTP server of FakePayPal, optionally run in a background thread."""
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, **options):
+        super().__init__((host, port), FakePayPalHandler)
+        self.paypal = FakePayPal(**options)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
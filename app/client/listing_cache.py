@@ -0,0 +1,100 @@
+"""
+Cache of rendered article listings.
+
+Every subscriber of a tier sees the same browse list, so its rendered
+pages are cached per (tier, page cursor). Each tier has a generation
+counter in its keys; bumping it (see client.signals) drops all cached
+pages of the tier at once and leaves other tiers alone.
+"""
+
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from client.tiers import covering_tiers, plan_tiers
+
+# Fields shown in listings: saving an article without changing any of
+# them keeps its listings cached.
+LISTED_FIELDS = frozenset({'title', 'slug', 'content', 'excerpt',
+                           'reading_time', 'required_tier', 'date_posted'})
+
+
+def article_tiers(required_tier: int) -> set[int]:
+    """Tiers whose listings show an article."""
+
+    return covering_tiers(required_tier)
+
+
+class ListingCache:
+    """Keep rendered listing pages of each tier for `ttl` seconds
+    (LISTING_CACHE_TTL by default)."""
+
+    key_prefix = 'client:listing:'
+
+    def __init__(self, ttl: int | None = None, cache_alias='default'):
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        self._stats_lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get(self, tier: int, cursor: str) -> str | None:
+        html = self.cache.get(self.key(tier, cursor))
+        self._count('hits' if html is not None else 'misses')
+        return html
+
+    def set(self, tier: int, cursor: str, html: str):
+        ttl = self.ttl if self.ttl is not None else settings.LISTING_CACHE_TTL
+        self.cache.set(self.key(tier, cursor), html, ttl)
+
+    def invalidate(self, *tiers: int):
+        """Drop cached pages of the tiers in all processes."""
+
+        for tier in tiers:
+            key = self.generation_key(tier)
+            if self.cache.add(key, 1, timeout=None):
+                continue
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.set(key, 1, timeout=None)
+
+        self._count('invalidations', len(tiers))
+
+    def generation(self, tier: int) -> int:
+        return self.cache.get(self.generation_key(tier), 0)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            'generations': {tier: self.generation(tier)
+                            for tier in plan_tiers()},
+        }
+
+    def key(self, tier: int, cursor: str) -> str:
+        digest = hashlib.md5(cursor.encode()).hexdigest()
+        return f'{self.key_prefix}{tier}:{self.generation(tier)}:{digest}'
+
+    def generation_key(self, tier: int) -> str:
+        return f'{self.key_prefix}{tier}:generation'
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+
+listing_cache = ListingCache()
@@ -0,0 +1,195 @@
+"""
+Django command to benchmark title autocompletion.
+"""
+
+import random
+import time
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+
+from django.core.management.base import BaseCommand, CommandError
+
+from client.autocomplete import cache_key, normalize, suggest_titles
+from client.bench import check_bench_database, ensure_plans
+from client.metrics import percentile
+from client.models import SubscriptionPlan
+from writer.models import BASIC_TIER, PREMIUM_TIER, Article, TitleWord
+from writer.search import rebuild_title_words
+
+WORDS = (
+    'ancient', 'autumn', 'balance', 'bread', 'bridge', 'candle', 'canyon',
+    'coffee', 'compass', 'courage', 'desert', 'digital', 'dream', 'eclipse',
+    'empire', 'energy', 'forest', 'freedom', 'garden', 'glacier', 'harbour',
+    'harvest', 'horizon', 'island', 'journey', 'justice', 'kitchen',
+    'language', 'lantern', 'library', 'lighthouse', 'machine', 'meadow',
+    'memory', 'mountain', 'network', 'ocean', 'orchard', 'painting',
+    'pattern', 'planet', 'poetry', 'quantum', 'railway', 'river', 'science',
+    'season', 'shadow', 'silence', 'spring', 'startup', 'storm', 'summer',
+    'theory', 'thunder', 'travel', 'valley', 'village', 'violin', 'winter',
+)
+
+
+class Command(BaseCommand):
+    """Django command to load-test title autocompletion"""
+
+    help = ('Fill the database with generated articles, look up title '
+            'suggestions for typed prefixes and typos, and report latency '
+            'percentiles of cache misses and hits; fail when the p95 of '
+            'cache misses exceeds the target.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=200_000,
+                            help='Number of generated articles.')
+        parser.add_argument('--queries', type=int, default=2000,
+                            help='Number of lookups of each phase.')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Lookups running at the same time; with '
+                                 'more lookups than cores, timings include '
+                                 'waiting for a core.')
+        parser.add_argument('--typo-rate', type=float, default=0.2,
+                            help='Share of fragments with a typo.')
+        parser.add_argument('--target-ms', type=float, default=5.0,
+                            help='Expected p95 latency of cache misses.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        check_bench_database()
+        self.random = random.Random(options['seed'])
+        run_id = uuid.uuid4().hex[:8].upper()
+        created_plans = ensure_plans()
+
+        writer = get_user_model().objects.create_user(
+            email=f'bench-{run_id}-writer@example.com',
+            password=uuid.uuid4().hex,
+            first_name='Bench',
+            last_name='Writer',
+            is_writer=True
+        )
+        tiers = [SubscriptionPlan.objects.get(name=name).tier
+                 for name in ('standard', 'premium')]
+
+        try:
+            self.stdout.write(f'Generating {options["articles"]} articles...')
+            self.create_articles(writer, run_id, options['articles'])
+
+            fragments = [self.fragment(options['typo_rate'])
+                         for _ in range(options['queries'])]
+            lookups = [(tiers[i % 2], f) for i, f in enumerate(fragments)]
+
+            results = {
+                phase: self.run_lookups(lookups, options['concurrency'],
+                                        miss=phase == 'miss')
+                for phase in ('miss', 'hit')
+            }
+        finally:
+            # Articles go with their author.
+            writer.delete()
+            SubscriptionPlan.objects.filter(
+                pk__in=[p.pk for p in created_plans]
+            ).delete()
+            rebuild_title_words()
+
+        self.report(results, options)
+
+    def create_articles(self, writer, run_id, count, batch_size=5000):
+        for start in range(0, count, batch_size):
+            Article.objects.bulk_create([
+                Article(
+                    title=' '.join(self.random.sample(
+                        WORDS, self.random.randint(2, 6)
+                    )).capitalize(),
+                    slug=f'bench-{run_id}-{i}',
+                    content='Benchmark article',
+                    author=writer,
+                    required_tier=(PREMIUM_TIER if self.random.random() < 0.3
+                                   else BASIC_TIER)
+                )
+                for i in range(start, min(start + batch_size, count))
+            ])
+
+        # Bulk inserts skip Article.save, which adds the title words.
+        rebuild_title_words()
+
+        # As autovacuum would, also moves pending GIN entries into the
+        # indexes.
+        with connection.cursor() as cursor:
+            cursor.execute(f'VACUUM ANALYZE {Article._meta.db_table}')
+            cursor.execute(f'VACUUM ANALYZE {TitleWord._meta.db_table}')
+
+    def fragment(self, typo_rate) -> str:
+        """A prefix of a title word, as typed, sometimes with a typo."""
+
+        word = self.random.choice(WORDS)
+        text = word[:self.random.randint(3, len(word))]
+
+        if len(text) > 3 and self.random.random() < typo_rate:
+            i = self.random.randrange(1, len(text) - 1)
+            text = text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+        return text
+
+    @staticmethod
+    def run_lookups(lookups, concurrency, miss) -> list[float]:
+        """Look up suggestions, return milliseconds of each lookup.
+
+        Lookups call suggest_titles directly, so that the timings leave
+        out the request handling of the view. With `miss`, cached
+        suggestions are dropped before each lookup, otherwise they are
+        cached right before it: the cache may not hold all fragments.
+        """
+
+        # Each thread keeps its database connection across lookups, as a
+        # web worker with persistent connections (CONN_MAX_AGE) does:
+        # connecting costs more than the lookups measured here. They are
+        # closed with their threads.
+        def run(lookup):
+            tier, text = lookup
+
+            if miss:
+                cache.delete(cache_key(tier, normalize(text)))
+            else:
+                suggest_titles(tier, text)
+
+            start = time.monotonic()
+            suggest_titles(tier, text)
+            return (time.monotonic() - start) * 1000
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            timings = list(executor.map(run, lookups))
+
+        close_old_connections()
+        return timings
+
+    def report(self, results, options):
+        self.stdout.write(
+            f'\n{options["articles"]} articles, {options["queries"]} '
+            f'lookups per phase, concurrency {options["concurrency"]}\n'
+        )
+        self.stdout.write(f'{"cache":<8}{"count":>7}'
+                          f'{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+
+        for phase, timings in results.items():
+            self.stdout.write(
+                f'{phase:<8}{len(timings):>7}' +
+                ''.join(f'{percentile(timings, q) or 0:>10.2f}'
+                        for q in (0.5, 0.95, 0.99))
+            )
+
+        p95 = percentile(results['miss'], 0.95) or 0
+        if p95 > options['target_ms']:
+            raise CommandError(
+                f'Cache miss p95 {p95:.2f} ms exceeds '
+                f'{options["target_ms"]} ms.'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nCache miss p95 {p95:.2f} ms is within '
+            f'{options["target_ms"]} ms.'
+        ))
@@ -0,0 +1,239 @@
+"""
+Django command to benchmark subscription billing flows.
+"""
+
+import threading
+import time
+import uuid
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.shortcuts import reverse
+from django.test import Client, override_settings
+
+from django.core.management.base import BaseCommand
+
+from client import outbox, paypal
+from client.bench import check_bench_database, ensure_plans
+from client.fake_paypal import FakePayPalServer
+from client.metrics import percentile
+from client.models import PayPalOperation, Subscription, SubscriptionPlan
+from client.outbox import claim_operations, run_operation
+from client.paypal import PayPalClient
+
+STEPS = ('create', 'update', 'deactivate', 'activate', 'delete')
+
+
+class Command(BaseCommand):
+    """Django command to load-test billing flows through the real views"""
+
+    help = ('Drive create/update/deactivate/activate/delete subscription '
+            'flows through the views at a given concurrency and report '
+            'latency percentiles and throughput. Uses a built-in fake '
+            'PayPal API unless --paypal-url is given.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50,
+                            help='Number of subscriber flows to run.')
+        parser.add_argument('--concurrency', type=int, default=10,
+                            help='Flows running at the same time.')
+        parser.add_argument('--worker-threads', type=int, default=4,
+                            help='Threads running queued PayPal operations.')
+        parser.add_argument('--paypal-url',
+                            help='Base URL of a running (fake) PayPal API.')
+        parser.add_argument('--latency', type=float, default=0.0,
+                            help='Latency of the built-in fake PayPal.')
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='Error rate of the built-in fake PayPal.')
+        parser.add_argument('--rate-limit', type=float, default=None,
+                            help='Rate limit of the built-in fake PayPal.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        check_bench_database()
+
+        server = None
+        paypal_url = options['paypal_url']
+        if not paypal_url:
+            server = FakePayPalServer(
+                latency=options['latency'],
+                error_rate=options['error_rate'],
+                rate_limit=options['rate_limit']
+            ).start()
+            paypal_url = server.url
+
+        # Views and the outbox of this process call the benchmarked API
+        # through a client of their own, with its own access token; other
+        # processes keep using PayPal.
+        bench_client = PayPalClient(base_url=paypal_url)
+        client_patches = [patch.object(module, 'paypal_client', bench_client)
+                          for module in (paypal, outbox)]
+
+        created_plans = ensure_plans()
+        self.run_id = uuid.uuid4().hex[:8].upper()
+        users = [
+            get_user_model().objects.create_user(
+                email=f'bench-{self.run_id}-{i}@example.com',
+                password=uuid.uuid4().hex,
+                first_name='Bench',
+                last_name=str(i)
+            )
+            for i in range(options['users'])
+        ]
+
+        stop = threading.Event()
+        drainer = threading.Thread(
+            target=self.drain_outbox,
+            args=(stop, options['worker_threads'],
+                  f'I-BENCH-{self.run_id}-'),
+            daemon=True
+        )
+        for client_patch in client_patches:
+            client_patch.start()
+        drainer.start()
+
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                start = time.monotonic()
+                with ThreadPoolExecutor(options['concurrency']) as executor:
+                    results = list(executor.map(self.run_flow, users))
+                elapsed = time.monotonic() - start
+        finally:
+            stop.set()
+            drainer.join()
+            for client_patch in client_patches:
+                client_patch.stop()
+            get_user_model().objects.filter(
+                pk__in=[u.pk for u in users]
+            ).delete()
+            PayPalOperation.objects.filter(
+                paypal_subscription_id__startswith=f'I-BENCH-{self.run_id}-'
+            ).delete()
+            SubscriptionPlan.objects.filter(
+                pk__in=[p.pk for p in created_plans]
+            ).delete()
+            if server:
+                server.stop()
+
+        self.report(results, elapsed, options)
+
+    @staticmethod
+    def drain_outbox(stop, threads, subscription_prefix):
+        """Stand in for the paypal_worker command during the benchmark, for
+        the operations of its own subscriptions only."""
+
+        def run(operation):
+            close_old_connections()
+            try:
+                run_operation(operation)
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(threads) as executor:
+            while not stop.is_set():
+                operations = claim_operations(
+                    limit=threads * 2,
+                    subscription_prefix=subscription_prefix
+                )
+                if operations:
+                    list(executor.map(run, operations))
+                else:
+                    time.sleep(0.01)
+
+        close_old_connections()
+
+    def run_flow(self, user) -> list[tuple[str, float, bool]]:
+        """Run all steps for one subscriber, return (step, seconds, ok)."""
+
+        close_old_connections()
+        client = Client()
+        client.force_login(user)
+        sub_id = f'I-BENCH-{self.run_id}-{user.pk}'
+        dashboard = reverse('client:dashboard')
+        results = []
+
+        def step(name, url, is_ok):
+            start = time.monotonic()
+            try:
+                r = client.get(url)
+                ok = is_ok(r)
+            except Exception:  # noqa
+                ok = False
+            results.append((name, time.monotonic() - start, ok))
+            return ok
+
+        try:
+            step('create',
+                 f'{reverse("client:create_subscription")}'
+                 f'?subID={sub_id}&plan=standard',
+                 lambda r: Subscription.objects.filter(user=user).exists())
+            step('update',
+                 reverse('client:update_subscription',
+                         kwargs={'sub_id': sub_id}),
+                 lambda r: r['Location'] != reverse('account'))
+            if step('deactivate',
+                    reverse('client:deactivate_subscription',
+                            kwargs={'sub_id': sub_id}),
+                    lambda r: r['Location'] == dashboard):
+                self.wait_applied(user)
+            if step('activate',
+                    reverse('client:activate_subscription',
+                            kwargs={'sub_id': sub_id}),
+                    lambda r: r['Location'] == dashboard):
+                self.wait_applied(user)
+            if step('delete',
+                    reverse('client:delete_subscription',
+                            kwargs={'subID': sub_id}),
+                    lambda r: b'cancellation requested' in r.content):
+                self.wait_applied(user)
+        finally:
+            close_old_connections()
+
+        return results
+
+    @staticmethod
+    def wait_applied(user, timeout=30):
+        """Wait until the worker has applied the queued operation."""
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not Subscription.objects.filter(
+                    user=user
+            ).exclude(pending_action='').exists():
+                return
+            time.sleep(0.01)
+
+    def report(self, results, elapsed, options):
+        by_step = defaultdict(list)
+        errors = defaultdict(int)
+        for flow in results:
+            for name, seconds, ok in flow:
+                by_step[name].append(seconds * 1000)
+                errors[name] += not ok
+
+        requests_count = sum(len(v) for v in by_step.values())
+
+        self.stdout.write(
+            f'{options["users"]} flows, concurrency {options["concurrency"]}, '
+            f'{elapsed:.2f} s\n'
+        )
+        self.stdout.write(f'{"step":<12}{"count":>7}{"errors":>8}'
+                          f'{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+
+        for name in STEPS:
+            timings = by_step.get(name, [])
+            self.stdout.write(
+                f'{name:<12}{len(timings):>7}{errors[name]:>8}' +
+                ''.join(f'{percentile(timings, q) or 0:>10.1f}'
+                        for q in (0.5, 0.95, 0.99))
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nThroughput: {requests_count / elapsed:.1f} requests/s, '
+            f'{len(results) / elapsed:.2f} flows/s'
+        ))
@@ -0,0 +1,71 @@
+"""
+Django command to run a local stand-in of the PayPal REST API.
+"""
+
+from django.core.management.base import BaseCommand
+
+from client.fake_paypal import FakePayPalServer
+
+
+class Command(BaseCommand):
+    """Django command to serve the fake PayPal API"""
+
+    help = ('Serve a fake PayPal API. Point PAYPAL_BASE_URL at it to run '
+            'billing flows without the PayPal sandbox.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.0,
+            help='Seconds added to every response.'
+        )
+        parser.add_argument(
+            '--latency-jitter',
+            type=float,
+            default=0.0,
+            help='Up to this many seconds added at random on top of latency.'
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=0.0,
+            help='Share of requests answered with 503, 0..1.'
+        )
+        parser.add_argument(
+            '--rate-limit',
+            type=float,
+            default=None,
+            help='Requests per second above which 429 is returned.'
+        )
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Answer 404 for unknown subscriptions instead of creating them.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        server = FakePayPalServer(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            latency_jitter=options['latency_jitter'],
+            error_rate=options['error_rate'],
+            rate_limit=options['rate_limit'],
+            auto_create=not options['strict']
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Fake PayPal API listening on {server.url}'
+        ))
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,138 @@
+"""
+Django command to move subscribers from one plan to another.
+"""
+
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from client.catalog import plan_catalog
+from client.models import PlanMigration, PlanMigrationItem
+from client.plan_migration import process, progress, start_migration
+from client.reconcile import RateLimiter
+
+Status = PlanMigrationItem.Status
+
+
+class Command(BaseCommand):
+    """Django command to revise subscriptions of a plan on PayPal"""
+
+    help = ('Move all subscribers of a plan to another plan: revise their '
+            'subscriptions on PayPal and update them locally once PayPal '
+            'confirms. Run again to resume or to confirm late approvals; '
+            'subscriptions not approved in time are marked failed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('from_plan', help='Name of the current plan.')
+        parser.add_argument('to_plan', help='Name of the target plan.')
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.PAYPAL_WORKER_THREADS,
+            help='Number of concurrent PayPal calls.'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=settings.PAYPAL_RECONCILE_RATE,
+            help='Maximum PayPal calls per second.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Subscriptions processed and saved at a time.'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=3,
+            help='Attempts per subscription before it is marked failed.'
+        )
+        parser.add_argument(
+            '--approval-days',
+            type=int,
+            default=settings.PLAN_MIGRATION_APPROVAL_DAYS,
+            help='Days subscribers have to approve the change on PayPal.'
+        )
+        parser.add_argument(
+            '--new',
+            action='store_true',
+            help='Start a new migration even if an unfinished one exists.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        from_plan = plan_catalog.by_name(options['from_plan'])
+        to_plan = plan_catalog.by_name(options['to_plan'])
+
+        if from_plan is None or to_plan is None:
+            raise CommandError('Unknown subscription plan.')
+        if from_plan == to_plan:
+            raise CommandError('Plans must differ.')
+
+        migration = None
+        if not options['new']:
+            migration = PlanMigration.objects.filter(
+                from_plan=from_plan,
+                to_plan=to_plan,
+                finished_at__isnull=True
+            ).order_by('-pk').first()
+
+        if migration is None:
+            migration = start_migration(from_plan, to_plan)
+            self.stdout.write(f'Started plan migration {migration}.')
+        else:
+            self.stdout.write(f'Resuming plan migration {migration}.')
+
+        limiter = RateLimiter(options['rate'], burst=options['threads'])
+
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            # Items with a transient failure stay pending: pass again. Items
+            # not approved yet stay revised until the next run.
+            for status, phase, passes in (
+                    (Status.PENDING, 'revise', options['max_attempts']),
+                    (Status.REVISED, 'confirm', 1)
+            ):
+                for _ in range(passes):
+                    total = progress(migration)[status]
+                    if not total:
+                        break
+
+                    self.run_phase(phase, migration, status, executor,
+                                   limiter, total, options)
+
+        counts = progress(migration)
+        if not counts[Status.PENDING] and not counts[Status.REVISED]:
+            migration.finished_at = timezone.now()
+            migration.save(update_fields=['finished_at'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Plan migration {migration}: {counts[Status.CONFIRMED]} '
+            f'confirmed, {counts[Status.REVISED]} awaiting approval, '
+            f'{counts[Status.PENDING]} pending, {counts[Status.FAILED]} failed.'
+        ))
+
+    def run_phase(self, phase, migration, status, executor, limiter, total,
+                  options):
+        done = 0
+        start = time.monotonic()
+
+        for items in process(migration, status, executor, limiter,
+                             options['chunk_size'], options['max_attempts'],
+                             timedelta(days=options['approval_days'])):
+            done += len(items)
+            elapsed = time.monotonic() - start
+            rate = done / elapsed if elapsed else 0
+            eta = timedelta(seconds=round((total - done) / rate)) if rate else '?'
+
+            self.stdout.write(
+                f'{phase}: {done}/{total} ({rate:.1f}/s, ETA {eta})'
+            )
@@ -0,0 +1,103 @@
+"""
+Django command to run queued PayPal operations.
+"""
+
+import logging
+import signal
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from django.core.management.base import BaseCommand
+
+from client.outbox import claim_operations, retry_later, run_operation
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Django command to run PayPal operations from the outbox"""
+
+    help = 'Run queued PayPal cancel/suspend/activate/revise operations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.PAYPAL_WORKER_THREADS,
+            help='Number of concurrent PayPal calls.'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when there is nothing to do.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when no operation is due.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        self.running = True
+        previous_handlers = {
+            sig: signal.signal(sig, self.stop)
+            for sig in (signal.SIGTERM, signal.SIGINT)
+        }
+
+        threads = options['threads']
+        processed = 0
+
+        self.stdout.write(f'PayPal worker started with {threads} threads.')
+
+        try:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                while self.running:
+                    operations = claim_operations(limit=threads * 2)
+
+                    if not operations:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    list(executor.map(self.run, operations))
+                    processed += len(operations)
+        finally:
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'PayPal worker stopped, {processed} operations processed.'
+        ))
+
+    def stop(self, *args):
+        self.running = False
+
+    @staticmethod
+    def run(operation):
+        """Run operation in a pool thread with its own DB connection."""
+
+        close_old_connections()
+        try:
+            run_operation(operation)
+        except Exception as e:
+            # An unexpected error must not stop the worker: the operation is
+            # retried, then dead-lettered like any failed call.
+            logger.exception('PayPal %s of %s raised', operation.action,
+                             operation.paypal_subscription_id)
+            try:
+                retry_later(operation, f'{type(e).__name__}: {e}')
+            except Exception:
+                # E.g. the database is down: the lease expires and the
+                # operation is claimed again.
+                logger.exception('Could not reschedule PayPal operation %s',
+                                 operation.pk)
+        finally:
+            close_old_connections()
@@ -0,0 +1,130 @@
+"""
+Django command to reconcile subscriptions with their state on PayPal.
+"""
+
+import json
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+
+from django.core.management.base import BaseCommand
+
+from client.reconcile import RateLimiter, iter_chunks, reconcile_chunk
+
+
+class Command(BaseCommand):
+    """Django command to bring subscriptions in line with PayPal"""
+
+    help = ('Fetch PayPal details of all subscriptions and correct their '
+            'active flag and plan in the database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.PAYPAL_WORKER_THREADS,
+            help='Number of concurrent PayPal calls.'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=settings.PAYPAL_RECONCILE_RATE,
+            help='Maximum PayPal calls per second.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.PAYPAL_RECONCILE_CHUNK_SIZE,
+            help='Subscriptions read and updated at a time.'
+        )
+        parser.add_argument(
+            '--since',
+            type=float,
+            default=None,
+            metavar='HOURS',
+            help='Only subscriptions not reconciled in the last HOURS.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=Path,
+            default=None,
+            help='File recording progress; an interrupted run resumes from it.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report differences without changing anything.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        checkpoint = options['checkpoint']
+        after_pk = self.read_checkpoint(checkpoint)
+        since = (timedelta(hours=options['since'])
+                 if options['since'] is not None else None)
+
+        if after_pk:
+            self.stdout.write(f'Resuming after subscription #{after_pk}.')
+
+        limiter = RateLimiter(options['rate'], burst=options['threads'])
+        dry_run = options['dry_run']
+
+        checked = drifted = failed = 0
+        start = time.monotonic()
+        # The checkpoint stops before the first subscription that failed, so
+        # a rerun from it checks that one again.
+        failed_at = None
+
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            for chunk in iter_chunks(options['chunk_size'], since, after_pk):
+                drifts, errors = reconcile_chunk(
+                    chunk, executor, limiter, dry_run
+                )
+
+                for subscription, changes in drifts:
+                    self.stdout.write(self.format_drift(subscription, changes))
+
+                checked += len(chunk)
+                drifted += len(drifts)
+                failed += len(errors)
+
+                if errors and failed_at is None:
+                    failed_at = min(s.pk for s, _ in errors)
+                    after_pk = max((s.pk for s in chunk if s.pk < failed_at),
+                                   default=after_pk)
+                elif failed_at is None:
+                    after_pk = chunk[-1].pk
+
+                if checkpoint and not dry_run:
+                    checkpoint.write_text(json.dumps({'after_pk': after_pk}))
+
+        elapsed = time.monotonic() - start
+
+        if checkpoint and not dry_run and failed_at is None:
+            checkpoint.unlink(missing_ok=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{checked} subscriptions checked in {elapsed:.1f} s '
+            f'({checked / elapsed if elapsed else 0:.1f}/s): '
+            f'{drifted} {"differ" if dry_run else "corrected"}, '
+            f'{failed} failed.'
+        ))
+
+    @staticmethod
+    def read_checkpoint(checkpoint: Path | None) -> int:
+        if checkpoint is None or not checkpoint.exists():
+            return 0
+
+        return json.loads(checkpoint.read_text())['after_pk']
+
+    @staticmethod
+    def format_drift(subscription, changes) -> str:
+        diffs = ', '.join(f'{field}: {local} -> {paypal}'
+                          for field, (local, paypal) in changes.items())
+
+        return f'{subscription.paypal_subscription_id} ({subscription.user_id}): {diffs}'
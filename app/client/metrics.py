@@ -0,0 +1,70 @@
+"""
+In-process metrics for the PayPal integration.
+"""
+
+import bisect
+import math
+import threading
+
+
+class LatencyHistogram:
+    """Latency histogram with fixed millisecond buckets."""
+
+    buckets = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        index = bisect.bisect_left(self.buckets, ms)
+
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += ms
+
+    def percentile(self, q: float) -> float | None:
+        """Return the upper bound of the bucket holding the q-th percentile."""
+
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+
+        return float('inf')
+
+    def snapshot(self) -> dict:
+        labels = [f'le_{bound}' for bound in self.buckets] + ['le_inf']
+        percentiles = {
+            f'p{int(q * 100)}_ms': self.percentile(q) for q in (0.5, 0.95, 0.99)
+        }
+
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 2) if self.count else None,
+            # Keep the overflow bucket JSON-serializable.
+            **{k: 'inf' if v == float('inf') else v
+               for k, v in percentiles.items()},
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+def percentile(values, q: float) -> float | None:
+    """Nearest-rank percentile of a list of numbers."""
+
+    if not values:
+        return None
+
+    ordered = sorted(values)
+    rank = max(math.ceil(q * len(ordered)), 1)
+
+    return ordered[rank - 1]
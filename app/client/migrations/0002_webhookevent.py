@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('event_type', models.CharField(max_length=255)),
+                ('resource_id', models.CharField(db_index=True, max_length=300)),
+                ('payload', models.JSONField()),
+                ('event_time', models.DateTimeField(blank=True, null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'webhook event',
+                'verbose_name_plural': 'webhook events',
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['event_time', 'id'], name='webhook_event_unprocessed_idx')],
+            },
+        ),
+    ]
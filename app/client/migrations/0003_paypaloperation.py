@@ -0,0 +1,42 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:43
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0002_webhookevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscription',
+            name='pending_action',
+            field=models.CharField(blank=True, choices=[('cancel', 'cancellation'), ('suspend', 'deactivation'), ('activate', 'activation'), ('revise', 'plan change')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='PayPalOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('cancel', 'cancellation'), ('suspend', 'deactivation'), ('activate', 'activation'), ('revise', 'plan change')], max_length=20)),
+                ('paypal_subscription_id', models.CharField(max_length=300)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('request_id', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('done', 'Done'), ('dead', 'Dead')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'PayPal operation',
+                'verbose_name_plural': 'PayPal operations',
+                'indexes': [models.Index(condition=models.Q(('status__in', ['pending', 'in_progress'])), fields=['next_attempt_at'], name='paypal_operation_due_idx')],
+            },
+        ),
+    ]
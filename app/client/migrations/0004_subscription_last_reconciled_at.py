@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0003_paypaloperation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscription',
+            name='last_reconciled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:02
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0004_subscription_last_reconciled_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanMigration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('from_plan', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='client.subscriptionplan')),
+                ('to_plan', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='client.subscriptionplan')),
+            ],
+            options={
+                'verbose_name': 'plan migration',
+                'verbose_name_plural': 'plan migrations',
+            },
+        ),
+        migrations.CreateModel(
+            name='PlanMigrationItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('paypal_subscription_id', models.CharField(max_length=300)),
+                ('request_id', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('revised', 'Revised'), ('confirmed', 'Confirmed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('approve_link', models.URLField(blank=True, max_length=2000)),
+                ('last_error', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('migration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='client.planmigration')),
+                ('subscription', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='client.subscription')),
+            ],
+            options={
+                'verbose_name': 'plan migration item',
+                'verbose_name_plural': 'plan migration items',
+                'indexes': [models.Index(fields=['migration', 'status', 'id'], name='plan_migration_item_status_idx')],
+                'constraints': [models.UniqueConstraint(fields=('migration', 'paypal_subscription_id'), name='plan_migration_item_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:33
+
+from django.db import migrations, models
+
+# Frozen tiers at the time of this migration.
+BASIC_TIER = 1
+PREMIUM_TIER = 2
+
+
+def set_plan_tiers(apps, schema_editor):
+    """Plans used to be told apart by name: every plan but the standard one
+    covered premium articles."""
+
+    SubscriptionPlan = apps.get_model('client', 'SubscriptionPlan')
+    SubscriptionPlan.objects.exclude(name='standard').update(
+        tier=PREMIUM_TIER
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0005_planmigration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscriptionplan',
+            name='tier',
+            field=models.PositiveSmallIntegerField(db_default=1, default=1, help_text='Articles requiring this tier or lower are covered.'),
+        ),
+        migrations.RunPython(set_plan_tiers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0006_subscriptionplan_tier'),
+        ('writer', '0011_article_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending_score', serialize=False, to='writer.article')),
+                ('score', models.FloatField(help_text='Decayed views as of updated_at')),
+                ('updated_at', models.DateTimeField()),
+                ('trend', models.FloatField()),
+            ],
+            options={
+                'verbose_name': 'trending score',
+                'verbose_name_plural': 'trending scores',
+                'indexes': [models.Index(fields=['-trend'], name='trending_score_trend_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingArticle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tier', models.PositiveSmallIntegerField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('title', models.CharField(max_length=150)),
+                ('slug', models.SlugField(max_length=255)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='writer.article')),
+            ],
+            options={
+                'verbose_name': 'trending article',
+                'verbose_name_plural': 'trending articles',
+                'unique_together': {('tier', 'rank')},
+            },
+        ),
+    ]
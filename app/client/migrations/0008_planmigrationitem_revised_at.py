@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0007_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planmigrationitem',
+            name='revised_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,13 +1,32 @@
+import uuid
+
 from django.db import models
+from django.utils import timezone
 
 from django.contrib.auth import get_user_model
 
+from writer.models import BASIC_TIER, Article
+
+
+class PayPalAction(models.TextChoices):
+    CANCEL = 'cancel', 'cancellation'
+    SUSPEND = 'suspend', 'deactivation'
+    ACTIVATE = 'activate', 'activation'
+    REVISE = 'revise', 'plan change'
+
 
 class SubscriptionPlan(models.Model):
     paypal_plan_id = models.CharField(max_length=255, unique=True)
     name = models.CharField(max_length=255, unique=True)
     cost = models.DecimalField(decimal_places=2, max_digits=5)
     description = models.TextField(null=True, blank=True)
+    # db_default: instances of the previous release insert plans without
+    # the column during deployment.
+    tier = models.PositiveSmallIntegerField(
+        default=BASIC_TIER,
+        db_default=BASIC_TIER,
+        help_text='Articles requiring this tier or lower are covered.'
+    )
 
     class Meta:
         verbose_name = 'subscription plan'
@@ -33,7 +52,203 @@ class Subscription(models.Model):
         unique=True
     )
     is_active = models.BooleanField(default=False)
+    pending_action = models.CharField(
+        max_length=20,
+        choices=PayPalAction.choices,
+        blank=True
+    )
+    last_reconciled_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return (f'{self.subscriber_name} - '
                 f'{self.subscription_plan.name.capitalize()} subscription')
+
+
+class WebhookEvent(models.Model):
+    """PayPal webhook event, stored once per event id."""
+
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=255)
+    resource_id = models.CharField(max_length=300, db_index=True)
+    payload = models.JSONField()
+    event_time = models.DateTimeField(null=True, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'webhook event'
+        verbose_name_plural = 'webhook events'
+        indexes = [
+            models.Index(
+                fields=['event_time', 'id'],
+                condition=models.Q(processed_at__isnull=True),
+                name='webhook_event_unprocessed_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.event_type} - {self.resource_id}'
+
+
+class PayPalOperation(models.Model):
+    """Outbox entry: a PayPal call executed by the `paypal_worker` command."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending'
+        IN_PROGRESS = 'in_progress'
+        DONE = 'done'
+        DEAD = 'dead'
+
+    action = models.CharField(max_length=20, choices=PayPalAction.choices)
+    paypal_subscription_id = models.CharField(max_length=300)
+    payload = models.JSONField(default=dict, blank=True)
+    request_id = models.UUIDField(default=uuid.uuid4, unique=True)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'PayPal operation'
+        verbose_name_plural = 'PayPal operations'
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(status__in=['pending', 'in_progress']),
+                name='paypal_operation_due_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.action} {self.paypal_subscription_id} ({self.status})'
+
+
+class PlanMigration(models.Model):
+    """Bulk move of subscribers from one plan to another, run by the
+    `migrate_plan_subscribers` command."""
+
+    from_plan = models.ForeignKey(
+        SubscriptionPlan,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    to_plan = models.ForeignKey(
+        SubscriptionPlan,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'plan migration'
+        verbose_name_plural = 'plan migrations'
+
+    def __str__(self):
+        return f'#{self.pk}: {self.from_plan} -> {self.to_plan}'
+
+
+class PlanMigrationItem(models.Model):
+    """Progress of a single subscription within a plan migration."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending'
+        REVISED = 'revised'  # accepted by PayPal, awaiting confirmation
+        CONFIRMED = 'confirmed'
+        FAILED = 'failed'
+
+    migration = models.ForeignKey(
+        PlanMigration,
+        on_delete=models.CASCADE,
+        related_name='items'
+    )
+    subscription = models.ForeignKey(
+        Subscription,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    paypal_subscription_id = models.CharField(max_length=300)
+    request_id = models.UUIDField(default=uuid.uuid4, unique=True)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    approve_link = models.URLField(max_length=2000, blank=True)
+    revised_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'plan migration item'
+        verbose_name_plural = 'plan migration items'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['migration', 'paypal_subscription_id'],
+                name='plan_migration_item_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['migration', 'status', 'id'],
+                name='plan_migration_item_status_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.paypal_subscription_id} ({self.status})'
+
+
+class TrendingScore(models.Model):
+    """Time-decayed view count of an article merged from all processes,
+    see client.trending."""
+
+    article = models.OneToOneField(
+        to=Article,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending_score'
+    )
+    score = models.FloatField(help_text='Decayed views as of updated_at')
+    updated_at = models.DateTimeField()
+    # ln(score) + decay rate * updated_at: orders articles by their score
+    # decayed to any common time, without recomputing it.
+    trend = models.FloatField()
+
+    class Meta:
+        verbose_name = 'trending score'
+        verbose_name_plural = 'trending scores'
+        indexes = [
+            models.Index(fields=['-trend'], name='trending_score_trend_idx'),
+        ]
+
+
+class TrendingArticle(models.Model):
+    """Precomputed top trending articles of a tier, with what pages show."""
+
+    tier = models.PositiveSmallIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    article = models.ForeignKey(
+        to=Article,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    title = models.CharField(max_length=150)
+    slug = models.SlugField(max_length=255)
+
+    class Meta:
+        verbose_name = 'trending article'
+        verbose_name_plural = 'trending articles'
+        # Also serves reading a tier's list in rank order.
+        unique_together = ('tier', 'rank')
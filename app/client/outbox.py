@@ -0,0 +1,233 @@
+"""
+Outbox of PayPal operations.
+
+Views only record the operation (`enqueue`); the `paypal_worker` management
+command claims due operations and runs them against PayPal.
+"""
+
+import logging
+import random
+
+from datetime import timedelta
+
+import requests
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from client.entitlements import invalidate_entitlements
+from client.exceptions import PayPalAPIException, PayPalUnavailableException
+from client.models import PayPalAction, PayPalOperation, Subscription
+from client.paypal import paypal_client
+
+logger = logging.getLogger(__name__)
+
+# PayPal answers 422 when the subscription is already in the requested state,
+# e.g. a retried cancel whose first attempt did reach PayPal.
+ALREADY_APPLIED_STATUS = 422
+
+
+def enqueue(subscription: Subscription, action: str,
+            **payload) -> PayPalOperation | None:
+    """Record a PayPal operation for the subscription and mark it pending.
+
+    Returns None when another operation of the subscription is in flight.
+    """
+
+    with transaction.atomic():
+        marked = Subscription.objects.filter(
+            pk=subscription.pk,
+            pending_action=''
+        ).update(pending_action=action)
+
+        if not marked:
+            return None
+
+        subscription.pending_action = action
+        invalidate_entitlements(subscription.user_id)
+
+        return PayPalOperation.objects.create(
+            action=action,
+            paypal_subscription_id=subscription.paypal_subscription_id,
+            payload=payload
+        )
+
+
+def claim_operations(limit: int,
+                     subscription_prefix: str = '') -> list[PayPalOperation]:
+    """Lock due operations for this worker for the lease period, only
+    those of subscriptions whose id starts with `subscription_prefix` if
+    given.
+
+    Operations of a crashed worker become due again when their lease ends.
+    """
+
+    now = timezone.now()
+    queryset = PayPalOperation.objects.all()
+    if subscription_prefix:
+        queryset = queryset.filter(
+            paypal_subscription_id__startswith=subscription_prefix
+        )
+
+    with transaction.atomic():
+        operations = list(
+            queryset
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status=PayPalOperation.Status.PENDING,
+                  next_attempt_at__lte=now) |
+                Q(status=PayPalOperation.Status.IN_PROGRESS,
+                  locked_until__lt=now)
+            )
+            .order_by('next_attempt_at')[:limit]
+        )
+
+        for operation in operations:
+            operation.status = PayPalOperation.Status.IN_PROGRESS
+            operation.locked_until = now + timedelta(
+                seconds=settings.PAYPAL_OUTBOX_LEASE
+            )
+            operation.attempts += 1
+
+        PayPalOperation.objects.bulk_update(
+            operations,
+            ['status', 'locked_until', 'attempts']
+        )
+
+    return operations
+
+
+def call_paypal(operation: PayPalOperation) -> requests.Response:
+    access_token = paypal_client.get_access_token()
+    sub_id = operation.paypal_subscription_id
+    request_id = str(operation.request_id)
+
+    if operation.action == PayPalAction.REVISE:
+        return paypal_client.revise_subscription(
+            access_token, sub_id, operation.payload['plan_id'], request_id
+        )
+
+    call = {
+        PayPalAction.CANCEL: paypal_client.cancel_subscription,
+        PayPalAction.SUSPEND: paypal_client.suspend_subscription,
+        PayPalAction.ACTIVATE: paypal_client.activate_subscription,
+    }[operation.action]
+
+    return call(access_token, sub_id, request_id)
+
+
+def run_operation(operation: PayPalOperation):
+    """Run one claimed operation and record its outcome."""
+
+    try:
+        r = call_paypal(operation)
+    except PayPalUnavailableException as e:
+        postpone(operation, str(e))
+        return
+    except (requests.RequestException, PayPalAPIException) as e:
+        retry_later(operation, f'{type(e).__name__}: {e}')
+        return
+
+    if r.status_code in (200, 201, 204):
+        complete(operation)
+    elif (r.status_code == ALREADY_APPLIED_STATUS and
+          operation.action != PayPalAction.REVISE):
+        complete(operation)
+    elif r.status_code in paypal_client.retry_statuses:
+        retry_later(operation, f'HTTP {r.status_code}: {r.text[:500]}')
+    else:
+        dead_letter(operation, f'HTTP {r.status_code}: {r.text[:500]}')
+
+
+def complete(operation: PayPalOperation):
+    """Apply the confirmed operation to the local subscription."""
+
+    subscriptions = Subscription.objects.filter(
+        paypal_subscription_id=operation.paypal_subscription_id
+    )
+
+    with transaction.atomic():
+        invalidate_entitlements(*subscriptions.values_list('user_id',
+                                                           flat=True))
+
+        if operation.action == PayPalAction.CANCEL:
+            subscriptions.delete()
+        elif operation.action == PayPalAction.SUSPEND:
+            subscriptions.update(is_active=False, pending_action='')
+        elif operation.action == PayPalAction.ACTIVATE:
+            subscriptions.update(is_active=True, pending_action='')
+        else:
+            # The new plan is applied once the subscriber approves it on
+            # PayPal (see client.webhooks).
+            subscriptions.update(pending_action='')
+
+        operation.status = PayPalOperation.Status.DONE
+        operation.locked_until = None
+        operation.last_error = ''
+        operation.save(update_fields=['status', 'locked_until', 'last_error',
+                                      'updated_at'])
+
+
+def retry_later(operation: PayPalOperation, error: str):
+    """Schedule another attempt with jittered exponential backoff."""
+
+    if operation.attempts >= settings.PAYPAL_OUTBOX_MAX_ATTEMPTS:
+        dead_letter(operation, error)
+        return
+
+    delay = min(
+        settings.PAYPAL_OUTBOX_BACKOFF * 2 ** (operation.attempts - 1),
+        settings.PAYPAL_OUTBOX_MAX_BACKOFF
+    )
+    operation.status = PayPalOperation.Status.PENDING
+    operation.next_attempt_at = timezone.now() + timedelta(
+        seconds=delay * random.uniform(0.5, 1.5)
+    )
+    operation.locked_until = None
+    operation.last_error = error
+    operation.save(update_fields=['status', 'next_attempt_at', 'locked_until',
+                                  'last_error', 'updated_at'])
+
+    logger.warning('PayPal %s of %s failed (attempt %s): %s',
+                   operation.action, operation.paypal_subscription_id,
+                   operation.attempts, error)
+
+
+def postpone(operation: PayPalOperation, error: str):
+    """Reschedule without using up an attempt: PayPal was not called
+    because the circuit breaker is open."""
+
+    delay = max(paypal_client.breaker.retry_in(), 1)
+    operation.status = PayPalOperation.Status.PENDING
+    operation.attempts -= 1
+    operation.next_attempt_at = timezone.now() + timedelta(
+        seconds=delay * random.uniform(1, 1.5)
+    )
+    operation.locked_until = None
+    operation.last_error = error
+    operation.save(update_fields=['status', 'attempts', 'next_attempt_at',
+                                  'locked_until', 'last_error', 'updated_at'])
+
+
+def dead_letter(operation: PayPalOperation, error: str):
+    """Give up on the operation and release the subscription."""
+
+    with transaction.atomic():
+        subscriptions = Subscription.objects.filter(
+            paypal_subscription_id=operation.paypal_subscription_id,
+            pending_action=operation.action
+        )
+        invalidate_entitlements(*subscriptions.values_list('user_id',
+                                                           flat=True))
+        subscriptions.update(pending_action='')
+
+        operation.status = PayPalOperation.Status.DEAD
+        operation.locked_until = None
+        operation.last_error = error
+        operation.save(update_fields=['status', 'locked_until', 'last_error',
+                                      'updated_at'])
+
+    logger.error('PayPal %s of %s moved to dead letters: %s',
+                 operation.action, operation.paypal_subscription_id, error)
@@ -1,54 +1,326 @@
 import requests
+import hashlib
 import json
 import os
 import logging
+import random
+import threading
+import time
+import uuid
 
-from dotenv import load_dotenv
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
 
-from client.models import Subscription, SubscriptionPlan
-from client.exceptions import SubscriptionNotDeletedException
+from dotenv import load_dotenv
 
-load_dotenv()
+from requests.adapters import HTTPAdapter
 
+from django.conf import settings
+from django.utils import timezone
 
-def get_access_token() -> str:
-    """Makes request to PayPal API and returns access token."""
+from client.catalog import plan_catalog
+from client.models import Subscription
+from client.exceptions import (PayPalAPIException,
+                               SubscriptionNotDeletedException)
+from client.circuit_breaker import CircuitBreaker
+from client.detail_cache import SubscriptionDetailCache
+from client.metrics import LatencyHistogram
+from client.token_cache import AccessTokenCache
 
-    data = {'grant_type': 'client_credentials'}
+load_dotenv()
 
-    headers = {
-        'Content-Type': 'application/json',
-        'Accept-Language': 'en-US,en;q=0.5',
-    }
+logger = logging.getLogger(__name__)
+
+
+class PayPalClient:
+    """Client of PayPal REST API.
+
+    Holds a pooled keep-alive session, applies per-endpoint connect/read
+    timeouts, retries 429 and 5xx responses with jittered exponential
+    backoff (honouring ``Retry-After``) and records per-endpoint latency.
+    Calls go through a circuit breaker with a bulkhead (see
+    client.circuit_breaker).
+    """
+
+    base_url = 'https://api-m.sandbox.paypal.com'
+    retry_statuses = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, base_url=None, pool_size=10, timeouts=None,
+                 max_retries=2, backoff=0.5, max_backoff=8.0,
+                 token_refresh_margin=300, circuit_breaker=None,
+                 detail_cache_ttl=60, detail_not_found_ttl=30):
+        if base_url:
+            self.base_url = base_url.rstrip('/')
+
+        self.timeouts = {'default': (3.05, 10), **(timeouts or {})}
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.breaker = CircuitBreaker(**(circuit_breaker or {}))
+
+        self.latency = defaultdict(LatencyHistogram)
+        self._latency_lock = threading.Lock()
+
+        # Keyed by API, so that a client of another PayPal API (sandbox,
+        # fake) never shares its token with this one.
+        api_digest = hashlib.sha256(self.base_url.encode()).hexdigest()[:16]
+        self.token_cache = AccessTokenCache(
+            self.request_access_token,
+            refresh_margin=token_refresh_margin,
+            cache_key=f'paypal:access_token:{api_digest}'
+        )
+        self.detail_cache = SubscriptionDetailCache(
+            ttl=detail_cache_ttl,
+            not_found_ttl=detail_not_found_ttl
+        )
+
+    def request(self, endpoint: str, method: str, path: str,
+                **kwargs) -> requests.Response:
+        """Send a request through the circuit breaker.
+
+        Raises PayPalUnavailableException without calling PayPal while the
+        circuit is open or all bulkhead slots are taken.
+        """
+
+        self.breaker.before_call()
+        start = time.monotonic()
+        success = False
+
+        try:
+            response = self.send(endpoint, method, path, **kwargs)
+            success = response.status_code not in self.retry_statuses
+            return response
+        finally:
+            self.breaker.after_call(time.monotonic() - start, success)
+
+    def send(self, endpoint: str, method: str, path: str,
+             **kwargs) -> requests.Response:
+        """Send a request, retrying connection errors, 429 and 5xx
+        responses. Returns the last response received."""
+
+        url = f'{self.base_url}{path}'
+        timeout = self.timeouts.get(endpoint, self.timeouts['default'])
+
+        for attempt in range(self.max_retries + 1):
+            start = time.monotonic()
+            try:
+                response = self.session.request(
+                    method, url, timeout=timeout, **kwargs
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                self.observe(endpoint, time.monotonic() - start)
+                if attempt == self.max_retries:
+                    raise
+                logger.warning('PayPal %s request failed, retrying', endpoint)
+                time.sleep(self.get_backoff(attempt))
+                continue
+
+            self.observe(endpoint, time.monotonic() - start)
+
+            if (response.status_code not in self.retry_statuses or
+                    attempt == self.max_retries):
+                return response
+
+            logger.warning('PayPal %s returned %s, retrying',
+                           endpoint, response.status_code)
+            time.sleep(self.get_backoff(
+                attempt,
+                response.headers.get('Retry-After')
+            ))
+
+        return response
+
+    def get_backoff(self, attempt: int, retry_after: str | None = None) -> float:
+        """Return seconds to wait before the next attempt."""
+
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    delay = (retry_at - timezone.now()).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+
+            if delay is not None:
+                return min(max(delay, 0), self.max_backoff)
+
+        # "Full jitter": spread retries of concurrent workers apart.
+        return random.uniform(0, min(self.max_backoff,
+                                     self.backoff * 2 ** attempt))
+
+    def observe(self, endpoint: str, seconds: float):
+        with self._latency_lock:
+            histogram = self.latency[endpoint]
+        histogram.observe(seconds)
+
+    def latency_stats(self) -> dict:
+        with self._latency_lock:
+            histograms = dict(self.latency)
+
+        return {name: h.snapshot() for name, h in sorted(histograms.items())}
+
+    def request_access_token(self) -> tuple[str, int]:
+        """Makes request to PayPal API and returns access token together
+        with its lifetime in seconds."""
+
+        data = {'grant_type': 'client_credentials'}
+
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept-Language': 'en-US,en;q=0.5',
+        }
+
+        client_id = os.environ.get('PAYPAL_CLIENT_ID')
+        secret_id = os.environ.get('PAYPAL_SECRET_ID')
+
+        r = self.request(
+            'oauth2_token',
+            'POST',
+            '/v1/oauth2/token',
+            auth=(client_id, secret_id),
+            headers=headers,
+            data=data
+        )
+        if r.status_code != 200:
+            raise PayPalAPIException(
+                f'Access token not received: HTTP {r.status_code}'
+            )
+
+        r_content = r.json()
+        access_token = r_content['access_token']
+        expires_in = int(r_content.get('expires_in', 0))
+
+        return access_token, expires_in
+
+    def get_access_token(self) -> str:
+        return self.token_cache.get()
+
+    def api_request(self, endpoint: str, method: str, path: str,
+                    access_token: str, request_id: str | None = None,
+                    **kwargs) -> requests.Response:
+        """Send an authorized request. A rejected token is refreshed once.
+
+        Every POST carries a ``PayPal-Request-Id`` so that retries of the
+        same call are idempotent on PayPal side.
+        """
+
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+        }
+        if method == 'POST':
+            headers['PayPal-Request-Id'] = request_id or str(uuid.uuid4())
+
+        headers['Authorization'] = f'Bearer {access_token}'
+        r = self.request(endpoint, method, path, headers=headers, **kwargs)
+
+        if r.status_code == 401:
+            self.token_cache.invalidate()
+            headers['Authorization'] = f'Bearer {self.get_access_token()}'
+            r = self.request(endpoint, method, path, headers=headers, **kwargs)
+
+        return r
+
+    def get_subscription(self, access_token, sub_id) -> requests.Response:
+        return self.api_request(
+            'subscription_detail', 'GET',
+            f'/v1/billing/subscriptions/{sub_id}',
+            access_token
+        )
+
+    def get_subscription_details(self, access_token, sub_id) -> dict | None:
+        """Return subscription details, from the detail cache if possible.
+
+        Returns None when PayPal does not know the subscription or did not
+        answer successfully.
+        """
+
+        return self.detail_cache.get(
+            sub_id,
+            lambda: self.get_subscription(access_token, sub_id)
+        )
+
+    def change_subscription(self, action, access_token, sub_id,
+                            request_id=None, **kwargs) -> requests.Response:
+        """POST a subscription action and drop its cached details."""
+
+        try:
+            return self.api_request(
+                action, 'POST',
+                f'/v1/billing/subscriptions/{sub_id}/{action}',
+                access_token, request_id,
+                **kwargs
+            )
+        finally:
+            self.detail_cache.invalidate(sub_id)
+
+    def cancel_subscription(self, access_token, sub_id,
+                            request_id=None) -> requests.Response:
+        return self.change_subscription('cancel', access_token, sub_id,
+                                        request_id)
+
+    def revise_subscription(self, access_token, sub_id, plan_id,
+                            request_id=None) -> requests.Response:
+        return self.change_subscription(
+            'revise', access_token, sub_id, request_id,
+            data=json.dumps({'plan_id': plan_id})
+        )
+
+    def suspend_subscription(self, access_token, sub_id,
+                             request_id=None) -> requests.Response:
+        return self.change_subscription(
+            'suspend', access_token, sub_id, request_id,
+            data='{"reason": "Suspending the subscription"}'
+        )
+
+    def activate_subscription(self, access_token, sub_id,
+                              request_id=None) -> requests.Response:
+        return self.change_subscription(
+            'activate', access_token, sub_id, request_id,
+            data='{ "reason": "Reactivating the subscription" }'
+        )
+
+    def stats(self) -> dict:
+        return {
+            'access_token': self.token_cache.stats(),
+            'subscription_details': self.detail_cache.stats(),
+            'circuit_breaker': self.breaker.stats(),
+            'latency': self.latency_stats(),
+        }
+
+
+paypal_client = PayPalClient(
+    base_url=settings.PAYPAL_BASE_URL,
+    pool_size=settings.PAYPAL_POOL_SIZE,
+    timeouts=settings.PAYPAL_TIMEOUTS,
+    max_retries=settings.PAYPAL_MAX_RETRIES,
+    token_refresh_margin=settings.PAYPAL_TOKEN_REFRESH_MARGIN,
+    circuit_breaker=settings.PAYPAL_CIRCUIT_BREAKER,
+    detail_cache_ttl=settings.PAYPAL_SUBSCRIPTION_CACHE_TTL,
+    detail_not_found_ttl=settings.PAYPAL_SUBSCRIPTION_NOT_FOUND_TTL
+)
+token_cache = paypal_client.token_cache
 
-    url = 'https://api-m.sandbox.paypal.com/v1/oauth2/token'
-    client_id = os.environ.get('PAYPAL_CLIENT_ID')
-    secret_id = os.environ.get('PAYPAL_SECRET_ID')
 
-    r = requests.post(
-        url,
-        auth=(client_id, secret_id),
-        headers=headers,
-        data=data
-    )
-    r_content = r.json()
-    access_token = r_content['access_token']
+def get_access_token() -> str:
+    """Return cached PayPal access token, requesting a new one only when
+    the cached token is about to expire."""
 
-    return access_token
+    return paypal_client.get_access_token()
 
 
 def cancel_subscription_paypal(access_token, sub_id):
     """Cancel subscription on PayPal side."""
 
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': 'Bearer ' + access_token,
-        'Accept': 'application/json'
-    }
-    url = (f'https://api-m.sandbox.paypal.com/v1/billing/subscriptions/'
-           f'{sub_id}/cancel')
-
-    r = requests.post(url, headers=headers)
+    r = paypal_client.cancel_subscription(access_token, sub_id)
 
     if r.status_code == 204:
         return True
@@ -58,27 +330,14 @@ def cancel_subscription_paypal(access_token, sub_id):
 
 def update_subscription_paypal(access_token, sub_id):
 
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': 'Bearer ' + access_token,
-        'Accept': 'application/json'
-    }
-
     subscription = Subscription.objects.get(paypal_subscription_id=sub_id)
-    current_sub_plan = subscription.subscription_plan
+    current_sub_plan = plan_catalog.by_id(subscription.subscription_plan_id)
 
-    if current_sub_plan.name == 'standard':
-        plan = SubscriptionPlan.objects.get(name='premium')
-    else:
-        plan = SubscriptionPlan.objects.get(name='standard')
+    plan = plan_catalog.switch_plan(current_sub_plan)
 
     new_sub_plan_id = plan.paypal_plan_id
 
-    url = (f'https://api-m.sandbox.paypal.com/v1/billing/subscriptions/'
-           f'{sub_id}/revise')
-    revision_data = {'plan_id': new_sub_plan_id}
-
-    r = requests.post(url, headers=headers, data=json.dumps(revision_data))
+    r = paypal_client.revise_subscription(access_token, sub_id, new_sub_plan_id)
     r_content = r.json()
 
     approve_link = None
@@ -94,17 +353,10 @@ def update_subscription_paypal(access_token, sub_id):
 def get_current_subscription_plan(access_token: str, sub_id: str) -> str | None:
     """Make request to PayPal and return current subscription plan ID."""
 
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-    }
-    url = f'https://api-m.sandbox.paypal.com/v1/billing/subscriptions/{sub_id}'
+    subscription_data = paypal_client.get_subscription_details(access_token,
+                                                               sub_id)
 
-    r = requests.get(url, headers=headers)
-
-    if r.status_code == 200:
-        subscription_data = r.json()
+    if subscription_data is not None:
         current_plan_id = subscription_data.get('plan_id')
 
         return current_plan_id
@@ -116,16 +368,7 @@ def get_current_subscription_plan(access_token: str, sub_id: str) -> str | None:
 def deactivate_subscription_paypal(access_token, sub_id):
     """Deactivate subscription on PayPal side."""
 
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-    }
-
-    data = '{"reason": "Suspending the subscription"}'
-    url = f'https://api-m.sandbox.paypal.com/v1/billing/subscriptions/{sub_id}/suspend'
-
-    response = requests.post(url, headers=headers, data=data)
+    response = paypal_client.suspend_subscription(access_token, sub_id)
 
     return response.status_code
 
@@ -133,15 +376,6 @@ def deactivate_subscription_paypal(access_token, sub_id):
 def activate_subscription_paypal(access_token, sub_id):
     """Activate subscription on PayPal side."""
 
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-    }
-
-    data = '{ "reason": "Reactivating the subscription" }'
-    url = f'https://api-m.sandbox.paypal.com/v1/billing/subscriptions/{sub_id}/activate'
-
-    response = requests.post(url, headers=headers, data=data)
+    response = paypal_client.activate_subscription(access_token, sub_id)
 
     return response.status_code
@@ -0,0 +1,233 @@
+"""
+Bulk migration of subscribers between plans.
+
+Every subscription of the source plan gets a PlanMigrationItem. Items are
+then revised on PayPal from a thread pool under a global rate limit and,
+once PayPal reports the new plan, confirmed and moved to the target plan
+locally. Progress lives in the items, so an interrupted run resumes where
+it stopped. Revisions carry the item's request id as PayPal-Request-Id,
+which makes a revision repeated after a crash idempotent.
+
+Subscribers approve the change on PayPal through the approve link of their
+item, offered on their account page; items not approved in time fail.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from client.entitlements import invalidate_entitlements
+from client.exceptions import PayPalAPIException, PayPalUnavailableException
+from client.models import (PlanMigration, PlanMigrationItem, Subscription,
+                           SubscriptionPlan)
+from client.paypal import paypal_client
+from client.reconcile import RateLimiter
+
+Status = PlanMigrationItem.Status
+
+
+def start_migration(from_plan: SubscriptionPlan, to_plan: SubscriptionPlan,
+                    chunk_size: int = 1000) -> PlanMigration:
+    """Create a migration with an item per subscription of `from_plan`."""
+
+    with transaction.atomic():
+        migration = PlanMigration.objects.create(from_plan=from_plan,
+                                                 to_plan=to_plan)
+        queryset = Subscription.objects.filter(
+            subscription_plan=from_plan
+        ).order_by('pk').values_list('pk', 'paypal_subscription_id')
+        after_pk = 0
+
+        while chunk := list(queryset.filter(pk__gt=after_pk)[:chunk_size]):
+            PlanMigrationItem.objects.bulk_create([
+                PlanMigrationItem(migration=migration,
+                                  subscription_id=pk,
+                                  paypal_subscription_id=sub_id)
+                for pk, sub_id in chunk
+            ])
+            after_pk = chunk[-1][0]
+
+    return migration
+
+
+def iter_items(migration: PlanMigration, status: str, chunk_size: int):
+    """Yield items of the migration in the given status, in chunks."""
+
+    queryset = migration.items.filter(status=status).order_by('pk')
+    after_pk = 0
+
+    while chunk := list(queryset.filter(pk__gt=after_pk)[:chunk_size]):
+        yield chunk
+        after_pk = chunk[-1].pk
+
+
+def revise_item(item: PlanMigrationItem, to_plan: SubscriptionPlan,
+                limiter: RateLimiter, max_attempts: int) -> PlanMigrationItem:
+    """Ask PayPal to move the subscription to `to_plan`.
+
+    Runs in a pool thread and only changes the item in memory. Items that
+    hit a transient failure stay pending until `max_attempts` is reached.
+    """
+
+    close_old_connections()
+    try:
+        limiter.acquire()
+        access_token = paypal_client.get_access_token()
+        r = paypal_client.revise_subscription(
+            access_token,
+            item.paypal_subscription_id,
+            to_plan.paypal_plan_id,
+            request_id=str(item.request_id)
+        )
+    except PayPalUnavailableException as e:
+        item.last_error = str(e)
+        return item
+    except (requests.RequestException, PayPalAPIException) as e:
+        return fail_attempt(item, f'{type(e).__name__}: {e}', max_attempts)
+    finally:
+        close_old_connections()
+
+    if r.status_code == 200:
+        item.status = Status.REVISED
+        item.revised_at = timezone.now()
+        item.approve_link = next(
+            (link['href'] for link in r.json().get('links', [])
+             if link.get('rel') == 'approve'),
+            ''
+        )
+        item.last_error = ''
+    elif r.status_code in paypal_client.retry_statuses:
+        fail_attempt(item, f'HTTP {r.status_code}', max_attempts)
+    else:
+        item.status = Status.FAILED
+        item.last_error = f'HTTP {r.status_code}: {r.text[:1000]}'
+
+    return item
+
+
+def confirm_item(item: PlanMigrationItem, to_plan: SubscriptionPlan,
+                 limiter: RateLimiter,
+                 revised_before: datetime) -> PlanMigrationItem:
+    """Confirm the item once PayPal reports the target plan.
+
+    Runs in a pool thread. Subscriptions whose customer has not approved
+    the change yet stay revised, unless revised before `revised_before`:
+    those fail.
+    """
+
+    close_old_connections()
+    try:
+        limiter.acquire()
+        access_token = paypal_client.get_access_token()
+        r = paypal_client.get_subscription(access_token,
+                                           item.paypal_subscription_id)
+    except (requests.RequestException, PayPalAPIException) as e:
+        item.last_error = f'{type(e).__name__}: {e}'
+        return item
+    finally:
+        close_old_connections()
+
+    if (r.status_code == 200 and
+            r.json().get('plan_id') == to_plan.paypal_plan_id):
+        item.status = Status.CONFIRMED
+        item.last_error = ''
+    elif r.status_code != 200:
+        item.last_error = f'HTTP {r.status_code}'
+    elif item.revised_at is not None and item.revised_at < revised_before:
+        item.status = Status.FAILED
+        item.last_error = 'Change not approved in time.'
+
+    return item
+
+
+def fail_attempt(item, error, max_attempts) -> PlanMigrationItem:
+    item.attempts += 1
+    item.last_error = error
+    if item.attempts >= max_attempts:
+        item.status = Status.FAILED
+
+    return item
+
+
+def save_items(items: list[PlanMigrationItem], to_plan: SubscriptionPlan):
+    """Store progress of processed items and move confirmed subscriptions."""
+
+    now = timezone.now()
+    for item in items:
+        item.updated_at = now
+
+    confirmed = [item.subscription_id for item in items
+                 if item.status == Status.CONFIRMED and item.subscription_id]
+
+    with transaction.atomic():
+        PlanMigrationItem.objects.bulk_update(
+            items,
+            ['status', 'attempts', 'approve_link', 'revised_at', 'last_error',
+             'updated_at']
+        )
+        # All confirmed subscriptions move to the same plan: one UPDATE.
+        moved = Subscription.objects.filter(pk__in=confirmed)
+        if confirmed:
+            invalidate_entitlements(*moved.values_list('user_id', flat=True))
+        moved.update(subscription_plan=to_plan)
+
+    paypal_client.detail_cache.invalidate(
+        *(item.paypal_subscription_id for item in items)
+    )
+
+
+def process(migration: PlanMigration, status: str,
+            executor: ThreadPoolExecutor, limiter: RateLimiter,
+            chunk_size: int, max_attempts: int = 3,
+            approval_time: timedelta = timedelta(days=30)):
+    """Revise pending or confirm revised items, chunk by chunk. Revised
+    items not approved within `approval_time` fail.
+
+    Yields the processed items of every chunk after it has been saved.
+    """
+
+    to_plan = migration.to_plan
+
+    if status == Status.PENDING:
+        def work(item):
+            return revise_item(item, to_plan, limiter, max_attempts)
+    else:
+        revised_before = timezone.now() - approval_time
+
+        def work(item):
+            return confirm_item(item, to_plan, limiter, revised_before)
+
+    for chunk in iter_items(migration, status, chunk_size):
+        items = list(executor.map(work, chunk))
+        save_items(items, to_plan)
+        yield items
+
+
+def awaiting_approval(subscription: Subscription) -> PlanMigrationItem | None:
+    """The revised item of the subscription the subscriber has to approve
+    on PayPal, if any."""
+
+    return PlanMigrationItem.objects.select_related(
+        'migration__to_plan'
+    ).filter(
+        subscription=subscription,
+        status=Status.REVISED
+    ).exclude(approve_link='').order_by('-pk').first()
+
+
+def progress(migration: PlanMigration) -> dict[str, int]:
+    """Number of items of the migration per status."""
+
+    counts = dict.fromkeys(Status.values, 0)
+    rows = migration.items.order_by().values('status').annotate(
+        count=Count('pk')
+    )
+    for row in rows:
+        counts[row['status']] = row['count']
+
+    return counts
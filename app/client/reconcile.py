@@ -0,0 +1,184 @@
+"""
+Bulk reconciliation of local subscriptions against their state on PayPal.
+
+Subscriptions are read in primary key order, chunk by chunk, and their
+PayPal details are fetched from a thread pool under a global rate limit.
+Corrections of a chunk are written with one `bulk_update` per drifted
+field, limited to the subscriptions where that field drifted, so changes
+made meanwhile (by webhooks or views) to other rows and fields are kept.
+"""
+
+import logging
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from client.catalog import plan_catalog
+from client.entitlements import invalidate_entitlements
+from client.exceptions import PayPalAPIException
+from client.models import Subscription
+from client.paypal import paypal_client
+from client.webhooks import ACTIVE_STATUSES, INACTIVE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Token bucket shared by threads: at most `rate` calls per second."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call is allowed."""
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+def iter_chunks(chunk_size: int, since: timedelta | None = None,
+                after_pk: int = 0):
+    """Yield subscriptions in chunks, ordered by primary key.
+
+    With `since`, only subscriptions not reconciled within that period
+    are yielded. Subscriptions with a pending PayPal operation are skipped,
+    the worker is about to change them anyway.
+    """
+
+    queryset = Subscription.objects.filter(pending_action='').order_by('pk')
+
+    if since is not None:
+        queryset = queryset.filter(
+            Q(last_reconciled_at__isnull=True) |
+            Q(last_reconciled_at__lt=timezone.now() - since)
+        )
+
+    while True:
+        chunk = list(queryset.filter(pk__gt=after_pk)[:chunk_size])
+        if not chunk:
+            return
+
+        yield chunk
+        after_pk = chunk[-1].pk
+
+
+def fetch_details(subscription: Subscription, limiter: RateLimiter) -> dict:
+    """Return PayPal details of the subscription.
+
+    Runs in a pool thread. Failures are returned as {'error': ...}.
+    """
+
+    close_old_connections()
+    try:
+        limiter.acquire()
+        access_token = paypal_client.get_access_token()
+        r = paypal_client.get_subscription(
+            access_token, subscription.paypal_subscription_id
+        )
+    except (requests.RequestException, PayPalAPIException) as e:
+        return {'error': f'{type(e).__name__}: {e}'}
+    finally:
+        close_old_connections()
+
+    if r.status_code == 404:
+        return {'error': 'not found on PayPal'}
+
+    if r.status_code != 200:
+        return {'error': f'HTTP {r.status_code}'}
+
+    return r.json()
+
+
+def diff(subscription: Subscription, details: dict) -> dict:
+    """Return {field: (local, paypal)} of the fields that drifted."""
+
+    changes = {}
+    status = details.get('status')
+
+    if status in ACTIVE_STATUSES and not subscription.is_active:
+        changes['is_active'] = (False, True)
+    elif status in INACTIVE_STATUSES and subscription.is_active:
+        changes['is_active'] = (True, False)
+
+    plan = plan_catalog.by_paypal_id(details.get('plan_id'))
+    if plan is not None and plan.pk != subscription.subscription_plan_id:
+        changes['subscription_plan'] = (
+            plan_catalog.by_id(subscription.subscription_plan_id), plan
+        )
+
+    return changes
+
+
+def reconcile_chunk(chunk: list[Subscription], executor: ThreadPoolExecutor,
+                    limiter: RateLimiter,
+                    dry_run: bool = False) -> tuple[list, list]:
+    """Reconcile a chunk of subscriptions.
+
+    Returns drifts as (subscription, changes) and errors as
+    (subscription, message). Unless `dry_run`, drifted fields are
+    corrected and reconciled subscriptions are stamped with the time.
+    """
+
+    drifts = []
+    errors = []
+    checked = []
+    drifted_by_field = {}
+    now = timezone.now()
+
+    results = executor.map(lambda s: fetch_details(s, limiter), chunk)
+
+    for subscription, details in zip(chunk, results):
+        if 'error' in details:
+            errors.append((subscription, details['error']))
+            continue
+
+        changes = diff(subscription, details)
+        if changes:
+            drifts.append((subscription, changes))
+
+        for field, (_, value) in changes.items():
+            setattr(subscription, field, value)
+            drifted_by_field.setdefault(field, []).append(subscription)
+
+        subscription.last_reconciled_at = now
+        checked.append(subscription)
+
+    if not dry_run:
+        for field, subscriptions in drifted_by_field.items():
+            Subscription.objects.bulk_update(subscriptions, [field])
+        Subscription.objects.filter(
+            pk__in=[s.pk for s in checked]
+        ).update(last_reconciled_at=now)
+        invalidate_entitlements(*(s.user_id for s, _ in drifts))
+
+    for subscription, message in errors:
+        logger.warning('Failed to reconcile subscription %s: %s',
+                       subscription.paypal_subscription_id, message)
+
+    return drifts, errors
@@ -0,0 +1,76 @@
+"""
+Signal handlers of the client app.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from client.catalog import plan_catalog
+from client.entitlements import invalidate_entitlements
+from client.listing_cache import LISTED_FIELDS, article_tiers, listing_cache
+from client.models import Subscription, SubscriptionPlan
+from client.trending import forget_trending
+from writer.models import Article
+
+
+@receiver([post_save, post_delete], sender=SubscriptionPlan)
+def invalidate_plan_catalog(**kwargs):
+    """Reload plans on the next lookup.
+
+    Invalidated again on commit, so that a lookup made meanwhile by another
+    thread does not keep the plans of before the change.
+    """
+
+    plan_catalog.invalidate(shared=True)
+    transaction.on_commit(lambda: plan_catalog.invalidate(shared=True))
+
+
+@receiver([post_save, post_delete], sender=Subscription)
+def invalidate_subscriber_entitlement(instance, **kwargs):
+    invalidate_entitlements(instance.user_id)
+
+
+@receiver(pre_save, sender=Article)
+def remember_article_tiers(instance, update_fields=None, **kwargs):
+    """Note the tiers listing the article before the change."""
+
+    instance._listed_tiers = set()
+
+    if instance.pk is not None and is_listing_change(update_fields):
+        required_tier = Article.objects.filter(
+            pk=instance.pk
+        ).values_list('required_tier', flat=True).first()
+
+        if required_tier is not None:
+            instance._listed_tiers = article_tiers(required_tier)
+
+
+@receiver(post_save, sender=Article)
+def invalidate_listings_on_save(instance, update_fields=None, **kwargs):
+    """Drop cached listings of tiers showing the article before or after
+    the change, and its trending entries, which keep its title and tier;
+    not needed when no listed field was saved."""
+
+    tiers = instance.__dict__.pop('_listed_tiers', set())
+
+    if is_listing_change(update_fields):
+        invalidate_listings(tiers | article_tiers(instance.required_tier))
+        forget_trending(instance)
+
+
+@receiver(post_delete, sender=Article)
+def invalidate_listings_on_delete(instance, **kwargs):
+    invalidate_listings(article_tiers(instance.required_tier))
+
+
+def is_listing_change(update_fields) -> bool:
+    return update_fields is None or bool(LISTED_FIELDS & set(update_fields))
+
+
+def invalidate_listings(tiers):
+    """Drop cached listings of the tiers, again on commit, so that a page
+    rendered meanwhile from data of before the change is not kept."""
+
+    listing_cache.invalidate(*tiers)
+    transaction.on_commit(lambda: listing_cache.invalidate(*tiers))
@@ -0,0 +1,163 @@
+"""
+Tests for title autocompletion.
+Command: pytest client/tests/test_autocomplete.py --cov=client --cov-report term-missing:skip-covered
+"""
+
+import pytest
+
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.shortcuts import reverse
+
+from client.autocomplete import normalize, suggest_titles
+from client.tiers import BASIC_TIER, PREMIUM_TIER
+from writer.models import Article, TitleWord
+
+pytestmark = pytest.mark.django_db
+
+
+def titles(results) -> list:
+    return [r['title'] for r in results]
+
+
+def test_normalize():
+    """Test typed text is lowercased with whitespace collapsed."""
+
+    assert normalize('  Deep   Ocean ') == 'deep ocean'
+    assert len(normalize('x' * 100)) == 64
+
+
+def test_suggest_titles_prefix_first(user_writer, article):
+    """Test titles starting with the text come before other matches."""
+
+    article(user_writer, title='Under the ocean')
+    article(user_writer, title='Ocean tides')
+    article(user_writer, title='Mountains')
+
+    results = suggest_titles(PREMIUM_TIER, 'oce')
+
+    assert titles(results) == ['Ocean tides', 'Under the ocean']
+    assert results[0]['url'] == reverse('client:article_detail',
+                                        args=['ocean-tides'])
+
+
+def test_suggest_titles_fuzzy(user_writer, article):
+    """Test a misspelled word still finds similar titles."""
+
+    article(user_writer, title='Lighthouse keeper')
+
+    assert titles(suggest_titles(PREMIUM_TIER, 'lihgthouse')) == [
+        'Lighthouse keeper'
+    ]
+
+
+def test_suggest_titles_all_words(user_writer, article):
+    """Test titles contain every typed word, the last one as a prefix."""
+
+    article(user_writer, title='Deep blue ocean')
+    article(user_writer, title='Ocean of stars')
+
+    assert titles(suggest_titles(PREMIUM_TIER, 'blue oce')) == [
+        'Deep blue ocean'
+    ]
+    assert suggest_titles(PREMIUM_TIER, 'red oce') == []
+
+
+def test_saved_titles_add_words(user_writer, article):
+    """Test words of edited titles are suggested right away."""
+
+    a = article(user_writer, title='Garden notes')
+    a.title = 'Garden lanterns'
+    a.save(update_fields=['title'])
+
+    assert set(TitleWord.objects.values_list('word', flat=True)) == {
+        'GARDEN', 'NOTES', 'LANTERNS'
+    }
+    assert titles(suggest_titles(PREMIUM_TIER, 'lant')) == ['Garden lanterns']
+
+
+def test_suggest_titles_respects_tier(user_writer, article):
+    """Test standard tier gets no premium titles."""
+
+    article(user_writer, title='Free garden')
+    article(user_writer, title='Premium garden', required_tier=PREMIUM_TIER)
+
+    assert titles(suggest_titles(BASIC_TIER, 'garden')) == ['Free garden']
+    assert len(suggest_titles(PREMIUM_TIER, 'garden')) == 2
+
+
+def test_suggest_titles_too_short():
+    """Test text shorter than the minimum length is not looked up."""
+
+    with patch('client.autocomplete.autocomplete_titles') as mock_titles:
+        assert suggest_titles(PREMIUM_TIER, ' o ') == []
+
+    mock_titles.assert_not_called()
+
+
+def test_suggest_titles_cached_per_tier():
+    """Test suggestions are cached per tier and normalized text."""
+
+    with patch('client.autocomplete.autocomplete_titles',
+               return_value=[('Ocean tides', 'ocean-tides')]) as mock_titles:
+        suggest_titles(PREMIUM_TIER, 'Ocean')
+        suggest_titles(PREMIUM_TIER, ' ocean ')
+        suggest_titles(BASIC_TIER, 'ocean')
+
+    assert mock_titles.call_count == 2
+
+
+def test_autocomplete_view(client, sample_user, subscription, standard,
+                           user_writer, article):
+    """Test the endpoint returns suggestions of the user's tier as JSON."""
+
+    subscription(user=sample_user, plan=standard)
+    article(user_writer, title='River stones')
+    article(user_writer, title='River secrets', required_tier=PREMIUM_TIER)
+    client.force_login(sample_user)
+
+    r = client.get(reverse('client:autocomplete_articles'), {'q': 'riv'})
+
+    assert r.status_code == 200
+    assert titles(r.json()['results']) == ['River stones']
+
+
+def test_autocomplete_view_without_subscription(client, sample_user):
+    """Test users without subscription get no suggestions."""
+
+    client.force_login(sample_user)
+
+    r = client.get(reverse('client:autocomplete_articles'), {'q': 'riv'})
+
+    assert r.json() == {'results': []}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bench_autocomplete_command(capsys, settings):
+    """Test the benchmark runs and cleans up after itself."""
+
+    settings.BENCHMARK_DATABASE = True
+    call_command('bench_autocomplete', articles=50, queries=10,
+                 concurrency=2, target_ms=1000)
+    out = capsys.readouterr().out
+
+    assert 'miss' in out and 'hit' in out
+    assert 'p95' in out
+    assert not Article.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bench_autocomplete_command_fails_over_target(settings):
+    """Test the benchmark fails when cache misses are slower than the
+    target."""
+
+    settings.BENCHMARK_DATABASE = True
+
+    with pytest.raises(CommandError, match='exceeds 0 ms'):
+        call_command('bench_autocomplete', articles=50, queries=10,
+                     target_ms=0, stdout=StringIO())
+
+    assert not Article.objects.exists()
@@ -0,0 +1,81 @@
+"""
+Tests for the subscription plan catalog.
+Command: pytest client/tests/test_catalog.py --cov=client --cov-report term-missing:skip-covered
+"""
+
+import pytest
+
+from django.core.cache import cache
+
+from client.catalog import PlanCatalog, VERSION_KEY, plan_catalog
+from client.models import SubscriptionPlan
+from client.tiers import PREMIUM_TIER
+
+pytestmark = pytest.mark.django_db
+
+
+def test_catalog_lookups_without_queries(
+        standard, premium, django_assert_num_queries
+):
+    """Test plans are loaded once and then served from memory."""
+
+    plan_catalog.all()
+
+    with django_assert_num_queries(0):
+        assert plan_catalog.all() == [standard, premium]
+        assert plan_catalog.by_id(standard.pk) == standard
+        assert plan_catalog.by_name('premium') == premium
+        assert plan_catalog.by_paypal_id(premium.paypal_plan_id) == premium
+        assert plan_catalog.by_name('business') is None
+
+
+def test_catalog_invalidated_on_save(standard):
+    """Test a changed plan is reloaded."""
+
+    assert float(plan_catalog.by_name('standard').cost) == 4.90
+
+    standard.cost = 5.90
+    standard.save()
+
+    assert float(plan_catalog.by_name('standard').cost) == 5.90
+
+
+def test_catalog_invalidated_on_delete(standard, premium):
+    """Test a deleted plan is no longer served."""
+
+    plan_catalog.all()
+    premium.delete()
+
+    assert plan_catalog.all() == [standard]
+    assert plan_catalog.by_name('premium') is None
+
+
+def test_catalog_reloaded_after_change_in_other_process(
+        standard, django_assert_num_queries
+):
+    """Test catalog of another process notices the shared version bump."""
+
+    other_process = PlanCatalog(check_interval=0)
+    other_process.all()
+
+    with django_assert_num_queries(0):
+        other_process.all()
+
+    SubscriptionPlan.objects.create(paypal_plan_id='P-BUSINESS',
+                                    name='business', cost=19.90)
+
+    assert cache.get(VERSION_KEY) is not None
+    assert other_process.by_name('business') is not None
+
+
+def test_catalog_switch_plan(standard, premium):
+    """Test plans switch to the next tier up, the top tier to the lowest."""
+
+    business = SubscriptionPlan.objects.create(
+        paypal_plan_id='P-BUSINESS', name='business', cost=19.90,
+        tier=PREMIUM_TIER + 1
+    )
+
+    assert plan_catalog.switch_plan(standard) == premium
+    assert plan_catalog.switch_plan(premium) == business
+    assert plan_catalog.switch_plan(business) == standard
@@ -5,8 +5,12 @@ Command: pytest client/tests/test_client_models.py --cov=client --cov-report=ter
 
 import pytest
 
+from django.db import connection
+
 from client.models import Subscription, SubscriptionPlan
 
+from writer.models import BASIC_TIER
+
 pytestmark = pytest.mark.django_db
 
 
@@ -68,3 +72,17 @@ def test_create_premium_subscription_active_success(sample_user, premium):
     assert subscription.subscription_plan == premium
     assert subscription.subscription_plan.cost == premium.cost
     assert subscription.is_active == True
+
+
+def test_plan_inserted_without_tier_is_basic():
+    """Test plans inserted by the previous release, which does not know
+    the tier column, get the basic tier from the database."""
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO client_subscriptionplan '
+            '(paypal_plan_id, name, cost) VALUES (%s, %s, %s)',
+            ['P-OLD', 'old', 4.99]
+        )
+
+    assert SubscriptionPlan.objects.get(name='old').tier == BASIC_TIER
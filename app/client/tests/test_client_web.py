@@ -3,14 +3,25 @@ Tests for client web pages.
 Command: pytest client/tests/test_client_web.py --cov=client --cov-report term-missing:skip-covered
 """
 
+import json
+
+from datetime import timedelta
+
 import pytest
 
+from django.db import connection
 from django.shortcuts import reverse
 from django.contrib.messages import get_messages
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from unittest.mock import patch
 
-from client.models import Subscription
+from client.exceptions import PayPalUnavailableException
+from client.models import (Subscription, SubscriptionPlan, PayPalAction,
+                           PayPalOperation)
+from writer.models import (BASIC_TIER, PREMIUM_TIER, Article,
+                           RelatedArticlesModel)
 
 pytestmark = pytest.mark.django_db
 
@@ -47,10 +58,12 @@ def test_get_dashboard_writer_redirect_to_writer_dashboard(client, user_writer):
                                     kwargs={'writer_id': user_writer.id})
 
 
-def test_article_detail_get_success(client, sample_user, user_writer, article):
+def test_article_detail_get_success(client, sample_user, user_writer, article,
+                                    subscription, standard):
 
     payload = {'title': 'Sample Article'}
     a = article(user_writer, **payload)
+    subscription(user=sample_user, plan=standard)
 
     client.force_login(sample_user)
     r = client.get(reverse('client:article_detail', kwargs={'slug': a.slug}))
@@ -63,7 +76,185 @@ def test_article_detail_get_success(client, sample_user, user_writer, article):
     assert a.content in page_content
 
 
-def test_sub_plans_page_renders_correct_template(client, sample_user):
+def test_article_detail_single_query(client, sample_user, user_writer,
+                                     article, subscription, standard):
+    """Test the article and its author are loaded by one query."""
+
+    a = article(user_writer)
+    subscription(user=sample_user, plan=standard)
+    client.force_login(sample_user)
+
+    with CaptureQueriesContext(connection) as queries:
+        r = client.get(reverse('client:article_detail', kwargs={'slug': a.slug}))
+
+    article_queries = [q['sql'] for q in queries
+                       if 'FROM "writer_article"' in q['sql']]
+
+    assert user_writer.first_name in r.content.decode('utf-8')
+    assert len(article_queries) == 1
+    assert 'JOIN' in article_queries[0]
+
+
+def test_article_detail_shows_rendered_content(client, sample_user, user_writer,
+                                             article, subscription, standard):
+    """Test the stored HTML is output without rendering per request."""
+
+    a = article(user_writer, content='Some **bold** words')
+    subscription(user=sample_user, plan=standard)
+    client.force_login(sample_user)
+
+    with patch('writer.rendering.render_content') as mock_render:
+        r = client.get(reverse('client:article_detail',
+                               kwargs={'slug': a.slug}))
+
+    mock_render.assert_not_called()
+    assert '<strong>bold</strong>' in r.content.decode('utf-8')
+
+
+def test_article_detail_not_modified(client, sample_user, user_writer,
+                                     article, subscription, standard):
+    """Test repeat visits are answered with 304 until the article changes."""
+
+    a = article(user_writer)
+    subscription(user=sample_user, plan=standard)
+    url = reverse('client:article_detail', kwargs={'slug': a.slug})
+    client.force_login(sample_user)
+
+    r = client.get(url)
+
+    assert r.status_code == 200
+    assert 'private' in r['Cache-Control']
+
+    etag, last_modified = r['ETag'], r['Last-Modified']
+
+    r = client.get(url, headers={'If-None-Match': etag})
+
+    assert r.status_code == 304
+    assert r['ETag'] == etag
+    assert not r.content
+
+    r = client.get(url, headers={'If-Modified-Since': last_modified})
+
+    assert r.status_code == 304
+
+    a.title = 'Changed title'
+    a.save()
+    r = client.get(url, headers={'If-None-Match': etag})
+
+    assert r.status_code == 200
+    assert r['ETag'] != etag
+
+
+def test_article_detail_etag_per_user(client, sample_user, user, user_writer,
+                                      article, subscription, standard):
+    """Test a page rendered for one user is not reused for another."""
+
+    a = article(user_writer)
+    other_user = user(email='other@example.com')
+    subscription(user=sample_user, plan=standard)
+    subscription(user=other_user, plan=standard,
+                 paypal_subscription_id='I-OTHER')
+    url = reverse('client:article_detail', kwargs={'slug': a.slug})
+    client.force_login(sample_user)
+    etag = client.get(url)['ETag']
+
+    client.force_login(other_user)
+    r = client.get(url, headers={'If-None-Match': etag})
+
+    assert r.status_code == 200
+
+
+def test_article_detail_etag_per_tier_and_related_build(
+        client, sample_user, user_writer, article, subscription, standard,
+        premium
+):
+    """Test pages are rendered again when the plan tier changes, or the
+    related articles are rebuilt."""
+
+    a = article(user_writer)
+    sbn = subscription(user=sample_user, plan=standard)
+    url = reverse('client:article_detail', kwargs={'slug': a.slug})
+    client.force_login(sample_user)
+    etag = client.get(url)['ETag']
+
+    sbn.subscription_plan = premium
+    sbn.save()
+    r = client.get(url, headers={'If-None-Match': etag})
+
+    assert r.status_code == 200
+    assert r['ETag'] != etag
+
+    etag, last_modified = r['ETag'], r['Last-Modified']
+    RelatedArticlesModel.objects.create(
+        built_at=timezone.now() + timedelta(seconds=2),
+        scored_until=timezone.now() + timedelta(seconds=2),
+        data=b''
+    )
+
+    r = client.get(url, headers={'If-None-Match': etag})
+    assert r.status_code == 200
+    assert r['ETag'] != etag
+
+    r = client.get(url, headers={'If-Modified-Since': last_modified})
+    assert r.status_code == 200
+
+
+def test_article_detail_body_cached(client, sample_user, user_writer,
+                                    article, subscription, standard):
+    """Test the body is rendered once per article version."""
+
+    a = article(user_writer, content='Original body')
+    subscription(user=sample_user, plan=standard)
+    url = reverse('client:article_detail', kwargs={'slug': a.slug})
+    client.force_login(sample_user)
+    client.get(url)
+
+    # Same version: the cached body is served.
+    Article.objects.filter(pk=a.pk).update(content='Sneaky body')
+    assert 'Original body' in client.get(url).content.decode('utf-8')
+
+    a.refresh_from_db()
+    a.content = 'Edited body'
+    a.save()
+    assert 'Edited body' in client.get(url).content.decode('utf-8')
+
+
+@pytest.mark.parametrize(
+    'sub_plan,status_code',
+    [('standard', 404), ('premium', 200)]
+)
+def test_article_detail_requires_tier(
+        sub_plan, status_code, client, sample_user, user_writer, article,
+        subscription, request
+):
+    """Test premium articles are shown to plans of the premium tier only."""
+
+    plan = request.getfixturevalue(sub_plan)
+    subscription(user=sample_user, plan=plan)
+    a = article(user_writer, required_tier=PREMIUM_TIER)
+    client.force_login(sample_user)
+
+    r = client.get(reverse('client:article_detail', kwargs={'slug': a.slug}))
+
+    assert r.status_code == status_code
+
+
+def test_article_detail_own_article_without_subscription(
+        client, user_writer, article
+):
+    """Test writers read their own articles without a subscription."""
+
+    a = article(user_writer, required_tier=PREMIUM_TIER)
+    client.force_login(user_writer)
+
+    r = client.get(reverse('client:article_detail', kwargs={'slug': a.slug}))
+
+    assert r.status_code == 200
+
+
+def test_sub_plans_page_renders_correct_template(
+        client, sample_user, standard, premium
+):
     """Test subscription plan page renders correct template with
     the information about subscription plans."""
 
@@ -74,8 +265,24 @@ def test_sub_plans_page_renders_correct_template(client, sample_user):
     assert r.status_code == 200
     assert 'Standard subscription' in page_content
     assert 'Premium subscription' in page_content
-    assert 'id="paypal-button-container-P-9EN41519BU401782AM7HQXXI"' in page_content
-    assert 'id="paypal-button-container-P-2JB54269VP863135RM7HQZFY"' in page_content
+    assert f'id="paypal-button-container-{standard.paypal_plan_id}"' in page_content
+    assert f'id="paypal-button-container-{premium.paypal_plan_id}"' in page_content
+    assert '$4.90' in page_content and '$9.90' in page_content
+
+
+def test_sub_plans_page_renders_new_plan(client, sample_user, standard):
+    """Test a plan added in the admin shows up without a template change."""
+
+    client.force_login(sample_user)
+    client.get(reverse('client:subscription_plans'))
+
+    SubscriptionPlan.objects.create(paypal_plan_id='P-BUSINESS',
+                                    name='business', cost=19.90)
+
+    r = client.get(reverse('client:subscription_plans'))
+
+    assert 'Business subscription' in r.content.decode('utf-8')
+    assert 'paypal-button-container-P-BUSINESS' in r.content.decode('utf-8')
 
 
 @pytest.mark.parametrize(
@@ -173,9 +380,10 @@ def test_delete_subscription_view_renders_correct_template(
         standard
 ):
     """Test delete subscription view renders correct template
-    when subscription is not deleted."""
+    when another change of the subscription is in progress."""
 
-    sbn = subscription(user=sample_user, plan=standard)
+    sbn = subscription(user=sample_user, plan=standard,
+                       pending_action=PayPalAction.SUSPEND)
     client.force_login(sample_user)
 
     r = client.get(reverse(
@@ -185,38 +393,37 @@ def test_delete_subscription_view_renders_correct_template(
 
     assert r.status_code == 200
     assert 'Delete Subscription' in r.context['title']
-    assert 'is_deleted' in r.context
-    assert r.context['is_deleted'] is False
+    assert 'is_pending' in r.context
+    assert r.context['is_pending'] is False
     assert 'Something went wrong!' in r.content.decode('utf-8')
+    assert not PayPalOperation.objects.exists()
 
 
-@patch('client.views.cancel_subscription_paypal')
-@patch('client.views.get_access_token')
 def test_delete_subscription_success(
-        mocked_access_token,
-        mocked_paypal,
         client,
         sample_user,
         subscription,
         standard
 ):
-    """Test delete subscription successfully."""
+    """Test delete subscription queues cancellation on PayPal."""
 
     sbn = subscription(user=sample_user, plan=standard)
     client.force_login(sample_user)
-    mocked_paypal.return_value = True
 
     r = client.get(reverse(
         'client:delete_subscription',
         kwargs={'subID': sbn.paypal_subscription_id})
     )
 
-    assert r.status_code == 200
-    assert r.context['is_deleted'] == True
-
-    subscriptions = Subscription.objects.filter(user=sample_user)
+    sbn.refresh_from_db()
 
-    assert subscriptions.exists() == False
+    assert r.status_code == 200
+    assert r.context['is_pending'] == True
+    assert sbn.pending_action == PayPalAction.CANCEL
+    assert PayPalOperation.objects.filter(
+        action=PayPalAction.CANCEL,
+        paypal_subscription_id=sbn.paypal_subscription_id
+    ).count() == 1
 
 
 @pytest.mark.parametrize(
@@ -232,7 +439,7 @@ def test_browse_articles_standard_success(
     plan = request.getfixturevalue(sub_plan)
     subscription(user=sample_user, plan=plan)
     article(user_writer)
-    article(user_writer, title='Premium Article', is_premium=True)
+    article(user_writer, title='Premium Article', required_tier=PREMIUM_TIER)
     client.force_login(sample_user)
 
     r = client.get(reverse('client:browse_articles'))
@@ -257,6 +464,140 @@ def test_browse_no_articles_without_subscription(
     assert r.context['articles'] is None
 
 
+def test_browse_articles_paginated(
+        client, sample_user, user_writer, article, subscription, premium,
+        settings
+):
+    """Test browse articles is split into pages linked by cursors."""
+
+    settings.ARTICLES_PAGE_SIZE = 2
+    subscription(user=sample_user, plan=premium)
+    for i in range(3):
+        article(user_writer, title=f'Article {i}')
+    client.force_login(sample_user)
+
+    r = client.get(reverse('client:browse_articles'))
+    page = r.context['page']
+
+    assert len(r.context['articles']) == 2
+    assert r.context['is_paginated'] is True
+    assert f'?cursor={page.next_cursor}' in r.content.decode('utf-8')
+
+    r = client.get(reverse('client:browse_articles'),
+                   {'cursor': page.next_cursor})
+
+    assert [a.title for a in r.context['articles']] == ['Article 0']
+    assert r.context['page'].has_next is False
+
+
+def test_browse_articles_invalid_cursor(
+        client, sample_user, subscription, premium
+):
+    """Test an invalid cursor is answered with 404."""
+
+    subscription(user=sample_user, plan=premium)
+    client.force_login(sample_user)
+
+    r = client.get(reverse('client:browse_articles'), {'cursor': 'garbage'})
+
+    assert r.status_code == 404
+
+
+def test_browse_articles_without_content(
+        client, sample_user, user_writer, article, subscription, premium
+):
+    """Test browse articles shows stored excerpts and never loads bodies."""
+
+    subscription(user=sample_user, plan=premium)
+    article(user_writer, content='word ' * 250)
+    client.force_login(sample_user)
+
+    r = client.get(reverse('client:browse_articles'))
+    listed = r.context['articles'][0]
+
+    assert 'content' in listed.get_deferred_fields()
+    assert listed.reading_time == 2
+    assert '2 min read' in r.content.decode('utf-8')
+
+
+@pytest.mark.parametrize(
+    'sub_plan,titles',
+    [('standard', ['Free river']), ('premium', ['Premium river', 'Free river'])]
+)
+def test_search_articles_respects_plan(
+        sub_plan, titles, client, sample_user, user_writer, article,
+        subscription, request
+):
+    """Test search results are limited to articles of the user's plan."""
+
+    plan = request.getfixturevalue(sub_plan)
+    subscription(user=sample_user, plan=plan)
+    article(user_writer, title='Free river', content='Water')
+    article(user_writer, title='Premium river', content='River river',
+            required_tier=PREMIUM_TIER)
+    article(user_writer, title='Mountains', content='Rocks',
+            required_tier=BASIC_TIER)
+    client.force_login(sample_user)
+
+    r = client.get(reverse('client:search_articles'), {'q': 'river'})
+
+    assert r.status_code == 200
+    assert [a.title for a in r.context['articles']] == titles
+    assert 'content' in r.context['articles'][0].get_deferred_fields()
+
+
+def test_search_articles_without_query(
+        client, sample_user, user_writer, article, subscription, premium
+):
+    """Test the search page without a query lists nothing."""
+
+    subscription(user=sample_user, plan=premium)
+    article(user_writer)
+    client.force_login(sample_user)
+
+    r = client.get(reverse('client:search_articles'))
+
+    assert r.status_code == 200
+    assert list(r.context['articles']) == []
+
+
+def test_search_articles_without_subscription(
+        client, sample_user, user_writer, article
+):
+    """Test search finds nothing for user without subscription."""
+
+    article(user_writer)
+    client.force_login(sample_user)
+
+    r = client.get(reverse('client:search_articles'), {'q': 'sample'})
+
+    assert r.status_code == 200
+    assert r.context['articles'] is None
+
+
+def test_search_articles_paginated(
+        client, sample_user, user_writer, article, subscription, premium,
+        settings
+):
+    """Test search results are split into pages keeping the query."""
+
+    settings.ARTICLES_PAGE_SIZE = 2
+    subscription(user=sample_user, plan=premium)
+    for i in range(3):
+        article(user_writer, title=f'Harbour {i}')
+    client.force_login(sample_user)
+
+    r = client.get(reverse('client:search_articles'), {'q': 'harbour'})
+
+    assert len(r.context['articles']) == 2
+    assert '?q=harbour&amp;page=2' in r.content.decode('utf-8')
+
+    r = client.get(reverse('client:search_articles'),
+                   {'q': 'harbour', 'page': 2})
+
+    assert len(r.context['articles']) == 1
+
+
 @patch('client.views.update_subscription_paypal')
 @pytest.mark.parametrize(
     'approve_link,expected_message',
@@ -267,7 +608,7 @@ def test_browse_no_articles_without_subscription(
 )
 def test_update_subscription_view_success(
         mocked_update, approve_link, expected_message, client, sample_user,
-        subscription, standard
+        subscription, standard, fake_paypal
 ):
     """Test update subscription successfully."""
 
@@ -287,6 +628,28 @@ def test_update_subscription_view_success(
     assert message_received[0].message == expected_message
 
 
+@patch('client.views.get_access_token')
+def test_update_subscription_paypal_unavailable(
+        mocked_access_token, client, sample_user, subscription, standard
+):
+    """Test update subscription fails fast while PayPal is unavailable."""
+
+    subscription(user=sample_user, plan=standard)
+    client.force_login(sample_user)
+    mocked_access_token.side_effect = PayPalUnavailableException()
+
+    r = client.get(reverse(
+        'client:update_subscription',
+        kwargs={'sub_id': sample_user.subscription.paypal_subscription_id}
+    ))
+
+    message_received = list(get_messages(r.wsgi_request))
+
+    assert r.status_code == 302
+    assert r['Location'] == reverse('account')
+    assert 'PayPal is temporarily unavailable!' in message_received[0].message
+
+
 def test_paypal_update_confirmed_page(
         client, sample_user, subscription, standard
 ):
@@ -327,63 +690,102 @@ def test_django_update_confirmed_page(
     assert r.context['subPlan'] == premium
 
 
-@patch('client.views.deactivate_subscription_paypal')
-@patch('client.views.get_access_token')
 @pytest.mark.parametrize(
-    'code,message',
+    'path_name,action,message',
     [
-        (204, 'Subscription deactivated successfully!'),
-        (500, 'Something went wrong!')
+        ('client:deactivate_subscription', PayPalAction.SUSPEND,
+         'Subscription deactivation requested!'),
+        ('client:activate_subscription', PayPalAction.ACTIVATE,
+         'Subscription activation requested!'),
     ]
 )
-def test_deactivate_subscription(
-        mocked_access_token, mocked_paypal_response, code, message, client,
-        sample_user, subscription, standard
+def test_deactivate_activate_subscription(
+        path_name, action, message, client, sample_user, subscription,
+        standard
 ):
-    """Test deactivating subscription."""
+    """Test deactivating/activating subscription is queued for PayPal."""
 
-    subscription(user=sample_user, plan=standard)
+    sbn = subscription(user=sample_user, plan=standard)
     client.force_login(sample_user)
-    mocked_paypal_response.return_value = code
 
     r = client.get(reverse(
-        'client:deactivate_subscription',
-        kwargs={'sub_id': sample_user.subscription.paypal_subscription_id}
+        path_name,
+        kwargs={'sub_id': sbn.paypal_subscription_id}
     ))
 
     message_received = list(get_messages(r.wsgi_request))
+    sbn.refresh_from_db()
 
     assert r.status_code == 302
     assert len(message_received) == 1
     assert message_received[0].message == message
+    assert sbn.pending_action == action
+    assert PayPalOperation.objects.get().action == action
 
 
-@patch('client.views.activate_subscription_paypal')
-@patch('client.views.get_access_token')
 @pytest.mark.parametrize(
-    'code,message',
-    [
-        (204, 'Subscription activated successfully!'),
-        (500, 'Something went wrong!')
-    ]
+    'path_name',
+    ['client:deactivate_subscription', 'client:activate_subscription']
 )
-def test_activate_subscription(
-        mocked_access_token, mocked_paypal_response, code, message, client,
-        sample_user, subscription, standard
+def test_deactivate_activate_subscription_in_progress(
+        path_name, client, sample_user, subscription, standard
 ):
-    """Test activating subscription."""
+    """Test subscription change is refused while another one is pending."""
 
-    subscription(user=sample_user, plan=standard)
+    sbn = subscription(user=sample_user, plan=standard,
+                       pending_action=PayPalAction.CANCEL)
     client.force_login(sample_user)
-    mocked_paypal_response.return_value = code
 
     r = client.get(reverse(
-        'client:activate_subscription',
-        kwargs={'sub_id': sample_user.subscription.paypal_subscription_id}
+        path_name,
+        kwargs={'sub_id': sbn.paypal_subscription_id}
     ))
 
     message_received = list(get_messages(r.wsgi_request))
 
     assert r.status_code == 302
-    assert len(message_received) == 1
-    assert message_received[0].message == message
+    assert message_received[0].message == (
+        'Another subscription change is in progress!'
+    )
+    assert not PayPalOperation.objects.exists()
+
+
+def test_paypal_stats_staff_only(client, sample_user, superuser):
+    """Test PayPal stats are available to staff users only."""
+
+    client.force_login(sample_user)
+    r = client.get(reverse('client:paypal_stats'))
+
+    assert r.status_code == 302
+
+    client.force_login(superuser)
+    r = client.get(reverse('client:paypal_stats'))
+
+    assert r.status_code == 200
+    assert set(r.json()['access_token']) == {
+        'hits', 'misses', 'refreshes', 'hit_ratio'
+    }
+
+
+def test_admin_exports_subscribers(client, superuser, sample_user, user,
+                                   subscription, standard, premium):
+    """Test the admin action streams the selected subscribers with their
+    plan and status."""
+
+    subscription(user=sample_user, plan=standard)
+    other = subscription(user=user(email='other@example.com'), plan=premium,
+                         is_active=False,
+                         pending_action=PayPalAction.ACTIVATE)
+    client.force_login(superuser)
+
+    r = client.post(reverse('admin:client_subscription_changelist'), {
+        'action': 'export_ndjson',
+        '_selected_action': [other.pk],
+    })
+    rows = [json.loads(line) for line in
+            b''.join(r.streaming_content).decode().splitlines()]
+
+    assert r['Content-Type'] == 'application/x-ndjson'
+    assert [(x['email'], x['plan'], x['tier'], x['status']) for x in rows] == [
+        ('other@example.com', 'premium', PREMIUM_TIER, 'activate pending')
+    ]
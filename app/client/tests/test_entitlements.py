@@ -0,0 +1,138 @@
+"""
+Tests for request-scoped entitlements.
+Command: pytest client/tests/test_entitlements.py --cov=client --cov-report term-missing:skip-covered
+"""
+
+import pytest
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+
+from client.entitlements import Entitlement, load_entitlement
+from client.models import PayPalAction
+from client.outbox import enqueue
+from client.tiers import BASIC_TIER, PREMIUM_TIER, tier_articles
+
+pytestmark = pytest.mark.django_db
+
+
+def subscription_queries(queries) -> list:
+    return [q['sql'] for q in queries if 'client_subscription"' in q['sql']]
+
+
+@pytest.mark.parametrize(
+    'plan_fixture,is_active,tier',
+    [('standard', True, BASIC_TIER),
+     ('premium', True, PREMIUM_TIER),
+     ('premium', False, None)]
+)
+def test_entitlement_tier(plan_fixture, is_active, tier, sample_user,
+                          subscription, request):
+    """Test only an active subscription entitles to its plan's tier."""
+
+    plan = request.getfixturevalue(plan_fixture)
+    subscription(user=sample_user, plan=plan, is_active=is_active)
+
+    entitlement = load_entitlement(sample_user)
+
+    assert entitlement.plan == plan
+    assert entitlement.tier == tier
+
+
+def test_tier_articles(user_writer, article):
+    """Test a tier covers articles requiring it or a lower tier."""
+
+    article(user_writer, title='Basic', required_tier=BASIC_TIER)
+    article(user_writer, title='Premium', required_tier=PREMIUM_TIER)
+    article(user_writer, title='Business', required_tier=PREMIUM_TIER + 1)
+
+    assert set(tier_articles(BASIC_TIER).values_list(
+        'title', flat=True
+    )) == {'Basic'}
+    assert set(tier_articles(PREMIUM_TIER).values_list(
+        'title', flat=True
+    )) == {'Basic', 'Premium'}
+
+
+def test_entitlement_without_subscription(sample_user):
+    """Test users without subscription and anonymous users get nothing."""
+
+    for user in (sample_user, AnonymousUser()):
+        entitlement = load_entitlement(user)
+
+        assert entitlement.subscription is None
+        assert entitlement.plan is None
+        assert entitlement.tier is None
+
+    assert Entitlement().is_active is False
+
+
+@pytest.mark.parametrize(
+    'url_name',
+    ['client:dashboard', 'client:browse_articles',
+     'client:subscription_plans', 'account']
+)
+def test_pages_load_entitlement_once(url_name, client, sample_user,
+                                     subscription, standard, premium):
+    """Test client pages query the subscription at most once."""
+
+    subscription(user=sample_user, plan=standard)
+    client.force_login(sample_user)
+
+    with CaptureQueriesContext(connection) as queries:
+        r = client.get(reverse(url_name))
+
+    assert r.status_code == 200
+    assert len(subscription_queries(queries)) == 1
+    assert 'client_subscriptionplan' in subscription_queries(queries)[0]
+
+
+def test_entitlement_cached_in_session(client, sample_user, subscription,
+                                       standard, settings):
+    """Test the session keeps the entitlement until the subscription
+    changes."""
+
+    settings.ENTITLEMENT_SESSION_CACHE = True
+    sub = subscription(user=sample_user, plan=standard)
+    client.force_login(sample_user)
+    url = reverse('account')
+    client.get(url)
+
+    with CaptureQueriesContext(connection) as queries:
+        r = client.get(url)
+
+    assert not subscription_queries(queries)
+    assert 'Standard' in r.content.decode('utf-8')
+
+    # Queryset update, no signal.
+    enqueue(sub, PayPalAction.SUSPEND)
+
+    with CaptureQueriesContext(connection) as queries:
+        r = client.get(url)
+
+    assert len(subscription_queries(queries)) == 1
+    assert 'Deactivation in progress' in r.content.decode('utf-8')
+
+
+def test_entitlement_session_refreshed_on_save(client, sample_user,
+                                               subscription, standard,
+                                               premium, settings):
+    """Test saving a subscription refreshes cached entitlements."""
+
+    settings.ENTITLEMENT_SESSION_CACHE = True
+    sub = subscription(user=sample_user, plan=standard)
+    client.force_login(sample_user)
+    client.get(reverse('client:dashboard'))
+
+    sub.subscription_plan = premium
+    sub.save()
+    r = client.get(reverse('client:dashboard'))
+
+    assert r.context['sub_plan'] == premium
+
+    sub.delete()
+    r = client.get(reverse('client:dashboard'))
+
+    assert 'sub_plan' not in r.context
@@ -0,0 +1,189 @@
+"""
+Tests for the cache of rendered article listings.
+Command: pytest client/tests/test_listing_cache.py --cov=client --cov-report term-missing:skip-covered
+"""
+
+import pytest
+
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+
+from client.listing_cache import ListingCache, listing_cache
+from client.tiers import BASIC_TIER, PREMIUM_TIER
+
+pytestmark = pytest.mark.django_db
+
+
+def generations() -> dict:
+    return listing_cache.stats()['generations']
+
+
+def test_listing_cache_generations():
+    """Test invalidating a tier drops its pages only."""
+
+    cache = ListingCache(ttl=60)
+    cache.set(BASIC_TIER, '', 'standard page')
+    cache.set(PREMIUM_TIER, '', 'premium page')
+
+    cache.invalidate(PREMIUM_TIER)
+
+    assert cache.get(BASIC_TIER, '') == 'standard page'
+    assert cache.get(PREMIUM_TIER, '') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_browse_articles_served_from_cache(
+        client, sample_user, user_writer, article, subscription, standard
+):
+    """Test the second request of a tier renders the cached page."""
+
+    subscription(user=sample_user, plan=standard)
+    article(user_writer, title='Cached article')
+    client.force_login(sample_user)
+    hits = listing_cache.hits
+
+    first = client.get(reverse('client:browse_articles'))
+    with CaptureQueriesContext(connection) as queries:
+        second = client.get(reverse('client:browse_articles'))
+
+    assert listing_cache.hits == hits + 1
+    assert second.content == first.content
+    assert 'Cached article' in second.content.decode('utf-8')
+    assert not any('writer_article' in q['sql'] for q in queries)
+
+
+def test_browse_articles_cached_links_without_query(
+        client, sample_user, user_writer, article, subscription, standard,
+        settings
+):
+    """Test page links of a cached page do not carry the query parameters
+    of the request that rendered it."""
+
+    settings.ARTICLES_PAGE_SIZE = 1
+    subscription(user=sample_user, plan=standard)
+    for i in range(2):
+        article(user_writer, title=f'Article {i}', slug=f'article-{i}')
+    client.force_login(sample_user)
+
+    hits = listing_cache.hits
+
+    client.get(reverse('client:browse_articles'), {'ref': 'newsletter-42'})
+    page = client.get(reverse('client:browse_articles')).content.decode()
+
+    assert listing_cache.hits == hits + 1
+    assert 'newsletter-42' not in page
+    assert '?cursor=' in page
+
+
+def test_browse_articles_cached_per_tier(
+        client, sample_user, user, user_writer, article, subscription,
+        standard, premium
+):
+    """Test standard and premium subscribers get their own pages."""
+
+    premium_user = user(email='premium@example.com')
+    subscription(user=sample_user, plan=standard)
+    subscription(user=premium_user, plan=premium,
+                 paypal_subscription_id='I-PREMIUM_TIER')
+    article(user_writer, title='Premium article', required_tier=PREMIUM_TIER)
+
+    client.force_login(sample_user)
+    client.get(reverse('client:browse_articles'))
+    client.force_login(premium_user)
+    r = client.get(reverse('client:browse_articles'))
+
+    assert 'Premium article' in r.content.decode('utf-8')
+
+
+def test_browse_articles_refreshed_after_change(
+        client, sample_user, user_writer, article, subscription, premium
+):
+    """Test an edited article shows up without waiting for expiry."""
+
+    subscription(user=sample_user, plan=premium)
+    a = article(user_writer, title='Old title')
+    client.force_login(sample_user)
+    client.get(reverse('client:browse_articles'))
+
+    a.title = 'New title'
+    a.save()
+    r = client.get(reverse('client:browse_articles'))
+
+    assert 'New title' in r.content.decode('utf-8')
+
+
+def test_premium_article_change_keeps_standard_listing(
+        user_writer, article, standard, premium
+):
+    """Test premium articles invalidate premium listings only."""
+
+    a = article(user_writer, required_tier=PREMIUM_TIER)
+    before = generations()
+
+    a.title = 'Edited'
+    a.save()
+
+    assert generations()[BASIC_TIER] == before[BASIC_TIER]
+    assert generations()[PREMIUM_TIER] > before[PREMIUM_TIER]
+
+
+@pytest.mark.parametrize('old_tier,new_tier',
+                         [(BASIC_TIER, PREMIUM_TIER), (PREMIUM_TIER, BASIC_TIER)])
+def test_tier_change_invalidates_both_listings(
+        old_tier, new_tier, user_writer, article, standard, premium
+):
+    """Test moving an article between tiers refreshes both listings."""
+
+    a = article(user_writer, required_tier=old_tier)
+    before = generations()
+
+    a.required_tier = new_tier
+    a.save(update_fields=['required_tier'])
+
+    assert generations()[BASIC_TIER] > before[BASIC_TIER]
+    assert generations()[PREMIUM_TIER] > before[PREMIUM_TIER]
+
+
+def test_unlisted_field_change_keeps_listings(
+        user_writer, article, standard, premium
+):
+    """Test saving fields not shown in listings keeps them cached."""
+
+    a = article(user_writer)
+    before = generations()
+
+    a.save(update_fields=['last_modified'])
+
+    assert generations() == before
+
+
+def test_article_delete_invalidates_listings(
+        user_writer, article, standard, premium
+):
+    """Test deleting a free article refreshes both listings."""
+
+    a = article(user_writer)
+    before = generations()
+
+    a.delete()
+
+    assert generations()[BASIC_TIER] > before[BASIC_TIER]
+    assert generations()[PREMIUM_TIER] > before[PREMIUM_TIER]
+
+
+def test_listing_stats_staff_only(client, sample_user, superuser):
+    """Test listing cache stats are available to staff users only."""
+
+    client.force_login(sample_user)
+    r = client.get(reverse('client:listing_stats'))
+
+    assert r.status_code == 302
+
+    client.force_login(superuser)
+    r = client.get(reverse('client:listing_stats'))
+
+    assert r.status_code == 200
+    assert set(r.json()) >= {'hits', 'misses', 'hit_ratio', 'generations'}
@@ -0,0 +1,261 @@
+"""
+Tests for the outbox of PayPal operations.
+Command: pytest client/tests/test_outbox.py --cov=client --cov-report term-missing:skip-covered
+"""
+
+import time
+
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+import requests
+
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from client.exceptions import PayPalUnavailableException
+from client.models import PayPalAction, PayPalOperation, Subscription
+from client.outbox import enqueue, claim_operations, run_operation
+from client.paypal import paypal_client
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def mocked_paypal():
+    """PayPal client with a mocked token and responses."""
+
+    with patch('client.outbox.paypal_client') as mocked_client:
+        mocked_client.get_access_token.return_value = 'token'
+        mocked_client.retry_statuses = {429, 500, 502, 503, 504}
+        mocked_client.breaker.retry_in.return_value = 30
+        yield mocked_client
+
+
+def claim_one():
+    operations = claim_operations(limit=10)
+    assert len(operations) == 1
+    return operations[0]
+
+
+@pytest.mark.parametrize(
+    'action,call_name,is_active',
+    [(PayPalAction.SUSPEND, 'suspend_subscription', False),
+     (PayPalAction.ACTIVATE, 'activate_subscription', True)]
+)
+def test_run_operation_success(
+        action, call_name, is_active, mocked_paypal, sample_user,
+        subscription, standard
+):
+    """Test confirmed operation is applied to the subscription."""
+
+    sbn = subscription(user=sample_user, plan=standard,
+                       is_active=not is_active)
+    operation = enqueue(sbn, action)
+    getattr(mocked_paypal, call_name).return_value = Mock(status_code=204)
+
+    run_operation(claim_one())
+
+    sbn.refresh_from_db()
+    operation.refresh_from_db()
+
+    assert sbn.is_active is is_active
+    assert sbn.pending_action == ''
+    assert operation.status == PayPalOperation.Status.DONE
+    getattr(mocked_paypal, call_name).assert_called_once_with(
+        'token', sbn.paypal_subscription_id, str(operation.request_id)
+    )
+
+
+def test_run_cancel_operation_deletes_subscription(
+        mocked_paypal, sample_user, subscription, standard
+):
+    """Test confirmed cancellation deletes subscription on application side."""
+
+    sbn = subscription(user=sample_user, plan=standard)
+    enqueue(sbn, PayPalAction.CANCEL)
+    mocked_paypal.cancel_subscription.return_value = Mock(status_code=204)
+
+    run_operation(claim_one())
+
+    assert not Subscription.objects.filter(pk=sbn.pk).exists()
+
+
+def test_run_operation_retried_with_backoff(
+        mocked_paypal, sample_user, subscription, standard
+):
+    """Test failed call is scheduled again with the same idempotency key."""
+
+    sbn = subscription(user=sample_user, plan=standard)
+    operation = enqueue(sbn, PayPalAction.SUSPEND)
+    mocked_paypal.suspend_subscription.side_effect = requests.ConnectTimeout()
+
+    run_operation(claim_one())
+
+    operation.refresh_from_db()
+    sbn.refresh_from_db()
+
+    assert operation.status == PayPalOperation.Status.PENDING
+    assert operation.attempts == 1
+    assert operation.next_attempt_at > timezone.now()
+    assert 'ConnectTimeout' in operation.last_error
+    assert sbn.pending_action == PayPalAction.SUSPEND
+    assert claim_operations(limit=10) == []
+
+
+def test_run_operation_dead_lettered(
+        mocked_paypal, sample_user, subscription, standard, settings
+):
+    """Test operation is dead-lettered after the last attempt."""
+
+    settings.PAYPAL_OUTBOX_MAX_ATTEMPTS = 1
+    sbn = subscription(user=sample_user, plan=standard)
+    operation = enqueue(sbn, PayPalAction.SUSPEND)
+    mocked_paypal.suspend_subscription.return_value = Mock(status_code=503,
+                                                           text='')
+
+    run_operation(claim_one())
+
+    operation.refresh_from_db()
+    sbn.refresh_from_db()
+
+    assert operation.status == PayPalOperation.Status.DEAD
+    assert sbn.pending_action == ''
+    assert sbn.is_active is True
+
+
+def test_run_operation_client_error_dead_lettered(
+        mocked_paypal, sample_user, subscription, standard
+):
+    """Test operation rejected by PayPal is not retried."""
+
+    sbn = subscription(user=sample_user, plan=standard)
+    operation = enqueue(sbn, PayPalAction.SUSPEND)
+    mocked_paypal.suspend_subscription.return_value = Mock(status_code=404,
+                                                           text='Not found')
+
+    run_operation(claim_one())
+
+    operation.refresh_from_db()
+
+    assert operation.status == PayPalOperation.Status.DEAD
+    assert operation.last_error == 'HTTP 404: Not found'
+
+
+def test_run_operation_postponed_while_circuit_open(
+        mocked_paypal, sample_user, subscription, standard
+):
+    """Test operation rejected by the circuit breaker keeps its attempts."""
+
+    sbn = subscription(user=sample_user, plan=standard)
+    operation = enqueue(sbn, PayPalAction.SUSPEND)
+    mocked_paypal.suspend_subscription.side_effect = (
+        PayPalUnavailableException()
+    )
+
+    run_operation(claim_one())
+
+    operation.refresh_from_db()
+
+    assert operation.status == PayPalOperation.Status.PENDING
+    assert operation.attempts == 0
+    assert operation.next_attempt_at > timezone.now()
+
+
+def test_claim_operations_expired_lease(sample_user, subscription, standard):
+    """Test operation of a crashed worker is claimed again."""
+
+    sbn = subscription(user=sample_user, plan=standard)
+    operation = enqueue(sbn, PayPalAction.SUSPEND)
+
+    claim_one()
+    assert claim_operations(limit=10) == []
+
+    PayPalOperation.objects.filter(pk=operation.pk).update(
+        locked_until=timezone.now() - timedelta(seconds=1)
+    )
+
+    assert claim_one().attempts == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_paypal_worker_command(mocked_paypal, sample_user, subscription,
+                               standard):
+    """Test worker runs queued operations from a thread pool."""
+
+    sbn = subscription(user=sample_user, plan=standard)
+    enqueue(sbn, PayPalAction.SUSPEND)
+    mocked_paypal.suspend_subscription.return_value = Mock(status_code=204)
+
+    call_command('paypal_worker', '--once', '--threads=2')
+
+    sbn.refresh_from_db()
+
+    assert sbn.is_active is False
+    assert PayPalOperation.objects.get().status == PayPalOperation.Status.DONE
+
+
+@pytest.mark.django_db(transaction=True)
+def test_paypal_worker_survives_unexpected_error(
+        mocked_paypal, sample_user, user, subscription, standard, settings
+):
+    """Test operation raising an unexpected error is dead-lettered after its
+    last attempt and the worker goes on with the others."""
+
+    settings.PAYPAL_OUTBOX_MAX_ATTEMPTS = 1
+    poisoned = subscription(user=sample_user, plan=standard)
+    other = subscription(user=user(email='other@example.com'), plan=standard,
+                         paypal_subscription_id='I-OTHER')
+    enqueue(poisoned, PayPalAction.SUSPEND)
+    enqueue(other, PayPalAction.ACTIVATE)
+    mocked_paypal.suspend_subscription.side_effect = KeyError('status')
+    mocked_paypal.activate_subscription.return_value = Mock(status_code=204)
+
+    call_command('paypal_worker', '--once', '--threads=1')
+
+    poisoned_op = PayPalOperation.objects.get(action=PayPalAction.SUSPEND)
+    other_op = PayPalOperation.objects.get(action=PayPalAction.ACTIVATE)
+
+    assert poisoned_op.status == PayPalOperation.Status.DEAD
+    assert 'KeyError' in poisoned_op.last_error
+    assert other_op.status == PayPalOperation.Status.DONE
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bench_billing_command(sample_user, subscription, standard, settings):
+    """Test benchmark runs billing flows against the fake PayPal and leaves
+    other operations and the PayPal access token alone."""
+
+    settings.BENCHMARK_DATABASE = True
+    sbn = subscription(user=sample_user, plan=standard)
+    enqueue(sbn, PayPalAction.SUSPEND)
+    token_key = paypal_client.token_cache.cache_key
+    cache.set(token_key, {'token': 'real', 'expires_at': time.time() + 600})
+    out = StringIO()
+
+    call_command('bench_billing', '--users=3', '--concurrency=3',
+                 '--worker-threads=2', stdout=out)
+
+    lines = out.getvalue().splitlines()
+    rows = {line.split()[0]: line.split()[1:3] for line in lines[2:7]}
+
+    assert rows == {step: ['3', '0'] for step in
+                    ('create', 'update', 'deactivate', 'activate', 'delete')}
+    assert 'Throughput' in out.getvalue()
+    assert list(Subscription.objects.all()) == [sbn]
+    assert PayPalOperation.objects.get().status == (
+        PayPalOperation.Status.PENDING
+    )
+    assert cache.get(token_key)['token'] == 'real'
+
+
+def test_bench_billing_refuses_unmarked_database():
+    """Test benchmarks do not run against a database not marked for them."""
+
+    with pytest.raises(CommandError, match='BENCHMARK_DATABASE'):
+        call_command('bench_billing', '--users=1')
@@ -3,10 +3,502 @@ Tests for PayPal app.
 Command: pytest client\tests\test_papal_api.py
 """
 
-from client.paypal import get_access_token
+import threading
+import time
 
+import pytest
+import requests
 
-def test_access_token():
+from unittest.mock import Mock, patch
+
+from django.db import connection
+
+from client.circuit_breaker import CircuitBreaker
+from client.exceptions import PayPalAPIException, PayPalUnavailableException
+from client.fake_paypal import FakePayPalServer
+from client.paypal import PayPalClient, get_access_token
+from client.token_cache import AccessTokenCache
+
+
+@pytest.mark.django_db
+def test_access_token(fake_paypal):
     access_token = get_access_token()
 
     assert type(access_token) is str
+
+
+def test_access_token_cached_until_refresh_margin():
+    """Test access token is requested once and reused while it is valid."""
+
+    fetch = Mock(return_value=('token-1', 32400))
+    token_cache = AccessTokenCache(fetch, refresh_margin=300)
+
+    tokens = [token_cache.get() for _ in range(5)]
+
+    assert tokens == ['token-1'] * 5
+    assert fetch.call_count == 1
+    assert token_cache.stats() == {
+        'hits': 4, 'misses': 1, 'refreshes': 1, 'hit_ratio': 0.8
+    }
+
+
+def test_access_token_refreshed_after_expiry():
+    """Test expired access token is refreshed."""
+
+    fetch = Mock(side_effect=[('token-1', 2), ('token-2', 32400)])
+    token_cache = AccessTokenCache(fetch, refresh_margin=300)
+
+    assert token_cache.get() == 'token-1'
+
+    time.sleep(1.1)
+
+    assert token_cache.get() == 'token-2'
+    assert token_cache.refreshes == 2
+
+
+def test_access_token_shared_between_workers():
+    """Test a second process reuses the token stored in the shared cache."""
+
+    fetch = Mock(return_value=('token-1', 32400))
+    AccessTokenCache(fetch).get()
+
+    other_fetch = Mock()
+    other_worker_cache = AccessTokenCache(other_fetch)
+
+    assert other_worker_cache.get() == 'token-1'
+    other_fetch.assert_not_called()
+
+
+def test_access_token_single_flight_refresh():
+    """Test concurrent requests trigger a single token refresh."""
+
+    def slow_fetch():
+        time.sleep(0.2)
+        return 'token-1', 32400
+
+    fetch = Mock(side_effect=slow_fetch)
+    token_cache = AccessTokenCache(fetch)
+    results = []
+
+    threads = [
+        threading.Thread(target=lambda: results.append(token_cache.get()))
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['token-1'] * 10
+    assert fetch.call_count == 1
+
+
+def test_access_token_invalidate():
+    """Test invalidated access token is requested again."""
+
+    fetch = Mock(side_effect=[('token-1', 32400), ('token-2', 32400)])
+    token_cache = AccessTokenCache(fetch)
+
+    token_cache.get()
+    token_cache.invalidate()
+
+    assert token_cache.get() == 'token-2'
+
+
+def response(status_code, headers=None, payload=None):
+    """Build a mocked PayPal response."""
+
+    r = Mock(status_code=status_code, headers=headers or {})
+    r.json.return_value = payload or {}
+    return r
+
+
+@pytest.fixture
+def paypal_client():
+    """PayPal client with a mocked session."""
+
+    pp_client = PayPalClient(
+        base_url='https://paypal.test',
+        pool_size=4,
+        timeouts={'cancel': (1, 2)},
+        max_retries=2
+    )
+    pp_client.session = Mock()
+
+    return pp_client
+
+
+def test_paypal_client_pool_size():
+    """Test the session keeps a connection pool of configured size."""
+
+    pp_client = PayPalClient(pool_size=25)
+    adapter = pp_client.session.get_adapter('https://api-m.sandbox.paypal.com')
+
+    assert adapter._pool_maxsize == 25
+
+
+@patch('client.paypal.time.sleep')
+def test_paypal_client_retries_server_errors(mocked_sleep, paypal_client):
+    """Test 5xx responses are retried and per-endpoint timeouts applied."""
+
+    paypal_client.session.request.side_effect = [
+        response(503), response(502), response(204)
+    ]
+
+    r = paypal_client.cancel_subscription('token', 'I-SUB')
+
+    assert r.status_code == 204
+    assert paypal_client.session.request.call_count == 3
+    assert mocked_sleep.call_count == 2
+
+    for call in paypal_client.session.request.call_args_list:
+        assert call.kwargs['timeout'] == (1, 2)
+        assert call.kwargs['headers']['PayPal-Request-Id']
+
+    request_ids = {c.kwargs['headers']['PayPal-Request-Id']
+                   for c in paypal_client.session.request.call_args_list}
+    assert len(request_ids) == 1
+
+
+@patch('client.paypal.time.sleep')
+def test_paypal_client_honours_retry_after(mocked_sleep, paypal_client):
+    """Test 429 response is retried after the delay PayPal asks for."""
+
+    paypal_client.session.request.side_effect = [
+        response(429, headers={'Retry-After': '3'}), response(200)
+    ]
+
+    r = paypal_client.get_subscription('token', 'I-SUB')
+
+    assert r.status_code == 200
+    mocked_sleep.assert_called_once_with(3.0)
+
+
+@patch('client.paypal.time.sleep')
+def test_paypal_client_retries_are_bounded(mocked_sleep, paypal_client):
+    """Test the last response is returned when retries are exhausted."""
+
+    paypal_client.session.request.side_effect = [response(500)] * 5
+
+    r = paypal_client.suspend_subscription('token', 'I-SUB')
+
+    assert r.status_code == 500
+    assert paypal_client.session.request.call_count == 3
+
+
+@patch('client.paypal.time.sleep')
+def test_paypal_client_raises_after_connection_errors(mocked_sleep,
+                                                      paypal_client):
+    """Test connection errors are retried and finally raised."""
+
+    paypal_client.session.request.side_effect = requests.ConnectTimeout()
+
+    with pytest.raises(requests.ConnectTimeout):
+        paypal_client.activate_subscription('token', 'I-SUB')
+
+    assert paypal_client.session.request.call_count == 3
+
+
+def test_paypal_client_no_retry_on_client_error(paypal_client):
+    """Test 4xx responses are returned without retrying."""
+
+    paypal_client.session.request.return_value = response(422)
+
+    r = paypal_client.cancel_subscription('token', 'I-SUB')
+
+    assert r.status_code == 422
+    assert paypal_client.session.request.call_count == 1
+
+
+def test_paypal_client_refreshes_rejected_token(paypal_client):
+    """Test request is repeated with a new token after 401."""
+
+    paypal_client.session.request.side_effect = [
+        response(401),
+        response(200, payload={'access_token': 'fresh', 'expires_in': 32400}),
+        response(200, payload={'plan_id': 'P-1'}),
+    ]
+
+    r = paypal_client.get_subscription('stale', 'I-SUB')
+
+    assert r.json() == {'plan_id': 'P-1'}
+    last_call = paypal_client.session.request.call_args_list[-1]
+    assert last_call.kwargs['headers']['Authorization'] == 'Bearer fresh'
+
+
+def test_paypal_client_latency_histograms(paypal_client):
+    """Test latency is recorded per endpoint."""
+
+    paypal_client.session.request.return_value = response(204)
+
+    paypal_client.cancel_subscription('token', 'I-SUB')
+    paypal_client.cancel_subscription('token', 'I-SUB')
+    paypal_client.get_subscription('token', 'I-SUB')
+
+    stats = paypal_client.latency_stats()
+
+    assert stats['cancel']['count'] == 2
+    assert stats['subscription_detail']['count'] == 1
+    assert stats['cancel']['p99_ms'] is not None
+
+
+def test_circuit_breaker_opens_on_failure_rate():
+    """Test circuit opens when too many calls fail and rejects calls."""
+
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, open_seconds=60)
+
+    for success in (True, False, True, False):
+        breaker.before_call()
+        breaker.after_call(0.1, success)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(PayPalUnavailableException):
+        breaker.before_call()
+
+    stats = breaker.stats()
+    assert stats['trips'] == 1
+    assert stats['rejected'] == 1
+
+
+def test_circuit_breaker_opens_on_slow_calls():
+    """Test circuit opens when too many calls are slow."""
+
+    breaker = CircuitBreaker(slow_call_rate=0.5, slow_call_duration=1,
+                             min_calls=2)
+
+    for _ in range(2):
+        breaker.before_call()
+        breaker.after_call(2.0, True)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.parametrize(
+    'probe_success,state',
+    [(True, CircuitBreaker.CLOSED), (False, CircuitBreaker.OPEN)]
+)
+def test_circuit_breaker_half_open_probe(probe_success, state):
+    """Test probe call after open period closes or reopens the circuit."""
+
+    breaker = CircuitBreaker(min_calls=1, open_seconds=0.05,
+                             half_open_probes=1)
+    breaker.before_call()
+    breaker.after_call(0.1, False)
+
+    time.sleep(0.06)
+    breaker.before_call()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(PayPalUnavailableException):
+        breaker.before_call()
+
+    breaker.after_call(0.1, probe_success)
+
+    assert breaker.state == state
+
+
+def test_circuit_breaker_bulkhead():
+    """Test concurrent calls above the limit are rejected."""
+
+    breaker = CircuitBreaker(max_concurrent=1, bulkhead_timeout=0.01)
+    breaker.before_call()
+
+    with pytest.raises(PayPalUnavailableException):
+        breaker.before_call()
+
+    breaker.after_call(0.1, True)
+    breaker.before_call()
+
+    assert breaker.stats()['in_flight'] == 1
+
+
+@pytest.mark.django_db
+def test_circuit_breaker_shared_bulkhead():
+    """Test calls of all processes share the total bulkhead slots."""
+
+    breakers = [CircuitBreaker(max_concurrent_total=1, bulkhead_timeout=0.05)
+                for _ in range(2)]
+    rejected = []
+
+    def call_from_other_process():
+        # Its own thread has its own database connection.
+        try:
+            breakers[1].before_call()
+            breakers[1].after_call(0.1, True)
+        except PayPalUnavailableException:
+            rejected.append(True)
+        finally:
+            connection.close()
+
+    def run_other_process():
+        thread = threading.Thread(target=call_from_other_process)
+        thread.start()
+        thread.join()
+
+    breakers[0].before_call()
+    run_other_process()
+
+    assert rejected == [True]
+    assert breakers[1].stats()['rejected'] == 1
+
+    breakers[0].after_call(0.1, True)
+    run_other_process()
+
+    assert rejected == [True]
+
+
+@patch('client.paypal.time.sleep')
+def test_paypal_client_fails_fast_when_circuit_open(mocked_sleep,
+                                                    paypal_client):
+    """Test PayPal is not called while the circuit is open."""
+
+    paypal_client.breaker = CircuitBreaker(min_calls=1, open_seconds=60)
+    paypal_client.session.request.return_value = response(503)
+
+    paypal_client.cancel_subscription('token', 'I-SUB')
+    calls = paypal_client.session.request.call_count
+
+    with pytest.raises(PayPalUnavailableException):
+        paypal_client.cancel_subscription('token', 'I-SUB')
+
+    assert paypal_client.session.request.call_count == calls
+    assert paypal_client.stats()['circuit_breaker']['state'] == 'open'
+
+
+@pytest.fixture
+def fake_server():
+    """Fake PayPal API served from a background thread."""
+
+    server = FakePayPalServer().start()
+    yield server
+    server.stop()
+
+
+def fake_client(server, **kwargs) -> PayPalClient:
+    return PayPalClient(base_url=server.url, backoff=0.01, **kwargs)
+
+
+def test_fake_paypal_subscription_lifecycle(fake_server):
+    """Test client calls against the fake PayPal change subscription state."""
+
+    pp_client = fake_client(fake_server)
+    fake_server.paypal.add_subscription('I-SUB', plan_id='P-1')
+    token = pp_client.get_access_token()
+
+    detail = pp_client.get_subscription(token, 'I-SUB').json()
+    assert detail['plan_id'] == 'P-1'
+
+    assert pp_client.suspend_subscription(token, 'I-SUB').status_code == 204
+    assert pp_client.suspend_subscription(token, 'I-SUB').status_code == 422
+    assert pp_client.activate_subscription(token, 'I-SUB').status_code == 204
+
+    r = pp_client.revise_subscription(token, 'I-SUB', 'P-2')
+    links = {link['rel']: link['href'] for link in r.json()['links']}
+    assert 'approve' in links
+
+    assert pp_client.cancel_subscription(token, 'I-SUB').status_code == 204
+    assert fake_server.paypal.subscriptions['I-SUB'] == {
+        'id': 'I-SUB', 'plan_id': 'P-2', 'status': 'CANCELLED'
+    }
+
+
+def test_fake_paypal_replays_idempotent_requests(fake_server):
+    """Test a POST repeated with the same PayPal-Request-Id is not applied twice."""
+
+    pp_client = fake_client(fake_server)
+    token = pp_client.get_access_token()
+
+    first = pp_client.suspend_subscription(token, 'I-SUB', 'request-1')
+    second = pp_client.suspend_subscription(token, 'I-SUB', 'request-1')
+
+    assert first.status_code == second.status_code == 204
+    assert pp_client.suspend_subscription(token, 'I-SUB').status_code == 422
+
+
+def test_fake_paypal_rate_limit(fake_server):
+    """Test requests above the rate limit are answered with 429."""
+
+    fake_server.paypal.rate_limit = 2
+    fake_server.paypal._allowance = 2
+    pp_client = fake_client(fake_server, max_retries=0)
+    token = pp_client.get_access_token()
+
+    statuses = [pp_client.get_subscription(token, 'I-SUB').status_code
+                for _ in range(3)]
+
+    assert 429 in statuses
+
+
+def test_fake_paypal_error_injection(fake_server):
+    """Test injected errors are retried by the client."""
+
+    fake_server.paypal.error_rate = 1
+    pp_client = fake_client(fake_server, max_retries=2)
+
+    with pytest.raises(PayPalAPIException):
+        pp_client.get_access_token()
+
+    assert fake_server.paypal.requests == [('POST', '/v1/oauth2/token')] * 3
+
+
+def test_subscription_details_cached(fake_server):
+    """Test repeated lookups of subscription details call PayPal once."""
+
+    pp_client = fake_client(fake_server)
+    fake_server.paypal.add_subscription('I-SUB', plan_id='P-1')
+    token = pp_client.get_access_token()
+
+    details = [pp_client.get_subscription_details(token, 'I-SUB')
+               for _ in range(3)]
+
+    assert [d['plan_id'] for d in details] == ['P-1'] * 3
+    assert fake_server.paypal.requests.count(
+        ('GET', '/v1/billing/subscriptions/I-SUB')
+    ) == 1
+    assert pp_client.stats()['subscription_details']['hit_ratio'] == 0.6667
+
+
+def test_subscription_details_invalidated_by_own_change(fake_server):
+    """Test details are fetched again after we changed the subscription."""
+
+    pp_client = fake_client(fake_server)
+    token = pp_client.get_access_token()
+
+    assert pp_client.get_subscription_details(
+        token, 'I-SUB'
+    )['status'] == 'ACTIVE'
+
+    pp_client.suspend_subscription(token, 'I-SUB')
+
+    assert pp_client.get_subscription_details(
+        token, 'I-SUB'
+    )['status'] == 'SUSPENDED'
+
+
+def test_subscription_details_not_found_cached(fake_server):
+    """Test unknown subscriptions are not looked up again right away."""
+
+    fake_server.paypal.auto_create = False
+    pp_client = fake_client(fake_server)
+    token = pp_client.get_access_token()
+
+    assert pp_client.get_subscription_details(token, 'I-UNKNOWN') is None
+    assert pp_client.get_subscription_details(token, 'I-UNKNOWN') is None
+    assert fake_server.paypal.requests.count(
+        ('GET', '/v1/billing/subscriptions/I-UNKNOWN')
+    ) == 1
+
+
+def test_subscription_details_errors_not_cached(paypal_client):
+    """Test failed lookups are not cached."""
+
+    paypal_client.max_retries = 0
+    paypal_client.session.request.side_effect = [
+        response(503), response(200, payload={'plan_id': 'P-1'})
+    ]
+
+    assert paypal_client.get_subscription_details('token', 'I-SUB') is None
+    assert paypal_client.get_subscription_details(
+        'token', 'I-SUB'
+    ) == {'plan_id': 'P-1'}
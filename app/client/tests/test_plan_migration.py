@@ -0,0 +1,156 @@
+"""
+Tests for bulk migration of subscribers between plans.
+Command: pytest client/tests/test_plan_migration.py --cov=client --cov-report term-missing:skip-covered
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.shortcuts import reverse
+from django.utils import timezone
+
+from client.models import PlanMigration, PlanMigrationItem, Subscription
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+Status = PlanMigrationItem.Status
+
+
+@pytest.fixture
+def subscribers(user, subscription, standard, premium):
+    """Create subscriptions I-0..I-n on the standard plan."""
+
+    def _subscribers(n):
+        return [
+            subscription(user=user(email=f'user{i}@example.com'),
+                         plan=standard,
+                         paypal_subscription_id=f'I-{i}')
+            for i in range(n)
+        ]
+
+    return _subscribers
+
+
+def migrate(*args) -> str:
+    out = StringIO()
+    call_command('migrate_plan_subscribers', 'standard', 'premium',
+                 '--rate=1000', '--chunk-size=2', *args, stdout=out)
+    return out.getvalue()
+
+
+def test_migrate_plan_subscribers(fake_paypal, subscribers, premium):
+    """Test all subscribers are revised on PayPal and moved locally."""
+
+    subscribers(3)
+
+    output = migrate()
+
+    assert 'revise: 2/3' in output and 'revise: 3/3' in output
+    assert 'ETA' in output
+    assert '3 confirmed, 0 awaiting approval' in output
+    assert set(Subscription.objects.values_list(
+        'subscription_plan', flat=True
+    )) == {premium.pk}
+    assert PlanMigration.objects.get().finished_at is not None
+    assert all(s['plan_id'] == premium.paypal_plan_id
+               for s in fake_paypal.subscriptions.values())
+
+
+def test_migrate_plan_subscribers_resumes(fake_paypal, subscribers, premium):
+    """Test a second run confirms subscriptions approved in the meantime."""
+
+    first, second = subscribers(2)
+    fake_paypal.auto_approve = False
+
+    output = migrate()
+
+    assert '0 confirmed, 2 awaiting approval' in output
+    assert PlanMigrationItem.objects.filter(
+        status=Status.REVISED
+    ).exclude(approve_link='').count() == 2
+
+    fake_paypal.approve('I-0')
+    output = migrate()
+    first.refresh_from_db()
+    second.refresh_from_db()
+
+    assert 'Resuming plan migration' in output
+    assert '1 confirmed, 1 awaiting approval' in output
+    assert first.subscription_plan == premium
+    assert second.subscription_plan != premium
+    assert PlanMigration.objects.count() == 1
+
+
+def test_account_page_offers_approve_link(client, fake_paypal, subscribers):
+    """Test subscribers find the approve link of a revised subscription on
+    their account page until the change is confirmed."""
+
+    first, second = subscribers(2)
+    fake_paypal.auto_approve = False
+    migrate()
+    item = PlanMigrationItem.objects.get(subscription=first)
+    client.force_login(first.user)
+
+    r = client.get(reverse('account'))
+
+    assert f'href="{item.approve_link}"' in r.content.decode()
+    assert 'Premium plan once you' in r.content.decode()
+
+    fake_paypal.approve('I-0')
+    migrate()
+    r = client.get(reverse('account'))
+
+    assert item.approve_link not in r.content.decode()
+
+
+def test_migrate_plan_subscribers_approval_expires(fake_paypal, subscribers):
+    """Test subscriptions not approved in time fail, which finishes the
+    migration."""
+
+    subscribers(2)
+    fake_paypal.auto_approve = False
+    migrate()
+    PlanMigrationItem.objects.filter(paypal_subscription_id='I-0').update(
+        revised_at=timezone.now() - timedelta(days=31)
+    )
+
+    output = migrate()
+
+    assert '0 confirmed, 1 awaiting approval, 0 pending, 1 failed' in output
+    assert PlanMigrationItem.objects.get(
+        paypal_subscription_id='I-0'
+    ).last_error == 'Change not approved in time.'
+    assert PlanMigration.objects.get().finished_at is None
+
+    output = migrate('--approval-days=0')
+
+    assert '0 awaiting approval, 0 pending, 2 failed' in output
+    assert PlanMigration.objects.get().finished_at is not None
+
+
+def test_migrate_plan_subscribers_failure(fake_paypal, subscribers, standard):
+    """Test subscriptions PayPal refuses to revise are marked failed."""
+
+    subscribers(2)
+    fake_paypal.add_subscription('I-1', status='CANCELLED')
+
+    output = migrate()
+    item = PlanMigrationItem.objects.get(paypal_subscription_id='I-1')
+
+    assert '1 confirmed, 0 awaiting approval, 0 pending, 1 failed' in output
+    assert item.status == Status.FAILED
+    assert item.last_error.startswith('HTTP 422')
+    assert Subscription.objects.get(
+        paypal_subscription_id='I-1'
+    ).subscription_plan == standard
+
+
+def test_migrate_plan_subscribers_unknown_plan(standard):
+    """Test unknown plan names are rejected."""
+
+    with pytest.raises(CommandError):
+        call_command('migrate_plan_subscribers', 'standard', 'gold')
@@ -0,0 +1,188 @@
+"""
+Tests for bulk reconciliation of subscriptions with PayPal.
+Command: pytest client/tests/test_reconcile.py --cov=client --cov-report term-missing:skip-covered
+"""
+
+import json
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from client.models import PayPalAction, Subscription
+from client.reconcile import RateLimiter, iter_chunks, reconcile_chunk
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def subscribers(user, subscription, standard):
+    """Create subscriptions I-0..I-n, active on the standard plan."""
+
+    def _subscribers(n):
+        return [
+            subscription(user=user(email=f'user{i}@example.com'),
+                         plan=standard,
+                         paypal_subscription_id=f'I-{i}')
+            for i in range(n)
+        ]
+
+    return _subscribers
+
+
+def reconcile(*args) -> str:
+    out = StringIO()
+    call_command('reconcile_subscriptions', '--rate=1000', *args, stdout=out)
+    return out.getvalue()
+
+
+def test_reconcile_corrects_drift(fake_paypal, subscribers, premium):
+    """Test status and plan are taken over from PayPal."""
+
+    subscribers(3)
+    fake_paypal.add_subscription('I-0', plan_id=premium.paypal_plan_id)
+    fake_paypal.add_subscription('I-1', plan_id='ST-935868202KH3945Q',
+                                 status='SUSPENDED')
+    fake_paypal.add_subscription('I-2', plan_id='ST-935868202KH3945Q')
+
+    output = reconcile('--chunk-size=2')
+
+    first, second, third = Subscription.objects.order_by('pk')
+
+    assert first.subscription_plan == premium
+    assert first.is_active is True
+    assert second.is_active is False
+    assert third.is_active is True
+    assert all(s.last_reconciled_at for s in (first, second, third))
+    assert '3 subscriptions checked' in output
+    assert '2 corrected, 0 failed' in output
+
+
+def test_reconcile_dry_run(fake_paypal, subscribers):
+    """Test dry run reports differences without saving them."""
+
+    subscribers(1)
+    fake_paypal.add_subscription('I-0', status='CANCELLED')
+
+    output = reconcile('--dry-run')
+    sbn = Subscription.objects.get()
+
+    assert 'I-0' in output and 'is_active: True -> False' in output
+    assert '1 differ' in output
+    assert sbn.is_active is True
+    assert sbn.last_reconciled_at is None
+
+
+def test_reconcile_since(fake_paypal, subscribers):
+    """Test incremental run skips recently reconciled subscriptions."""
+
+    recent, stale, never = subscribers(3)
+    Subscription.objects.filter(pk=recent.pk).update(
+        last_reconciled_at=timezone.now() - timedelta(hours=1)
+    )
+    Subscription.objects.filter(pk=stale.pk).update(
+        last_reconciled_at=timezone.now() - timedelta(hours=30)
+    )
+
+    output = reconcile('--since=24')
+
+    assert '2 subscriptions checked' in output
+    assert ('GET', '/v1/billing/subscriptions/I-0') not in fake_paypal.requests
+
+
+def test_reconcile_skips_pending(fake_paypal, subscribers):
+    """Test subscriptions with a queued PayPal operation are left alone."""
+
+    sbn, = subscribers(1)
+    Subscription.objects.filter(pk=sbn.pk).update(
+        pending_action=PayPalAction.SUSPEND
+    )
+
+    assert '0 subscriptions checked' in reconcile()
+
+
+def test_reconcile_resumes_from_checkpoint(fake_paypal, subscribers, tmp_path):
+    """Test run resumes after the subscription recorded in the checkpoint."""
+
+    first, second = subscribers(2)
+    checkpoint = tmp_path / 'reconcile.json'
+    checkpoint.write_text(json.dumps({'after_pk': first.pk}))
+
+    output = reconcile(f'--checkpoint={checkpoint}')
+
+    assert f'Resuming after subscription #{first.pk}' in output
+    assert '1 subscriptions checked' in output
+    assert not checkpoint.exists()
+
+
+def test_reconcile_counts_errors(fake_paypal, subscribers):
+    """Test unknown subscriptions are reported and not stamped."""
+
+    subscribers(1)
+    fake_paypal.auto_create = False
+
+    output = reconcile()
+
+    assert '1 failed' in output
+    assert Subscription.objects.get().last_reconciled_at is None
+
+
+def test_reconcile_keeps_concurrent_changes(fake_paypal, subscribers,
+                                            premium):
+    """Test only drifted fields of drifted subscriptions are written."""
+
+    subscribers(2)
+    fake_paypal.add_subscription('I-0', plan_id=premium.paypal_plan_id)
+    fake_paypal.add_subscription('I-1', plan_id='ST-935868202KH3945Q')
+    chunk, = iter_chunks(chunk_size=10)
+    # E.g. webhooks received while PayPal is queried.
+    Subscription.objects.update(is_active=False)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        drifts, errors = reconcile_chunk(chunk, executor,
+                                         RateLimiter(rate=1000, burst=2))
+
+    first, second = Subscription.objects.order_by('pk')
+
+    assert [(s.pk, list(changes)) for s, changes in drifts] == [
+        (first.pk, ['subscription_plan'])
+    ]
+    assert errors == []
+    assert first.subscription_plan == premium
+    assert first.is_active is False
+    assert second.is_active is False
+    assert first.last_reconciled_at and second.last_reconciled_at
+
+
+def test_reconcile_checkpoint_stops_before_errors(fake_paypal, subscribers,
+                                                  tmp_path):
+    """Test checkpoint is not advanced past a failed subscription."""
+
+    first, second, third = subscribers(3)
+    fake_paypal.auto_create = False
+    fake_paypal.add_subscription('I-0')
+    fake_paypal.add_subscription('I-2')
+    checkpoint = tmp_path / 'reconcile.json'
+
+    output = reconcile('--chunk-size=1', f'--checkpoint={checkpoint}')
+
+    assert '1 failed' in output
+    assert json.loads(checkpoint.read_text()) == {'after_pk': first.pk}
+
+
+def test_rate_limiter():
+    """Test calls are spread to the configured rate."""
+
+    limiter = RateLimiter(rate=20)
+    start = time.monotonic()
+
+    for _ in range(5):
+        limiter.acquire()
+
+    assert time.monotonic() - start >= 0.19
@@ -0,0 +1,194 @@
+"""
+Tests for trending articles.
+Command: pytest client/tests/test_trending.py --cov=client --cov-report term-missing:skip-covered
+"""
+
+import time
+
+from datetime import timedelta
+
+import pytest
+
+from unittest.mock import patch
+
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from client.models import TrendingArticle, TrendingScore
+from client.tiers import BASIC_TIER, PREMIUM_TIER
+from client.trending import (TrendingCounter, merge_scores, trending_articles,
+                             trending_counter)
+
+pytestmark = pytest.mark.django_db
+
+
+def titles(tier) -> list:
+    return [a['title'] for a in trending_articles(tier)]
+
+
+def test_counter_decays_scores(settings):
+    """Test a view counts half after one half-life."""
+
+    settings.TRENDING_HALF_LIFE = 10
+    counter = TrendingCounter(merge_interval=0)
+
+    with patch('client.trending.time.time', return_value=1000):
+        counter.record(1)
+    with patch('client.trending.time.time', return_value=1010):
+        counter.record(1)
+
+    score, at = counter._scores[1]
+
+    assert score == pytest.approx(1.5)
+    assert at == 1010
+
+
+def test_merge_ranks_articles_per_tier(user_writer, article, standard,
+                                       premium):
+    """Test merged views rank articles within the articles of each tier."""
+
+    basic = article(user_writer, title='Basic', slug='basic')
+    paid = article(user_writer, title='Paid', slug='paid',
+                   required_tier=PREMIUM_TIER)
+    counter = TrendingCounter(merge_interval=0)
+
+    for _ in range(3):
+        counter.record(paid.pk)
+    counter.record(basic.pk)
+
+    assert counter.merge() == 2
+    assert titles(PREMIUM_TIER) == ['Paid', 'Basic']
+    assert titles(BASIC_TIER) == ['Basic']
+
+
+@pytest.mark.parametrize('changes,basic_titles,premium_titles', [
+    ({'title': 'Renamed'}, ['Renamed'], ['Renamed']),
+    ({'required_tier': PREMIUM_TIER}, [], ['Basic']),
+])
+def test_changed_article_trends_as_changed(changes, basic_titles,
+                                           premium_titles, user_writer,
+                                           article, standard, premium,
+                                           django_capture_on_commit_callbacks):
+    """Test a retitled or re-tiered article leaves the lists it was in,
+    which are rebuilt with its new title and tier on commit."""
+
+    basic = article(user_writer, title='Basic', slug='basic')
+    counter = TrendingCounter(merge_interval=0)
+    counter.record(basic.pk)
+    counter.merge()
+
+    for field, value in changes.items():
+        setattr(basic, field, value)
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        basic.save(update_fields=list(changes))
+
+    assert titles(BASIC_TIER) == titles(PREMIUM_TIER) == []
+
+    for callback in callbacks:
+        callback()
+
+    assert titles(BASIC_TIER) == basic_titles
+    assert titles(PREMIUM_TIER) == premium_titles
+
+
+def test_merge_orders_upserts_by_article(user_writer, article):
+    """Test merged rows are upserted in article order."""
+
+    first = article(user_writer, title='First', slug='first')
+    second = article(user_writer, title='Second', slug='second')
+
+    with CaptureQueriesContext(connection) as queries:
+        merge_scores([(second.pk, 1.0), (first.pk, 1.0)], timezone.now())
+
+    sql, = [q['sql'] for q in queries if 'INSERT' in q['sql']]
+
+    assert sql.index(f'({first.pk}::bigint') < sql.index(
+        f'({second.pk}::bigint'
+    )
+    assert 'ORDER BY v.article_id' in sql
+
+
+def test_merge_adds_decayed_scores(settings, user_writer, article):
+    """Test scores of processes add up, older ones decayed."""
+
+    settings.TRENDING_HALF_LIFE = 60
+    a = article(user_writer)
+    now = timezone.now()
+
+    merge_scores([(a.pk, 4.0)], now - timedelta(seconds=60))
+    merge_scores([(a.pk, 1.0)], now)
+
+    score = TrendingScore.objects.get()
+
+    assert score.score == pytest.approx(3.0)
+    assert score.updated_at == now
+
+
+def test_fresh_views_outrank_old_ones(settings, user_writer, article,
+                                      standard):
+    """Test an article viewed long ago falls behind one viewed now."""
+
+    settings.TRENDING_HALF_LIFE = 60
+    old = article(user_writer, title='Old', slug='old')
+    new = article(user_writer, title='New', slug='new')
+    now = timezone.now()
+
+    merge_scores([(old.pk, 8.0)], now - timedelta(minutes=4))
+    counter = TrendingCounter(merge_interval=0)
+    counter.record(new.pk)
+    counter.record(new.pk)
+    counter.merge()
+
+    assert titles(BASIC_TIER) == ['New', 'Old']
+
+
+def test_merge_skips_deleted_articles(user_writer, article, standard):
+    """Test views of an article deleted before the merge are dropped."""
+
+    a = article(user_writer)
+    counter = TrendingCounter(merge_interval=0)
+    counter.record(a.pk)
+    a.delete()
+
+    counter.merge()
+
+    assert not TrendingScore.objects.exists()
+    assert not TrendingArticle.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_counter_merged_by_thread(user_writer, article, standard):
+    """Test the merging thread publishes views without an explicit merge."""
+
+    a = article(user_writer, title='Trending')
+    counter = TrendingCounter(merge_interval=0.05)
+
+    counter.record(a.pk)
+
+    deadline = time.monotonic() + 5
+    while not titles(BASIC_TIER) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert titles(BASIC_TIER) == ['Trending']
+
+
+def test_browse_articles_shows_trending(
+        client, sample_user, user_writer, article, subscription, standard
+):
+    """Test detail views feed the trending section of the browse page."""
+
+    a = article(user_writer, title='Hot topic')
+    subscription(user=sample_user, plan=standard)
+    client.force_login(sample_user)
+
+    client.get(reverse('client:article_detail', kwargs={'slug': a.slug}))
+    trending_counter.merge()
+    with CaptureQueriesContext(connection) as queries:
+        r = client.get(reverse('client:browse_articles'))
+
+    assert len([q for q in queries
+                if 'client_trending' in q['sql']]) == 1
+    assert r.context['trending'] == [{'title': 'Hot topic', 'slug': a.slug}]
+    assert 'Trending' in r.content.decode('utf-8')
@@ -0,0 +1,252 @@
+"""
+Tests for PayPal webhooks.
+Command: pytest client/tests/test_webhooks.py --cov=client --cov-report term-missing:skip-covered
+"""
+
+import base64
+import datetime
+import json
+import zlib
+
+import pytest
+
+from unittest.mock import Mock, patch
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.x509.oid import NameOID
+
+from django.shortcuts import reverse
+from django.test import override_settings
+
+from client.models import WebhookEvent
+from client.webhooks import verify_webhook_signature
+
+pytestmark = pytest.mark.django_db
+
+WEBHOOK_ID = 'WH-TEST-1'
+CERT_URL = 'https://api.sandbox.paypal.com/v1/notifications/certs/CERT-1'
+
+
+@pytest.fixture(scope='module')
+def signing_key():
+    """RSA key and matching self-signed certificate in PEM."""
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'paypal.test')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+
+    return key, certificate.public_bytes(serialization.Encoding.PEM)
+
+
+@pytest.fixture
+def signed(signing_key):
+    """Sign a webhook body and return request headers."""
+
+    key, pem = signing_key
+
+    def _sign(body: bytes, transmission_id='TX-1'):
+        transmission_time = '2025-03-09T16:10:00Z'
+        message = (f'{transmission_id}|{transmission_time}|{WEBHOOK_ID}|'
+                   f'{zlib.crc32(body)}')
+        signature = key.sign(message.encode(), padding.PKCS1v15(),
+                             hashes.SHA256())
+
+        return {
+            'Paypal-Transmission-Id': transmission_id,
+            'Paypal-Transmission-Time': transmission_time,
+            'Paypal-Transmission-Sig': base64.b64encode(signature).decode(),
+            'Paypal-Cert-Url': CERT_URL,
+            'Paypal-Auth-Algo': 'SHA256withRSA',
+        }
+
+    with patch('client.webhooks.paypal_client.session') as mocked_session:
+        mocked_session.get.return_value = Mock(content=pem)
+        yield _sign
+
+
+def subscription_event(event_id, sub_id, event_type='SUSPENDED', **resource):
+    return {
+        'id': event_id,
+        'event_type': f'BILLING.SUBSCRIPTION.{event_type}',
+        'create_time': '2025-03-09T16:10:00Z',
+        'resource': {'id': sub_id, **resource},
+    }
+
+
+@override_settings(PAYPAL_WEBHOOK_ID=WEBHOOK_ID)
+def test_verify_webhook_signature(signed):
+    """Test signature made with PayPal certificate is accepted."""
+
+    body = b'{"id": "WH-1"}'
+    headers = signed(body)
+
+    assert verify_webhook_signature(headers, body) is True
+    assert verify_webhook_signature(headers, b'{"id": "WH-2"}') is False
+
+
+@override_settings(PAYPAL_WEBHOOK_ID=WEBHOOK_ID)
+def test_verify_webhook_signature_certificate_cached(signed):
+    """Test signing certificate is downloaded once."""
+
+    from client.webhooks import paypal_client, _certificates
+
+    _certificates.clear()
+    body = b'{"id": "WH-1"}'
+
+    for _ in range(3):
+        assert verify_webhook_signature(signed(body), body)
+
+    assert paypal_client.session.get.call_count == 1
+
+
+@override_settings(PAYPAL_WEBHOOK_ID=WEBHOOK_ID)
+def test_verify_webhook_signature_untrusted_certificate_url(signed):
+    """Test certificates are downloaded from PayPal only."""
+
+    body = b'{"id": "WH-1"}'
+    headers = signed(body)
+    headers['Paypal-Cert-Url'] = 'https://paypal.com.example.org/cert'
+
+    assert verify_webhook_signature(headers, body) is False
+
+
+@override_settings(PAYPAL_WEBHOOK_ID=WEBHOOK_ID)
+@pytest.mark.parametrize(
+    'event_type,status,is_active',
+    [('SUSPENDED', 'SUSPENDED', False),
+     ('CANCELLED', 'CANCELLED', False),
+     ('ACTIVATED', 'ACTIVE', True)]
+)
+def test_webhook_updates_subscription_status(
+        event_type, status, is_active, client, signed, sample_user,
+        subscription, standard
+):
+    """Test subscription status follows PayPal events."""
+
+    sbn = subscription(user=sample_user, plan=standard,
+                       is_active=not is_active)
+    event = subscription_event('WH-1', sbn.paypal_subscription_id,
+                               event_type, status=status)
+    body = json.dumps(event).encode()
+
+    r = client.post(reverse('client:paypal_webhook'), body,
+                    content_type='application/json', headers=signed(body))
+
+    sbn.refresh_from_db()
+
+    assert r.status_code == 200
+    assert sbn.is_active is is_active
+    assert WebhookEvent.objects.get(event_id='WH-1').processed_at
+
+
+@override_settings(PAYPAL_WEBHOOK_ID=WEBHOOK_ID)
+def test_webhook_updates_subscription_plan(
+        client, signed, sample_user, subscription, standard, premium
+):
+    """Test plan revised on PayPal is applied to the subscription."""
+
+    sbn = subscription(user=sample_user, plan=standard)
+    event = subscription_event('WH-1', sbn.paypal_subscription_id, 'UPDATED',
+                               status='ACTIVE', plan_id=premium.paypal_plan_id)
+    body = json.dumps(event).encode()
+
+    client.post(reverse('client:paypal_webhook'), body,
+                content_type='application/json', headers=signed(body))
+
+    sbn.refresh_from_db()
+
+    assert sbn.subscription_plan == premium
+
+
+@override_settings(PAYPAL_WEBHOOK_ID=WEBHOOK_ID)
+def test_webhook_deduplicated_by_event_id(
+        client, signed, sample_user, subscription, standard
+):
+    """Test redelivered event is stored and applied once."""
+
+    sbn = subscription(user=sample_user, plan=standard)
+    event = subscription_event('WH-1', sbn.paypal_subscription_id,
+                               status='SUSPENDED')
+    body = json.dumps(event).encode()
+
+    for _ in range(2):
+        r = client.post(reverse('client:paypal_webhook'), body,
+                        content_type='application/json', headers=signed(body))
+        assert r.status_code == 200
+
+    assert WebhookEvent.objects.filter(event_id='WH-1').count() == 1
+
+
+@override_settings(PAYPAL_WEBHOOK_ID=WEBHOOK_ID)
+def test_webhook_invalid_signature_rejected(
+        client, signed, sample_user, subscription, standard
+):
+    """Test webhook with invalid signature is rejected."""
+
+    sbn = subscription(user=sample_user, plan=standard)
+    body = json.dumps(subscription_event(
+        'WH-1', sbn.paypal_subscription_id, status='SUSPENDED'
+    )).encode()
+    headers = signed(b'another body')
+
+    r = client.post(reverse('client:paypal_webhook'), body,
+                    content_type='application/json', headers=headers)
+
+    sbn.refresh_from_db()
+
+    assert r.status_code == 400
+    assert sbn.is_active is True
+    assert not WebhookEvent.objects.exists()
+
+
+@override_settings(PAYPAL_WEBHOOK_ID=WEBHOOK_ID)
+@pytest.mark.parametrize('event', [
+    [],
+    {'id': 'WH-1'},
+    {'event_type': 'BILLING.SUBSCRIPTION.SUSPENDED'},
+    {'id': 'WH-1', 'event_type': 'BILLING.SUBSCRIPTION.SUSPENDED'},
+    {**subscription_event('WH-1', 'I-1'), 'resource': 'I-1'},
+    {**subscription_event('WH-1', 'I-1'), 'create_time': '2025-02-30T00:00'},
+])
+def test_webhook_malformed_event_rejected(client, signed, event):
+    """Test malformed events are rejected instead of failing."""
+
+    body = json.dumps(event).encode()
+
+    r = client.post(reverse('client:paypal_webhook'), body,
+                    content_type='application/json', headers=signed(body))
+
+    assert r.status_code == 400
+    assert not WebhookEvent.objects.exists()
+
+
+@override_settings(PAYPAL_WEBHOOK_ID=WEBHOOK_ID)
+@patch('client.views.get_current_subscription_plan')
+def test_django_update_confirmed_page_reads_local_state(
+        mocked_plan, client, sample_user, subscription, premium
+):
+    """Test confirmation page does not ask PayPal when webhooks are used."""
+
+    subscription(user=sample_user, plan=premium)
+    client.force_login(sample_user)
+
+    r = client.get(reverse(
+        'client:django_subscription_confirmed',
+        kwargs={'subID': sample_user.subscription.paypal_subscription_id}
+    ))
+
+    assert r.status_code == 200
+    assert r.context['subPlan'] == premium
+    mocked_plan.assert_not_called()
@@ -0,0 +1,32 @@
+"""
+Article tiers covered by subscription plans.
+
+Tiers are ranks (see writer.models): a plan of tier n covers every article
+requiring tier n or lower.
+"""
+
+from client.catalog import plan_catalog
+from writer.models import BASIC_TIER, PREMIUM_TIER, Article  # noqa
+
+
+def plan_tiers() -> list[int]:
+    """Distinct tiers of the subscription plans, lowest first."""
+
+    return sorted({plan.tier for plan in plan_catalog.all()})
+
+
+def covering_tiers(required_tier: int) -> set[int]:
+    """Tiers whose plans cover an article requiring `required_tier`."""
+
+    top_tier = max(plan_tiers(), default=required_tier)
+    return set(range(required_tier, max(top_tier, required_tier) + 1))
+
+
+def tier_articles(tier: int, queryset=None):
+    """Return articles of `queryset` (all articles by default) covered by
+    the tier."""
+
+    if queryset is None:
+        queryset = Article.objects.all()
+
+    return queryset.filter(required_tier__lte=tier)
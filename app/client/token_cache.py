@@ -0,0 +1,125 @@
+"""
+Process-wide cache of the PayPal OAuth access token.
+"""
+
+import threading
+import time
+
+from django.core.cache import caches
+
+
+class AccessTokenCache:
+    """Keep a PayPal access token until shortly before it expires.
+
+    The token is held in process memory and mirrored to the Django cache,
+    so every worker sharing that cache reuses the same token. Refreshing
+    is single-flight: one thread per process, and one process per shared
+    cache (guarded by a short-lived lock key), calls the token endpoint
+    while the others wait for its result.
+
+    Tokens of different PayPal APIs (e.g. a fake one of a benchmark) need
+    their own `cache_key`.
+    """
+
+    def __init__(self, fetch_token, refresh_margin=300, lock_timeout=10,
+                 poll_interval=0.05, cache_alias='default',
+                 cache_key='paypal:access_token'):
+        self.fetch_token = fetch_token
+        self.cache_key = cache_key
+        self.lock_key = f'{cache_key}:lock'
+        self.refresh_margin = refresh_margin
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.cache_alias = cache_alias
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+        self._entry = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get(self) -> str:
+        """Return a valid access token, refreshing it if necessary."""
+
+        entry = self._entry
+        if self._is_fresh(entry):
+            self._count('hits')
+            return entry['token']
+
+        with self._lock:
+            # Another thread may have refreshed while we were waiting.
+            entry = self._entry
+            if not self._is_fresh(entry):
+                entry = self.cache.get(self.cache_key)
+
+            if self._is_fresh(entry):
+                self._entry = entry
+                self._count('hits')
+                return entry['token']
+
+            self._count('misses')
+            self._entry = self._refresh()
+            return self._entry['token']
+
+    def invalidate(self):
+        """Drop the token, e.g. after PayPal rejected it with 401."""
+
+        with self._lock:
+            self._entry = None
+            self.cache.delete(self.cache_key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def _refresh(self) -> dict:
+        if self.cache.add(self.lock_key, 1, timeout=self.lock_timeout):
+            try:
+                return self._fetch()
+            finally:
+                self.cache.delete(self.lock_key)
+
+        # Another worker is refreshing: wait for it to publish the token.
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            entry = self.cache.get(self.cache_key)
+            if self._is_fresh(entry):
+                return entry
+
+        return self._fetch()
+
+    def _fetch(self) -> dict:
+        token, expires_in = self.fetch_token()
+
+        # Refresh a little before PayPal expires the token; for very short
+        # lifetimes keep it for half of its validity instead.
+        lifetime = expires_in - self.refresh_margin
+        if lifetime <= 0:
+            lifetime = expires_in / 2
+
+        entry = {'token': token, 'expires_at': time.time() + lifetime}
+        self.cache.set(self.cache_key, entry, timeout=max(int(lifetime), 1))
+        self._count('refreshes')
+
+        return entry
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @staticmethod
+    def _is_fresh(entry) -> bool:
+        return bool(entry) and entry['expires_at'] > time.time()
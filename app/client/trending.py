@@ -0,0 +1,235 @@
+"""
+Trending articles.
+
+Articles are ranked by a time-decayed count of their detail page views:
+each view adds 1 and scores halve every TRENDING_HALF_LIFE seconds. Each
+process keeps decayed counters of its own views (`trending_counter`, O(1)
+per view). A background thread merges them every TRENDING_MERGE_INTERVAL
+seconds into the shared TrendingScore table, then rebuilds the top
+TRENDING_SIZE articles of every tier in TrendingArticle, limited to the
+articles the tier covers (see client.tiers). Pages read the list of their
+tier with one query.
+
+Since all scores decay at the same rate, their order only changes when
+views are merged; TrendingScore.trend keeps that order in an index.
+"""
+
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import (DatabaseError, close_old_connections, connection,
+                       transaction)
+from django.utils import timezone
+
+from client.models import TrendingArticle, TrendingScore
+from client.tiers import plan_tiers, tier_articles
+from writer.models import Article
+
+logger = logging.getLogger(__name__)
+
+# Scores decayed below it are dropped from TrendingScore.
+MIN_SCORE = 0.01
+
+# Only one process rebuilds the lists at a time.
+REFRESH_LOCK_ID = 0x7472656e64
+
+MERGE_SQL = """
+INSERT INTO {scores} AS s (article_id, score, updated_at, trend)
+SELECT v.article_id, v.score, %s, ln(v.score) + %s
+FROM (VALUES {values}) AS v (article_id, score)
+JOIN {article} ON {article}.id = v.article_id
+ORDER BY v.article_id
+ON CONFLICT (article_id) DO UPDATE SET
+    score = s.score * exp(-%s * extract(epoch FROM excluded.updated_at
+                                        - s.updated_at)) + excluded.score,
+    updated_at = excluded.updated_at,
+    trend = ln(s.score * exp(-%s * extract(epoch FROM excluded.updated_at
+                                           - s.updated_at)) + excluded.score)
+            + %s
+"""
+
+
+def decay_rate() -> float:
+    """Share of score lost per second, continuously."""
+
+    return math.log(2) / settings.TRENDING_HALF_LIFE
+
+
+class TrendingCounter:
+    """Decayed view counts of this process since the last merge.
+
+    The merging thread runs every `merge_interval` seconds
+    (TRENDING_MERGE_INTERVAL by default); without an interval, only
+    explicit `merge` calls merge.
+    """
+
+    def __init__(self, merge_interval: float | None = None):
+        self.merge_interval = merge_interval
+
+        self.merges = 0
+        self.failures = 0
+
+        self._scores = {}
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._thread = None
+        # Never set: the thread waits on it between merges, so that a
+        # time.sleep patched by tests does not make it spin.
+        self._idle = threading.Event()
+
+    def record(self, article_id: int):
+        now = time.time()
+
+        with self._lock:
+            score, at = self._scores.get(article_id, (0.0, now))
+            self._scores[article_id] = (
+                score * math.exp(-decay_rate() * (now - at)) + 1, now
+            )
+
+        if self.interval():
+            self._ensure_thread()
+
+    def merge(self) -> int:
+        """Add the counters to the shared scores and rebuild the lists;
+        return the number of articles merged."""
+
+        with self._lock:
+            scores, self._scores = self._scores, {}
+
+        if not scores:
+            return 0
+
+        now = timezone.now()
+        rate = decay_rate()
+        rows = [
+            (article_id,
+             score * math.exp(-rate * (now.timestamp() - at)))
+            for article_id, (score, at) in scores.items()
+        ]
+
+        try:
+            merge_scores(rows, now)
+            refresh_trending(now)
+        except DatabaseError:
+            logger.exception('Failed to merge trending scores of %s articles',
+                             len(rows))
+            self._count('failures')
+            return 0
+
+        self._count('merges')
+        return len(rows)
+
+    def clear(self):
+        with self._lock:
+            self._scores = {}
+
+    def interval(self) -> float:
+        return (self.merge_interval if self.merge_interval is not None
+                else settings.TRENDING_MERGE_INTERVAL)
+
+    def _ensure_thread(self):
+        # Also restarts the thread in a process forked from one running it.
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name='trending-counter',
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._idle.wait(self.interval())
+            try:
+                self.merge()
+            finally:
+                close_old_connections()
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+
+def merge_scores(rows: list[tuple], now):
+    """Add (article_id, score) rows, decayed to `now`, to the shared scores.
+
+    Scores of deleted articles are skipped. Rows are upserted in article
+    order, so that concurrent merges lock the rows they share in the same
+    order instead of deadlocking.
+    """
+
+    rows = sorted(rows)
+
+    rate = decay_rate()
+    offset = rate * now.timestamp()
+    sql = MERGE_SQL.format(
+        scores=TrendingScore._meta.db_table,
+        article=Article._meta.db_table,
+        values=', '.join(['(%s::bigint, %s::float)'] * len(rows)),
+    )
+    params = [now, offset]
+    for row in rows:
+        params.extend(row)
+    params += [rate, rate, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def refresh_trending(now=None):
+    """Rebuild the top articles of every tier from the shared scores and
+    drop scores decayed to nothing; skipped while another process does."""
+
+    now = now or timezone.now()
+    size = settings.TRENDING_SIZE
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_xact_lock(%s)',
+                           [REFRESH_LOCK_ID])
+            if not cursor.fetchone()[0]:
+                return
+
+        TrendingScore.objects.filter(
+            trend__lt=math.log(MIN_SCORE) + decay_rate() * now.timestamp()
+        ).delete()
+
+        TrendingArticle.objects.all().delete()
+        TrendingArticle.objects.bulk_create([
+            TrendingArticle(tier=tier, rank=rank, article_id=pk,
+                            title=title, slug=slug)
+            for tier in plan_tiers()
+            for rank, (pk, title, slug) in enumerate(
+                tier_articles(tier).filter(
+                    trending_score__isnull=False
+                ).order_by('-trending_score__trend').values_list(
+                    'pk', 'title', 'slug'
+                )[:size], 1
+            )
+        ])
+
+
+def forget_trending(article: Article):
+    """Drop the article from the top lists, then rebuild them once the
+    change is committed, where its new title or tier places it."""
+
+    if TrendingArticle.objects.filter(article=article).delete()[0]:
+        transaction.on_commit(refresh_trending)
+
+
+def trending_articles(tier: int) -> list[dict]:
+    """Top trending articles covered by the tier, best first."""
+
+    return list(TrendingArticle.objects.filter(
+        tier=tier
+    ).order_by('rank').values('title', 'slug'))
+
+
+trending_counter = TrendingCounter()
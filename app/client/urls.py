@@ -15,6 +15,16 @@ urlpatterns = [
         'browse-articles/',
         views.BrowseArticlesView.as_view(),
         name='browse_articles'),
+    path(
+        'search-articles/',
+        views.SearchArticlesView.as_view(),
+        name='search_articles'
+    ),
+    path(
+        'autocomplete-articles/',
+        views.autocomplete_articles,
+        name='autocomplete_articles'
+    ),
     path(
         'subscription-plans/',
         views.SubscriptionPlansView.as_view(),
@@ -53,4 +63,7 @@ urlpatterns = [
         views.activate_subscription,
         name='activate_subscription'
     ),
+    path('paypal-webhook/', views.paypal_webhook, name='paypal_webhook'),
+    path('paypal-stats/', views.paypal_stats, name='paypal_stats'),
+    path('listing-stats/', views.listing_stats, name='listing_stats'),
 ]
@@ -1,24 +1,51 @@
+import json
+
+from django.conf import settings
 from django.db import IntegrityError
+from django.db.models import Q
+from django.http import (JsonResponse, HttpResponse, HttpResponseBadRequest,
+                         Http404)
 from django.shortcuts import redirect, reverse, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.safestring import mark_safe
 
 from django.views.generic import TemplateView, DetailView, ListView, RedirectView
 
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 
 from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
+from core.pagination import KeysetPaginationMixin
 from writer.models import Article
-
-from client.models import Subscription, SubscriptionPlan
-from client.exceptions import SubscriptionNotDeletedException
-from client.paypal import (get_access_token,
-                           cancel_subscription_paypal,
+from writer.related import related_articles, related_updated_at
+from writer.search import search_articles
+from writer.view_counts import view_buffer
+
+from client.autocomplete import suggest_titles
+from client.catalog import plan_catalog
+from client.models import Subscription, PayPalAction
+from client.exceptions import PayPalUnavailableException
+from client.listing_cache import listing_cache
+from client.outbox import enqueue
+from client.tiers import tier_articles
+from client.trending import trending_articles, trending_counter
+from client.paypal import (paypal_client,
+                           get_access_token,
                            update_subscription_paypal,
-                           get_current_subscription_plan,
-                           deactivate_subscription_paypal,
-                           activate_subscription_paypal)
+                           get_current_subscription_plan)
+from client.webhooks import (verify_webhook_signature,
+                             store_webhook_event,
+                             process_webhook_events)
+
+PAYPAL_UNAVAILABLE_MESSAGE = ('PayPal is temporarily unavailable! '
+                              'Please, try again in a few minutes.')
 
 
 class ClientDashboardView(LoginRequiredMixin, TemplateView):
@@ -39,13 +66,11 @@ class ClientDashboardView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        subscriptions = Subscription.objects.filter(
-            user=self.request.user,
-            # is_active=True
-        ).order_by('-id')
+        subscription = self.request.entitlement.subscription
 
-        if subscriptions.exists():
-            context['sub_plan'] = subscriptions[0].subscription_plan
+        if subscription is not None:
+            context['sub_plan'] = subscription.subscription_plan
+            context['sub_pending'] = subscription.get_pending_action_display()
 
         context['title'] = 'Edenthought | Dashboard'
 
@@ -56,41 +81,148 @@ class ArticleDetailView(LoginRequiredMixin, DetailView):
     login_url = 'login'
     redirect_field_name = 'redirect_to'
 
-    model = Article
+    # Pages show the pre-rendered content_html, see writer.rendering.
+    queryset = Article.objects.select_related('author').defer(
+        'content', 'search_vector'
+    )
     template_name = 'client/article_detail.html'
 
+    def get_queryset(self):
+        """Articles covered by the user's plan, and the user's own ones."""
+
+        tier = self.request.entitlement.tier
+        user_articles = Q(author=self.request.user)
+
+        if tier is None:
+            return self.queryset.filter(user_articles)
+
+        return self.queryset.filter(user_articles | Q(required_tier__lte=tier))
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        if self.object.author_id != request.user.pk:
+            view_buffer.record(self.object.pk)
+            trending_counter.record(self.object.pk)
+
+        # Related articles shown on the page change with their rebuilds.
+        related_at = related_updated_at()
+        etag = self.get_etag(related_at)
+        last_modified = int(max(
+            self.object.last_modified, related_at or self.object.last_modified
+        ).timestamp())
+
+        # Queued messages are shown on the page, so it must be rendered.
+        response = None
+        if not messages.get_messages(request):
+            response = get_conditional_response(request, etag=etag,
+                                                last_modified=last_modified)
+        if response is None:
+            response = self.render_to_response(
+                self.get_context_data(object=self.object)
+            )
+
+        response.headers['ETag'] = etag
+        response.headers['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+
+        return response
+
+    def get_etag(self, related_at) -> str:
+        """The page differs by article version, by user (menu, links), by
+        tier (related articles shown) and by build of related articles."""
+
+        return quote_etag(
+            f'{self.object.pk}-{self.object.last_modified.timestamp()}-'
+            f'{self.request.user.pk}-{self.request.entitlement.tier}-'
+            f'{related_at.timestamp() if related_at else 0}'
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['title'] = f'Edenthought | {self.get_object().title}'
+        context['title'] = f'Edenthought | {self.object.title}'
+        context['body_cache_ttl'] = settings.ARTICLE_BODY_CACHE_TTL
+        context['related_articles'] = related_articles(
+            self.object, self.request.entitlement.tier
+        )
         return context
 
 
-class BrowseArticlesView(LoginRequiredMixin, ListView):
+class SubscriberArticlesMixin:
+    """Limit articles to those covered by the subscription plan of the user.
+
+    `get_queryset` returns None for users without an active subscription.
+    """
+
+    queryset = Article.objects.defer('content', 'search_vector')
+
+    def get_queryset(self):
+        tier = self.request.entitlement.tier
+
+        if tier is None:
+            return None
+
+        return tier_articles(tier, self.queryset)
+
+
+class BrowseArticlesView(LoginRequiredMixin, SubscriberArticlesMixin,
+                         KeysetPaginationMixin, ListView):
     login_url = 'login'
     redirect_field_name = 'redirect_to'
 
     template_name = 'client/browse_articles.html'
+    listing_template_name = 'client/includes/article_list.html'
+    context_object_name = 'articles'
+
+    def get_context_data(self, **kwargs):
+        tier = self.request.entitlement.tier
+        cursor = self.request.GET.get(self.cursor_param) or ''
+        listing = listing_cache.get(tier, cursor) if tier else None
+
+        if listing is None:
+            context = super().get_context_data(**kwargs)
+            listing = render_to_string(self.listing_template_name, context,
+                                       self.request)
+            if tier:
+                listing_cache.set(tier, cursor, listing)
+        else:
+            # The page is rendered already: skip its query.
+            context = super(KeysetPaginationMixin, self).get_context_data(
+                **kwargs
+            )
+
+        context['listing'] = mark_safe(listing)
+        context['trending'] = trending_articles(tier) if tier else []
+        context['title'] = 'Edenthought | Articles'
+        return context
+
+
+class SearchArticlesView(LoginRequiredMixin, SubscriberArticlesMixin,
+                         ListView):
+    login_url = 'login'
+    redirect_field_name = 'redirect_to'
 
-    queryset = Article.objects.all().order_by('-date_posted')
+    template_name = 'client/search_articles.html'
     context_object_name = 'articles'
 
     def get_queryset(self):
-        user = self.request.user
-
-        if (not hasattr(user, 'subscription') or
-            not user.subscription or # noqa
-            not user.subscription.is_active):  # noqa
+        queryset = super().get_queryset()
+        self.query = self.request.GET.get('q', '').strip()
 
+        if queryset is None:
             return None
 
-        if user.subscription.subscription_plan.name == 'standard':  # noqa
-            return self.queryset.filter(is_premium=False)
+        if not self.query:
+            return queryset.none()
 
-        return self.queryset
+        return search_articles(queryset, self.query)
+
+    def get_paginate_by(self, queryset):
+        return settings.ARTICLES_PAGE_SIZE if queryset is not None else None
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['title'] = 'Edenthought | Articles'
+        context['title'] = 'Edenthought | Search'
+        context['query'] = self.query
         return context
 
 
@@ -103,6 +235,7 @@ class SubscriptionPlansView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Edenthought | Subscription Plans'
+        context['plans'] = plan_catalog.all()
         return context
 
 
@@ -115,7 +248,10 @@ class CreateSubscriptionView(LoginRequiredMixin, RedirectView):
         user = self.request.user
         sub_id = self.request.GET.get('subID')
         plan_name = self.request.GET.get('plan')
-        plan = get_object_or_404(SubscriptionPlan, name=plan_name)
+        plan = plan_catalog.by_name(plan_name)
+
+        if plan is None:
+            raise Http404('No subscription plan matches the given query.')
 
         try:
             Subscription.objects.create(
@@ -159,25 +295,18 @@ class DeleteSubscriptionView(TemplateView):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Edenthought | Delete Subscription'
 
-        sub_id = self.kwargs.get('subID')
-
-        # Delete subscription from PayPal
-        access_token = get_access_token()
-
-        try:
-            cancel_subscription_paypal(access_token, sub_id)
-        except SubscriptionNotDeletedException:
-            context['is_deleted'] = False
+        subscription = get_object_or_404(
+            Subscription,
+            user=self.request.user,
+            paypal_subscription_id=self.kwargs.get('subID')
+        )
 
-        else:
-            # Delete subscription from Django (application side)
-            subscription = get_object_or_404(
-                Subscription,
-                user=self.request.user,
-                paypal_subscription_id=sub_id
-            )
-            subscription.delete()
-            context['is_deleted'] = True
+        # Cancelled on PayPal by the `paypal_worker` command, which then
+        # deletes the subscription on application side.
+        context['is_pending'] = (
+            subscription.pending_action == PayPalAction.CANCEL or
+            enqueue(subscription, PayPalAction.CANCEL) is not None
+        )
 
         return context
 
@@ -199,11 +328,16 @@ class UpdateSubscriptionView(RedirectView):
         )
 
     def get_redirect_url(self, *args, **kwargs):
-        access_token = get_access_token()
-        approve_link = update_subscription_paypal(
-            access_token,
-            sub_id=self.kwargs.get('sub_id', None)
-        )
+        try:
+            access_token = get_access_token()
+            approve_link = update_subscription_paypal(
+                access_token,
+                sub_id=self.kwargs.get('sub_id', None)
+            )
+        except PayPalUnavailableException:
+            messages.error(self.request, PAYPAL_UNAVAILABLE_MESSAGE)
+            return reverse('account')
+
         if approve_link:
             messages.success(self.request, 'Subscription updated successfully!')
             return approve_link
@@ -221,9 +355,9 @@ class PayPalSubConfirmedView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         context['title'] = 'PayPal Confirmed Subscription'
 
-        subscription = Subscription.objects.filter(user=self.request.user)
-        if subscription.exists():
-            context['subID'] = subscription[0].paypal_subscription_id
+        subscription = self.request.entitlement.subscription
+        if subscription is not None:
+            context['subID'] = subscription.paypal_subscription_id
 
         return context
 
@@ -254,23 +388,35 @@ class DjangoSubConfirmedView(TemplateView):
             user=self.request.user,
             paypal_subscription_id=self.kwargs.get('subID')
         )
-        access_token = get_access_token()
-        paypal_subscription_plan_id = get_current_subscription_plan(
-            access_token,
-            self.kwargs['subID']
-        )
-        current_subscription_plan_id = subscription.subscription_plan.paypal_plan_id
+        current_plan = plan_catalog.by_id(subscription.subscription_plan_id)
+
+        # Plan changes arrive with PayPal webhooks; ask PayPal directly only
+        # when webhooks are not configured.
+        if settings.PAYPAL_WEBHOOK_ID:
+            context['subPlan'] = current_plan
+            return context
 
-        if paypal_subscription_plan_id != current_subscription_plan_id:
-            new_plan = get_object_or_404(
-                SubscriptionPlan,
-                paypal_plan_id=paypal_subscription_plan_id
+        try:
+            access_token = get_access_token()
+            paypal_subscription_plan_id = get_current_subscription_plan(
+                access_token,
+                self.kwargs['subID']
             )
+        except PayPalUnavailableException:
+            messages.error(self.request, PAYPAL_UNAVAILABLE_MESSAGE)
+            context['subPlan'] = current_plan
+            return context
 
-            subscription.subscription_plan = new_plan
+        if paypal_subscription_plan_id != current_plan.paypal_plan_id:
+            new_plan = plan_catalog.by_paypal_id(paypal_subscription_plan_id)
+
+            if new_plan is None:
+                raise Http404('No subscription plan matches the given query.')
+
+            subscription.subscription_plan = current_plan = new_plan
             subscription.save()
 
-        context['subPlan'] = subscription.subscription_plan
+        context['subPlan'] = current_plan
 
         return context
 
@@ -280,23 +426,19 @@ class DjangoSubConfirmedView(TemplateView):
     redirect_field_name='redirect_to'
 )
 def deactivate_subscription(request, sub_id):
-    """Deactivate a subscription of a client."""
+    """Request deactivation of a subscription of a client."""
 
-    access_token = get_access_token()
-    status_code = deactivate_subscription_paypal(access_token, sub_id)
+    subscription = get_object_or_404(
+        Subscription,
+        user=request.user,
+        paypal_subscription_id=sub_id
+    )
 
-    if status_code == 204:
-        subscription = get_object_or_404(
-            Subscription,
-            paypal_subscription_id=sub_id
-        )
-        subscription.is_active = False
-        subscription.save()
-
-        messages.success(request, 'Subscription deactivated successfully!')
+    if enqueue(subscription, PayPalAction.SUSPEND):
+        messages.success(request, 'Subscription deactivation requested!')
         return redirect('client:dashboard')
 
-    messages.error(request, 'Something went wrong!')
+    messages.error(request, 'Another subscription change is in progress!')
     return redirect(request.META.get('HTTP_REFERER', reverse('client:dashboard')))
 
 
@@ -305,21 +447,66 @@ def deactivate_subscription(request, sub_id):
     redirect_field_name='redirect_to'
 )
 def activate_subscription(request, sub_id):
-    """Activate a subscription of a client."""
+    """Request activation of a subscription of a client."""
 
-    access_token = get_access_token()
-    status_code = activate_subscription_paypal(access_token, sub_id)
-
-    if status_code == 204:
-        subscription = get_object_or_404(
-            Subscription,
-            paypal_subscription_id=sub_id
-        )
-        subscription.is_active = True
-        subscription.save()
+    subscription = get_object_or_404(
+        Subscription,
+        user=request.user,
+        paypal_subscription_id=sub_id
+    )
 
-        messages.success(request, 'Subscription activated successfully!')
+    if enqueue(subscription, PayPalAction.ACTIVATE):
+        messages.success(request, 'Subscription activation requested!')
         return redirect('client:dashboard')
 
-    messages.error(request, 'Something went wrong!')
+    messages.error(request, 'Another subscription change is in progress!')
     return redirect(request.META.get('HTTP_REFERER', reverse('client:dashboard')))
+
+
+@csrf_exempt
+@require_POST
+def paypal_webhook(request):
+    """Receive PayPal subscription events and apply them to subscriptions."""
+
+    if not verify_webhook_signature(request.headers, request.body):
+        return HttpResponseBadRequest('Invalid signature')
+
+    try:
+        event = json.loads(request.body)
+        store_webhook_event(event)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid payload')
+
+    process_webhook_events()
+
+    return HttpResponse(status=200)
+
+
+@login_required(
+    login_url='login',
+    redirect_field_name='redirect_to'
+)
+def autocomplete_articles(request):
+    """Suggest titles of the user's tier for the text typed in search box."""
+
+    tier = request.entitlement.tier
+    if tier is None:
+        return JsonResponse({'results': []})
+
+    return JsonResponse({
+        'results': suggest_titles(tier, request.GET.get('q', ''))
+    })
+
+
+@staff_member_required(login_url='login')
+def paypal_stats(request):
+    """Report PayPal integration counters of the current worker process."""
+
+    return JsonResponse(paypal_client.stats())
+
+
+@staff_member_required(login_url='login')
+def listing_stats(request):
+    """Report browse listing cache counters of the current worker process."""
+
+    return JsonResponse(listing_cache.stats())
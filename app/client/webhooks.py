@@ -0,0 +1,216 @@
+"""
+PayPal webhooks: signature verification and applying subscription events.
+"""
+
+import base64
+import hashlib
+import logging
+import threading
+import zlib
+
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import urlparse
+
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from client.catalog import plan_catalog
+from client.entitlements import invalidate_entitlements
+from client.models import Subscription, WebhookEvent
+from client.paypal import paypal_client
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTION_EVENT_PREFIX = 'BILLING.SUBSCRIPTION.'
+
+ACTIVE_STATUSES = {'ACTIVE'}
+INACTIVE_STATUSES = {'SUSPENDED', 'CANCELLED', 'EXPIRED'}
+
+_certificates = {}
+_certificates_lock = threading.Lock()
+
+
+def get_certificate(cert_url: str) -> x509.Certificate:
+    """Return PayPal signing certificate, downloading it only once.
+
+    Certificates are kept in process memory and, as PEM, in the shared
+    cache so that other workers do not download them again.
+    """
+
+    url = urlparse(cert_url)
+    if url.scheme != 'https' or not (url.hostname or '').endswith('.paypal.com'):
+        raise ValueError(f'Untrusted certificate URL: {cert_url}')
+
+    with _certificates_lock:
+        certificate = _certificates.get(cert_url)
+
+    if certificate is None:
+        cache_key = f'paypal:cert:{hashlib.sha256(cert_url.encode()).hexdigest()}'
+        pem = cache.get(cache_key)
+
+        if pem is None:
+            r = paypal_client.session.get(
+                cert_url,
+                timeout=paypal_client.timeouts['default']
+            )
+            r.raise_for_status()
+            pem = r.content
+            cache.set(cache_key, pem, timeout=settings.PAYPAL_CERT_CACHE_TIMEOUT)
+
+        certificate = x509.load_pem_x509_certificate(pem)
+
+        with _certificates_lock:
+            _certificates[cert_url] = certificate
+
+    return certificate
+
+
+def verify_webhook_signature(headers, body: bytes) -> bool:
+    """Check the webhook was signed by PayPal for our webhook ID."""
+
+    webhook_id = settings.PAYPAL_WEBHOOK_ID
+    transmission_id = headers.get('Paypal-Transmission-Id')
+    transmission_time = headers.get('Paypal-Transmission-Time')
+    signature = headers.get('Paypal-Transmission-Sig')
+    cert_url = headers.get('Paypal-Cert-Url')
+    auth_algo = headers.get('Paypal-Auth-Algo')
+
+    if not all((webhook_id, transmission_id, transmission_time, signature,
+                cert_url)) or auth_algo != 'SHA256withRSA':
+        return False
+
+    message = (f'{transmission_id}|{transmission_time}|{webhook_id}|'
+               f'{zlib.crc32(body)}')
+
+    try:
+        certificate = get_certificate(cert_url)
+        if certificate.not_valid_after_utc < datetime.now(dt_timezone.utc):
+            return False
+
+        certificate.public_key().verify(
+            base64.b64decode(signature),
+            message.encode(),
+            padding.PKCS1v15(),
+            hashes.SHA256()
+        )
+    except (InvalidSignature, ValueError) as e:
+        logger.warning('Invalid PayPal webhook signature: %s', e)
+        return False
+    except Exception as e:  # noqa
+        logger.warning('PayPal webhook certificate unavailable: %s', e)
+        return False
+
+    return True
+
+
+def store_webhook_event(event: dict):
+    """Save a subscription event. Redelivered events are ignored thanks to
+    the unique event id, events of other types are not stored.
+
+    Raises ValueError when the event is malformed.
+    """
+
+    if not isinstance(event, dict):
+        raise ValueError('Event is not an object')
+
+    event_type = event.get('event_type')
+    if not isinstance(event_type, str):
+        raise ValueError('Event without a type')
+    if not event_type.startswith(SUBSCRIPTION_EVENT_PREFIX):
+        return
+
+    event_id = event.get('id')
+    if not isinstance(event_id, str) or not event_id:
+        raise ValueError('Event without an id')
+
+    resource = event.get('resource')
+    resource_id = resource.get('id') if isinstance(resource, dict) else None
+    if not isinstance(resource_id, str):
+        raise ValueError('Event without a subscription id')
+
+    WebhookEvent.objects.bulk_create(
+        [WebhookEvent(
+            event_id=event_id,
+            event_type=event_type,
+            resource_id=resource_id,
+            payload=event,
+            # ValueError for a well-formed but invalid time.
+            event_time=parse_datetime(str(event.get('create_time') or '')),
+        )],
+        ignore_conflicts=True
+    )
+
+
+def apply_events(events: list[WebhookEvent]):
+    """Apply plan and status changes of the events to subscriptions."""
+
+    subscriptions = {
+        s.paypal_subscription_id: s for s in Subscription.objects.filter(
+            paypal_subscription_id__in={e.resource_id for e in events}
+        )
+    }
+    changed = {}
+
+    for event in events:
+        subscription = subscriptions.get(event.resource_id)
+        resource = event.payload.get('resource') or {}
+
+        if subscription is not None:
+            status = resource.get('status')
+            plan = plan_catalog.by_paypal_id(resource.get('plan_id'))
+
+            if status in ACTIVE_STATUSES:
+                subscription.is_active = True
+            elif status in INACTIVE_STATUSES:
+                subscription.is_active = False
+
+            if plan is not None:
+                subscription.subscription_plan = plan
+
+            changed[subscription.pk] = subscription
+
+        event.processed_at = timezone.now()
+
+    Subscription.objects.bulk_update(
+        changed.values(),
+        ['is_active', 'subscription_plan']
+    )
+    invalidate_entitlements(*(s.user_id for s in changed.values()))
+    paypal_client.detail_cache.invalidate(*{e.resource_id for e in events})
+    WebhookEvent.objects.bulk_update(events, ['processed_at'])
+
+
+def process_webhook_events(batch_size: int | None = None) -> int:
+    """Apply unprocessed events in batches, one transaction per batch.
+
+    Rows are locked with SKIP LOCKED, so concurrent webhook requests never
+    apply the same event twice. Returns the number of processed events.
+    """
+
+    batch_size = batch_size or settings.PAYPAL_WEBHOOK_BATCH_SIZE
+    processed = 0
+
+    while True:
+        with transaction.atomic():
+            events = list(
+                WebhookEvent.objects
+                .select_for_update(skip_locked=True)
+                .filter(processed_at__isnull=True)
+                .order_by('event_time', 'id')[:batch_size]
+            )
+            if not events:
+                break
+
+            apply_events(events)
+
+        processed += len(events)
+
+    return processed
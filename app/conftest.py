@@ -1,11 +1,60 @@
 import pytest
 
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
 
 from account.models import CustomUser
 
-from writer.models import Article
+from writer.models import PREMIUM_TIER, Article
+from writer.view_counts import view_buffer
+from client.catalog import plan_catalog
+from client.fake_paypal import FakePayPalServer
 from client.models import Subscription, SubscriptionPlan
+from client.paypal import paypal_client
+from client.trending import trending_counter
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty cache, plan catalog and view
+    counters."""
+
+    cache.clear()
+    plan_catalog.invalidate()
+    view_buffer.clear()
+    trending_counter.clear()
+
+    yield
+
+    # Views left buffered would be flushed at exit, into the test database
+    # kept by --reuse-db.
+    view_buffer.clear()
+
+
+@pytest.fixture(autouse=True)
+def no_background_writes(settings):
+    """Flush buffered article views in the request and merge trending
+    counts on demand instead of in a thread, whose connection would not see
+    the test transaction."""
+
+    settings.VIEW_BUFFER_FLUSH_INTERVAL = 0
+    settings.TRENDING_MERGE_INTERVAL = 0
+
+
+@pytest.fixture
+def fake_paypal():
+    """Point the PayPal client at a local fake PayPal API."""
+
+    server = FakePayPalServer().start()
+    base_url = paypal_client.base_url
+    paypal_client.base_url = server.url
+    paypal_client.token_cache.invalidate()
+
+    yield server.paypal
+
+    paypal_client.base_url = base_url
+    paypal_client.token_cache.invalidate()
+    server.stop()
 
 
 @pytest.fixture
@@ -123,7 +172,8 @@ def premium():
         'paypal_plan_id': 'PR-1950RTB994dkW99',
         'name': 'premium',
         'cost': 9.90,
-        'description': 'Full access'
+        'description': 'Full access',
+        'tier': PREMIUM_TIER
     }
 
     return SubscriptionPlan.objects.create(**data)
@@ -0,0 +1,187 @@
+"""
+Streamed exports.
+
+Exports are generators of CSV, NDJSON or ZIP chunks sent with
+StreamingHttpResponse (or written to a file by the `export_data` command),
+so memory stays flat whatever their size. Rows are read by `keyset_rows`
+in primary key order, CHUNK_SIZE at a time, each chunk a short indexed
+query starting after the last key of the previous one. A server-side
+cursor (`QuerySet.iterator()`) would not do: outside a transaction Django
+declares it WITH HOLD, and PostgreSQL then computes the whole result
+before returning its first row.
+
+The header of a CSV export is sent before its query even runs, the first
+row of CSV and NDJSON exports (and the header of each ZIP member) as soon
+as it is ready, further rows once BUFFER_SIZE characters are; no export
+waits for its last row to send its first bytes.
+"""
+
+import csv
+import time
+import zipfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# Rows fetched per query.
+CHUNK_SIZE = 2000
+
+# Characters buffered before a chunk is sent.
+BUFFER_SIZE = 64 * 1024
+
+# First characters of CSV cells that spreadsheets read as a formula.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'zip': 'application/zip',
+}
+
+
+class Echo:
+    """File-like object returning what is written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def keyset_rows(queryset):
+    """Rows of the queryset in primary key order, fetched by keyset
+    CHUNK_SIZE at a time. Rows are model instances or tuples starting with
+    the primary key (`values_list('pk', ...)`)."""
+
+    queryset = queryset.order_by('pk')
+    chunk = list(queryset[:CHUNK_SIZE])
+
+    while chunk:
+        yield from chunk
+        if len(chunk) < CHUNK_SIZE:
+            return
+        last = chunk[-1]
+        chunk = list(queryset.filter(
+            pk__gt=last[0] if isinstance(last, tuple) else last.pk
+        )[:CHUNK_SIZE])
+
+
+def buffered(lines):
+    """Join lines into chunks of about BUFFER_SIZE characters; the first
+    line is sent on its own, as soon as it is ready."""
+
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    yield first
+
+    chunk = []
+    size = 0
+
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+
+    if chunk:
+        yield ''.join(chunk)
+
+
+def csv_cell(value):
+    """Value as a CSV cell; text a spreadsheet would run as a formula is
+    prefixed with a quote."""
+
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def csv_stream(columns, rows):
+    """CSV of rows, header first."""
+
+    writer = csv.writer(Echo())
+    # Sent on its own, before the rows are queried.
+    yield writer.writerow(columns)
+    yield from buffered(
+        writer.writerow([csv_cell(value) for value in row]) for row in rows
+    )
+
+
+def ndjson_stream(columns, rows):
+    """One JSON object per row and line."""
+
+    encoder = DjangoJSONEncoder()
+    yield from buffered(
+        encoder.encode(dict(zip(columns, row))) + '\n' for row in rows
+    )
+
+
+STREAMS = {
+    'csv': csv_stream,
+    'ndjson': ndjson_stream,
+}
+
+
+class ZipSink:
+    """Unseekable file collecting what zipfile writes until drained."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Yield what was written since, if anything."""
+
+        if self.chunks:
+            data = b''.join(self.chunks)
+            self.chunks = []
+            yield data
+
+
+def zip_stream(members):
+    """ZIP archive of (name, chunks) members, compressed as they stream.
+
+    Sizes and checksums follow the data of each member, so nothing is
+    rewritten once sent.
+    """
+
+    sink = ZipSink()
+    date_time = time.localtime()[:6]
+
+    with zipfile.ZipFile(sink, 'w') as archive:
+        for name, chunks in members:
+            info = zipfile.ZipInfo(name, date_time=date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with archive.open(info, 'w') as member:
+                # The local header of the member, before its data is ready.
+                yield from sink.drain()
+                for chunk in chunks:
+                    member.write(chunk.encode() if isinstance(chunk, str)
+                                 else chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+
+    yield from sink.drain()
+
+
+def export_response(chunks, filename: str,
+                    export_format: str) -> StreamingHttpResponse:
+    """Attachment streaming the chunks."""
+
+    response = StreamingHttpResponse(
+        chunks,
+        content_type=CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Proxies would otherwise hold the export back until it is complete.
+    response['X-Accel-Buffering'] = 'no'
+
+    return response
@@ -0,0 +1,90 @@
+"""
+Django command to write a streamed export to a file.
+"""
+
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from account.exports import export_personal_data
+from client.exports import export_subscribers
+from core.exports import STREAMS
+from writer.exports import export_articles
+
+
+class Command(BaseCommand):
+    """Django command to export articles, subscribers or personal data"""
+
+    help = ('Stream an export to a file (stdout by default): the articles '
+            'of a writer, all subscribers, or the personal data archive of '
+            'a user.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'export',
+            choices=('articles', 'subscribers', 'personal-data'),
+            help='What to export.'
+        )
+        parser.add_argument(
+            '--email',
+            help='Writer of the articles, or user of the personal data.'
+        )
+        parser.add_argument(
+            '--format',
+            choices=tuple(STREAMS),
+            default='csv',
+            help='Format of articles and subscribers; personal data is a '
+                 'ZIP archive.'
+        )
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='File written, - for stdout.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        export = options['export']
+
+        if export == 'subscribers':
+            chunks = export_subscribers(export_format=options['format'])
+        else:
+            if not options['email']:
+                raise CommandError(f'--email is required to export {export}.')
+            try:
+                user = get_user_model().objects.get(email=options['email'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'No user {options["email"]}.')
+
+            if export == 'articles':
+                chunks = export_articles(user, options['format'])
+            else:
+                chunks = export_personal_data(user)
+
+        if options['output'] == '-':
+            self.write(chunks, sys.stdout.buffer)
+        else:
+            with open(options['output'], 'wb') as output:
+                self.write(chunks, output)
+
+    def write(self, chunks, output):
+        size = 0
+        first_bytes_after = None
+        start = time.monotonic()
+
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            output.write(chunk)
+            size += len(chunk)
+            if first_bytes_after is None:
+                first_bytes_after = time.monotonic() - start
+
+        output.flush()
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported {size} bytes in {time.monotonic() - start:.1f}s '
+            f'(first bytes after {first_bytes_after or 0:.3f}s).'
+        ))
@@ -0,0 +1,152 @@
+"""
+Keyset (cursor) pagination for list views.
+
+Instead of OFFSET, a page starts right after the last row of the previous
+page: WHERE (date_posted, id) < (cursor) ORDER BY date_posted DESC, id DESC
+LIMIT n. Every page costs the same index range scan, however deep it is.
+
+The row comparison is spelled out as `date_posted <= v AND (date_posted < v
+OR (date_posted = v AND id < pk))`; the redundant first term is what lets
+PostgreSQL start the index scan at the cursor instead of filtering rows
+from the top of the index.
+"""
+
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+
+class KeysetPage:
+    """Rows of a page with opaque cursors of its neighbours."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+
+def encode_cursor(value, pk, backwards=False) -> str:
+    data = {'v': value.isoformat(), 'id': pk}
+    if backwards:
+        data['b'] = 1
+
+    raw = json.dumps(data, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Return (value, pk, backwards); raise ValueError for a bad cursor."""
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        value = parse_datetime(data['v'])
+        pk = int(data['id'])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError(f'Invalid cursor: {cursor}')
+
+    if value is None:
+        raise ValueError(f'Invalid cursor: {cursor}')
+
+    return value, pk, bool(data.get('b'))
+
+
+def paginate_keyset(queryset, cursor: str | None, page_size: int,
+                    field: str = 'date_posted') -> KeysetPage:
+    """Return the page of `queryset`, newest first, that `cursor` points to.
+
+    A forward cursor points to the last row of the previous page, a
+    backward cursor to the first row of the next page.
+    """
+
+    if cursor:
+        value, pk, backwards = decode_cursor(cursor)
+    else:
+        value = pk = None
+        backwards = False
+
+    if backwards:
+        # Rows right above the cursor, nearest first, then flipped back.
+        rows = list(queryset.filter(
+            Q(**{f'{field}__gte': value}),
+            Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk})
+        ).order_by(field, 'pk')[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_previous, has_next = has_more, True
+    else:
+        if cursor:
+            queryset = queryset.filter(
+                Q(**{f'{field}__lte': value}),
+                Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk})
+            )
+        rows = list(queryset.order_by(f'-{field}', '-pk')[:page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = bool(cursor)
+
+    if not rows:
+        return KeysetPage(rows)
+
+    first, last = rows[0], rows[-1]
+
+    return KeysetPage(
+        rows,
+        next_cursor=(encode_cursor(getattr(last, field), last.pk)
+                     if has_next else None),
+        previous_cursor=(encode_cursor(getattr(first, field), first.pk,
+                                       backwards=True)
+                         if has_previous else None)
+    )
+
+
+class KeysetPaginationMixin:
+    """Paginate a ListView by (`keyset_field`, id), newest first.
+
+    The page is selected by the `cursor` GET parameter. The template gets
+    `page` (a KeysetPage) and renders core/includes/pagination.html.
+    """
+
+    keyset_field = 'date_posted'
+    page_size = None
+    cursor_param = 'cursor'
+
+    def get_page_size(self) -> int:
+        return self.page_size or settings.ARTICLES_PAGE_SIZE
+
+    def get_context_data(self, **kwargs):
+        queryset = kwargs.pop('object_list', self.object_list)
+        page = None
+
+        if queryset is not None:
+            try:
+                page = paginate_keyset(
+                    queryset,
+                    self.request.GET.get(self.cursor_param),
+                    self.get_page_size(),
+                    self.keyset_field
+                )
+            except ValueError:
+                raise Http404('Invalid page.')
+
+            queryset = page.object_list
+
+        context = super().get_context_data(object_list=queryset, **kwargs)
+        context['page'] = page
+        context['is_paginated'] = bool(
+            page and (page.has_next or page.has_previous)
+        )
+        return context
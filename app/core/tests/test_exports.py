@@ -0,0 +1,175 @@
+"""
+Tests for streamed exports.
+Command: pytest core/tests/test_exports.py --cov=core --cov-report term-missing:skip-covered
+"""
+
+import csv
+import io
+import json
+import time
+import zipfile
+
+import pytest
+
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.exports import BUFFER_SIZE, csv_stream, ndjson_stream, zip_stream
+from writer.exports import article_rows, export_articles
+
+pytestmark = pytest.mark.django_db
+
+
+def test_csv_header_sent_before_query(user_writer, article):
+    """Test the first chunk of an export is sent without waiting for
+    rows."""
+
+    article(user_writer)
+    chunks = export_articles(user_writer)
+
+    with CaptureQueriesContext(connection) as queries:
+        header = next(chunks)
+
+    assert header.startswith('id,title,slug,')
+    assert len(queries) == 0
+
+    rows = list(csv.reader(io.StringIO(header + ''.join(chunks))))
+    assert rows[1][1] == 'Sample Title of Sample Article'
+
+
+def test_rows_fetched_in_keyset_chunks(user_writer, article):
+    """Test rows are read by primary key, one short query per chunk,
+    without a server-side cursor."""
+
+    pks = [article(user_writer, slug=f'article-{i}').pk for i in range(5)]
+
+    with patch('core.exports.CHUNK_SIZE', 2), \
+            CaptureQueriesContext(connection) as queries:
+        rows = list(article_rows(user_writer))
+
+    assert [row[0] for row in rows] == pks
+    assert len(queries) == 3
+    assert all('LIMIT 2' in q['sql'] for q in queries)
+    assert not any('DECLARE' in q['sql'] for q in queries)
+    assert f'"id" > {pks[3]}' in queries[2]['sql']
+
+
+@pytest.mark.parametrize('stream,rows_before_first_bytes', [
+    (lambda rows: csv_stream(('id', 'text'), rows), 0),
+    (lambda rows: ndjson_stream(('id', 'text'), rows), 1),
+    (lambda rows: zip_stream([('rows.csv',
+                               csv_stream(('id', 'text'), rows))]), 0),
+])
+def test_first_bytes_sent_before_slow_rows(stream, rows_before_first_bytes):
+    """Test each format sends its first bytes while later rows are still
+    coming, at most one row late."""
+
+    latency = 0.05
+    fetched = []
+
+    def slow_rows():
+        for i in range(6):
+            time.sleep(latency)
+            fetched.append(i)
+            yield i, 'x' * 10
+
+    start = time.monotonic()
+    chunks = stream(slow_rows())
+    first = next(chunks)
+    first_bytes_after = time.monotonic() - start
+    fetched_before_first_bytes = len(fetched)
+    rest = list(chunks)
+
+    assert first and rest
+    assert fetched_before_first_bytes == rows_before_first_bytes
+    assert first_bytes_after < (rows_before_first_bytes + 1) * latency
+    assert time.monotonic() - start >= 6 * latency
+
+
+def test_streams_are_buffered():
+    """Test rows are sent in chunks of about BUFFER_SIZE characters."""
+
+    rows = ((i, 'x' * 100) for i in range(2000))
+    chunks = list(csv_stream(('id', 'text'), rows))
+
+    assert 2 < len(chunks) < 2000
+    assert all(len(chunk) < BUFFER_SIZE + 200 for chunk in chunks)
+
+
+def test_csv_formulas_neutralised():
+    """Test text cells a spreadsheet would evaluate are quoted, numbers and
+    other text left alone."""
+
+    rows = [(1, '=HYPERLINK("http://evil.example")', '+1', '-2', '@SUM(A1)',
+             -3, 'a=b')]
+    chunks = ''.join(csv_stream(('id', 'a', 'b', 'c', 'd', 'e', 'f'), rows))
+
+    assert list(csv.reader(io.StringIO(chunks)))[1] == [
+        '1', '\'=HYPERLINK("http://evil.example")', "'+1", "'-2",
+        "'@SUM(A1)", '-3', 'a=b'
+    ]
+
+
+def test_ndjson_stream():
+    """Test every row is a JSON object on its own line."""
+
+    lines = ''.join(ndjson_stream(('id', 'name'), [(1, 'a'), (2, 'b')]))
+
+    assert [json.loads(line) for line in lines.splitlines()] == [
+        {'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}
+    ]
+
+
+def test_zip_stream():
+    """Test members streamed in chunks make a valid archive."""
+
+    data = b''.join(zip_stream([
+        ('a.txt', ['first ', b'member']),
+        ('folder/b.csv', (f'{i}\n' for i in range(10000))),
+    ]))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert archive.read('a.txt') == b'first member'
+        assert archive.read('folder/b.csv').decode().splitlines()[-1] == '9999'
+
+
+def test_export_data_command(tmp_path, sample_user, user_writer, article,
+                             subscription, standard, capsys):
+    """Test the command writes each export to a file."""
+
+    article(user_writer, title='Exported')
+    subscription(user=sample_user, plan=standard)
+
+    call_command('export_data', 'articles', email=user_writer.email,
+                 format='ndjson', output=tmp_path / 'articles.ndjson')
+    call_command('export_data', 'subscribers', output=tmp_path / 'subs.csv')
+    call_command('export_data', 'personal-data', email=sample_user.email,
+                 output=tmp_path / 'data.zip')
+
+    assert json.loads(
+        (tmp_path / 'articles.ndjson').read_text()
+    )['title'] == 'Exported'
+    subscribers = list(csv.DictReader(
+        (tmp_path / 'subs.csv').read_text().splitlines()
+    ))
+    assert [(s['email'], s['plan'], s['status']) for s in subscribers] == [
+        (sample_user.email, 'standard', 'active')
+    ]
+    with zipfile.ZipFile(tmp_path / 'data.zip') as archive:
+        assert archive.namelist() == ['profile.json', 'subscription.json']
+    assert 'first bytes after' in capsys.readouterr().err
+
+
+def test_export_data_command_requires_user():
+    """Test exports of a user fail without an existing user."""
+
+    with pytest.raises(CommandError):
+        call_command('export_data', 'articles')
+    with pytest.raises(CommandError):
+        call_command('export_data', 'personal-data',
+                     email='nobody@example.com')
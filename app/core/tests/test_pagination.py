@@ -0,0 +1,86 @@
+"""
+Tests for keyset pagination.
+Command: pytest core/tests
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.pagination import decode_cursor, encode_cursor, paginate_keyset
+from writer.models import Article
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def articles(user_writer, article):
+    """Create 7 articles, two of them posted at the same time."""
+
+    created = [article(user_writer, title=f'Article {i}') for i in range(7)]
+    now = timezone.now()
+    for i, a in enumerate(created):
+        a.date_posted = now - timedelta(minutes=i // 2 * 2 + (i > 1))
+        Article.objects.filter(pk=a.pk).update(date_posted=a.date_posted)
+
+    return sorted(created, key=lambda a: (a.date_posted, a.pk), reverse=True)
+
+
+def test_cursor_round_trip():
+    """Test cursor is opaque and decoded back to its position."""
+
+    # A fixed time: the encoding of some times contains '42'.
+    posted = datetime(2025, 3, 9, 16, 10, tzinfo=dt_timezone.utc)
+    cursor = encode_cursor(posted, 42, backwards=True)
+
+    assert '42' not in cursor
+    assert decode_cursor(cursor) == (posted, 42, True)
+
+
+@pytest.mark.parametrize('cursor', ['garbage', 'eyJ2IjoxfQ', ''])
+def test_invalid_cursor(cursor):
+    """Test malformed cursors are rejected."""
+
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_paginate_forward_and_back(articles):
+    """Test walking pages forward and back returns every article once."""
+
+    queryset = Article.objects.all()
+
+    first = paginate_keyset(queryset, None, 3)
+    second = paginate_keyset(queryset, first.next_cursor, 3)
+    third = paginate_keyset(queryset, second.next_cursor, 3)
+
+    assert first.object_list == articles[:3]
+    assert second.object_list == articles[3:6]
+    assert third.object_list == articles[6:]
+    assert not first.has_previous and first.has_next
+    assert second.has_previous and second.has_next
+    assert third.has_previous and not third.has_next
+
+    back = paginate_keyset(queryset, third.previous_cursor, 3)
+    back_to_first = paginate_keyset(queryset, back.previous_cursor, 3)
+
+    assert back.object_list == articles[3:6]
+    assert back_to_first.object_list == articles[:3]
+    assert not back_to_first.has_previous
+
+
+def test_paginate_without_offset(articles):
+    """Test deep pages are selected by the cursor, not by OFFSET."""
+
+    page = paginate_keyset(Article.objects.all(), None, 3)
+
+    with CaptureQueriesContext(connection) as queries:
+        paginate_keyset(Article.objects.all(), page.next_cursor, 3)
+
+    assert len(queries) == 1
+    assert 'OFFSET' not in queries[0]['sql']
+    assert 'LIMIT 4' in queries[0]['sql']
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'crispy_forms',
     'crispy_bootstrap5',
@@ -69,6 +70,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'client.entitlements.EntitlementMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,6 +88,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'client.entitlements.entitlement',
             ],
         },
     },
@@ -108,6 +111,79 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Point CACHE_BACKEND/CACHE_LOCATION at a shared cache (e.g. Redis) to share
+# cached data, such as the PayPal access token, between worker processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': (os.environ.get('CACHE_BACKEND') or
+                    'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION') or '',
+    }
+}
+
+# Articles per page of keyset-paginated lists, see core.pagination
+ARTICLES_PAGE_SIZE = int(os.environ.get('ARTICLES_PAGE_SIZE') or 20)
+
+# Seconds rendered browse pages of a tier are cached; article changes drop
+# them earlier, see client.listing_cache
+LISTING_CACHE_TTL = 60 * 10
+
+# Seconds a rendered article body is cached; keys include the modification
+# time of the article, see client/article_detail.html
+ARTICLE_BODY_CACHE_TTL = 60 * 60 * 24
+
+# Article views are buffered per process and saved in batches, every
+# VIEW_BUFFER_FLUSH_INTERVAL seconds or once VIEW_BUFFER_FLUSH_SIZE are
+# buffered; past VIEW_BUFFER_MAX_SIZE new views are dropped, see
+# writer.view_counts
+VIEW_BUFFER_FLUSH_INTERVAL = float(
+    os.environ.get('VIEW_BUFFER_FLUSH_INTERVAL') or 5
+)
+VIEW_BUFFER_FLUSH_SIZE = 1000
+VIEW_BUFFER_MAX_SIZE = 100_000
+
+# Trending articles: views lose half their weight every TRENDING_HALF_LIFE
+# seconds; each process merges its counts every TRENDING_MERGE_INTERVAL
+# seconds and the top TRENDING_SIZE articles of each tier are listed, see
+# client.trending
+TRENDING_HALF_LIFE = 60 * 60 * 6
+TRENDING_MERGE_INTERVAL = float(
+    os.environ.get('TRENDING_MERGE_INTERVAL') or 30
+)
+TRENDING_SIZE = 10
+
+# Nearest articles kept per article by the build_related_articles command,
+# and how many of those the tier covers are shown, see writer.related
+RELATED_ARTICLES_STORED = 20
+RELATED_ARTICLES_SHOWN = 5
+
+# Share of MinHash positions two articles must agree on to be flagged as
+# copies, see writer.duplicates
+DUPLICATE_SIMILARITY = 0.8
+
+# Benchmark commands (bench_billing, bench_autocomplete) create and delete
+# data; they refuse to run unless the database is marked as a bench one
+BENCHMARK_DATABASE = bool(int(os.environ.get('BENCHMARK_DATABASE') or 0))
+
+# Keep the user's subscription and tier in the session between requests,
+# see client.entitlements
+ENTITLEMENT_SESSION_CACHE = bool(
+    int(os.environ.get('ENTITLEMENT_SESSION_CACHE') or 0)
+)
+
+# Title suggestions of the search box, see client.autocomplete
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MIN_LENGTH = 3
+AUTOCOMPLETE_CACHE_TTL = 30
+
+# Seconds between checks whether another process changed subscription plans,
+# see client.catalog.PlanCatalog
+PLAN_CATALOG_CHECK_INTERVAL = 5
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -170,3 +246,80 @@ EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
 
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+# PayPal Configuration
+
+# Point at a local stand-in (`manage.py fake_paypal`) for load tests
+PAYPAL_BASE_URL = (os.environ.get('PAYPAL_BASE_URL') or
+                   'https://api-m.sandbox.paypal.com')
+
+# Seconds before expiry at which a cached access token is refreshed
+PAYPAL_TOKEN_REFRESH_MARGIN = int(
+    os.environ.get('PAYPAL_TOKEN_REFRESH_MARGIN') or 300
+)
+
+# Size of the keep-alive connection pool to PayPal (per worker process)
+PAYPAL_POOL_SIZE = int(os.environ.get('PAYPAL_POOL_SIZE') or 10)
+
+# (connect, read) timeouts in seconds, per PayPal endpoint
+PAYPAL_TIMEOUTS = {
+    'default': (3.05, 10),
+    'oauth2_token': (3.05, 5),
+    'subscription_detail': (3.05, 5),
+}
+
+# Seconds subscription details (and 404s for unknown subscriptions) are
+# cached, see client.detail_cache.SubscriptionDetailCache
+PAYPAL_SUBSCRIPTION_CACHE_TTL = 60
+PAYPAL_SUBSCRIPTION_NOT_FOUND_TTL = 30
+
+# Retries of connection errors, 429 and 5xx responses
+PAYPAL_MAX_RETRIES = int(os.environ.get('PAYPAL_MAX_RETRIES') or 2)
+
+# ID of the webhook registered on PayPal; when set, subscription changes are
+# taken from webhook events instead of polling PayPal
+PAYPAL_WEBHOOK_ID = os.environ.get('PAYPAL_WEBHOOK_ID')
+
+# Seconds PayPal webhook signing certificates are kept in the cache
+PAYPAL_CERT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Webhook events applied per transaction
+PAYPAL_WEBHOOK_BATCH_SIZE = 100
+
+# Outbox of PayPal operations run by the `paypal_worker` command
+PAYPAL_WORKER_THREADS = int(os.environ.get('PAYPAL_WORKER_THREADS') or 4)
+PAYPAL_OUTBOX_MAX_ATTEMPTS = 8
+PAYPAL_OUTBOX_BACKOFF = 30  # seconds, doubled after every failed attempt
+PAYPAL_OUTBOX_MAX_BACKOFF = 60 * 60
+PAYPAL_OUTBOX_LEASE = 5 * 60  # seconds a claimed operation stays locked
+
+# Circuit breaker and bulkheads around PayPal calls, see
+# client.circuit_breaker.CircuitBreaker. The circuit and max_concurrent are
+# per worker process; max_concurrent_total caps the calls of all processes
+# sharing the database (0: no shared cap).
+PAYPAL_CIRCUIT_BREAKER = {
+    'failure_rate': 0.5,
+    'slow_call_rate': 0.5,
+    'slow_call_duration': 5.0,  # seconds
+    'window': 60,  # seconds
+    'min_calls': 10,
+    'open_seconds': 30,
+    'half_open_probes': 2,
+    'max_concurrent': int(os.environ.get('PAYPAL_MAX_CONCURRENT_CALLS') or 4),
+    'max_concurrent_total': int(
+        os.environ.get('PAYPAL_MAX_CONCURRENT_CALLS_TOTAL') or 16
+    ),
+    'bulkhead_timeout': 0.5,  # seconds
+}
+
+# Days subscribers have to approve a plan change of the
+# `migrate_plan_subscribers` command on PayPal, see client.plan_migration
+PLAN_MIGRATION_APPROVAL_DAYS = int(
+    os.environ.get('PLAN_MIGRATION_APPROVAL_DAYS') or 30
+)
+
+# Bulk reconciliation of subscriptions (`reconcile_subscriptions` command)
+PAYPAL_RECONCILE_CHUNK_SIZE = 500
+PAYPAL_RECONCILE_RATE = float(
+    os.environ.get('PAYPAL_RECONCILE_RATE') or 10  # PayPal calls per second
+)
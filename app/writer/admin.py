@@ -1,9 +1,23 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
 from writer.models import Article
 
 @admin.register(Article)
 class ModelNameAdmin(admin.ModelAdmin):
-    list_display = ('title', 'author', 'date_posted', 'last_modified', 'is_premium')
+    list_display = ('title', 'author', 'date_posted', 'last_modified',
+                    'required_tier', 'duplicate_of', 'duplicate_similarity')
+    list_filter = (('duplicate_of', admin.EmptyFieldListFilter),)
     prepopulated_fields = {'slug': ('title',)}
-    list_editable = ('is_premium',)
+    list_editable = ('required_tier',)
+    readonly_fields = ('duplicate_of', 'duplicate_similarity')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+
+        if obj.duplicate_of is not None:
+            self.message_user(
+                request,
+                f'"{obj.title}" is {obj.duplicate_similarity:.0%} alike '
+                f'"{obj.duplicate_of.title}".',
+                messages.WARNING
+            )
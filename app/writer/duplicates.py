@@ -0,0 +1,202 @@
+"""
+Near-duplicate articles.
+
+Saving an article signs its title and content with a MinHash of
+NUM_PERMUTATIONS word-shingle hashes. The signature is split into BANDS
+bands whose hashes are stored as LSH buckets (ArticleSignatureBucket):
+articles sharing any bucket are candidates, found with one indexed lookup
+instead of a comparison with every article. A candidate whose signature
+agrees on at least DUPLICATE_SIMILARITY of the positions (an estimate of
+the Jaccard similarity of the shingles) is flagged as `duplicate_of`.
+Only earlier articles (by primary key) are candidates: a copy points to
+the original, never the other way round.
+
+With 16 bands of 4 rows, articles 80% alike are candidates with
+probability 0.9998, articles 30% alike with 0.12.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+
+from writer.models import Article, ArticleSignatureBucket
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+
+# Candidates compared per article, those sharing the most buckets first,
+# bounding the work on very common text.
+MAX_CANDIDATES = 100
+
+# Hashes are (a * x + b) mod a Mersenne prime below 2^31: products fit
+# in 64 bits and signatures in integer columns.
+PRIME = (1 << 31) - 1
+_random = np.random.default_rng(20240601)
+A = _random.integers(1, PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+B = _random.integers(0, PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+
+WORD_RE = re.compile(r'\w+')
+
+
+def shingles(title: str, content: str) -> set[str]:
+    words = WORD_RE.findall(f'{title} {content}'.lower())
+    if len(words) < SHINGLE_SIZE:
+        return set(words)
+
+    return {' '.join(words[i:i + SHINGLE_SIZE])
+            for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(title: str, content: str) -> list[int] | None:
+    """MinHash signature of an article; None without any words."""
+
+    article_shingles = shingles(title, content)
+    if not article_shingles:
+        return None
+
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(),
+                        'little') % PRIME
+         for s in article_shingles),
+        dtype=np.uint64,
+        count=len(article_shingles)
+    )
+    permuted = (np.outer(A, hashes) + B[:, None]) % PRIME
+
+    return permuted.min(axis=1).astype(np.int64).tolist()
+
+
+def band_buckets(signature: list[int]) -> list[int]:
+    """LSH bucket of each band of the signature."""
+
+    rows = np.asarray(signature, dtype=np.int64).reshape(BANDS, ROWS)
+
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + rows[band].tobytes(),
+                            digest_size=8).digest(),
+            'little',
+            signed=True
+        )
+        for band in range(BANDS)
+    ]
+
+
+def similarity(signature: list[int], other: list[int]) -> float:
+    """Estimated Jaccard similarity of two signed articles."""
+
+    return float(np.mean(np.asarray(signature) == np.asarray(other)))
+
+
+def find_duplicate(signature: list[int] | None,
+                   before_pk=None) -> tuple[Article | None, float | None]:
+    """Return the signed article most similar to the signature, and the
+    similarity, if it is alike enough to be a copy.
+
+    With `before_pk`, only articles created before that one are candidates.
+    """
+
+    if signature is None:
+        return None, None
+
+    # Articles sharing more bands are likelier to be alike.
+    shared = ArticleSignatureBucket.objects.filter(
+        bucket__in=band_buckets(signature)
+    )
+    if before_pk is not None:
+        shared = shared.filter(article_id__lt=before_pk)
+    candidates = Article.objects.filter(
+        pk__in=shared.values('article_id').annotate(
+            shared_buckets=Count('pk')
+        ).order_by(
+            '-shared_buckets', 'article_id'
+        ).values('article_id')[:MAX_CANDIDATES]
+    ).only('pk', 'title', 'slug', 'author_id', 'minhash').order_by('pk')
+
+    best, best_similarity = None, 0.0
+    for candidate in candidates:
+        if candidate.minhash is None:
+            continue
+        candidate_similarity = similarity(signature, candidate.minhash)
+        if candidate_similarity > best_similarity:
+            best, best_similarity = candidate, candidate_similarity
+
+    if best_similarity < settings.DUPLICATE_SIMILARITY:
+        return None, None
+
+    return best, best_similarity
+
+
+def replace_buckets(article_id: int, signature: list[int] | None):
+    with transaction.atomic():
+        ArticleSignatureBucket.objects.filter(article_id=article_id).delete()
+        if signature is not None:
+            ArticleSignatureBucket.objects.bulk_create([
+                ArticleSignatureBucket(article_id=article_id, bucket=bucket)
+                for bucket in set(band_buckets(signature))
+            ])
+
+
+def sign_range(first_pk: int, last_pk: int) -> int:
+    """Sign articles with pk in [first_pk, last_pk] and store their buckets.
+
+    Runs in a pool process, so the process' connection is closed when done.
+    """
+
+    try:
+        articles = list(Article.objects.filter(
+            pk__gte=first_pk,
+            pk__lte=last_pk
+        ).only('pk', 'title', 'content'))
+
+        for article in articles:
+            article.minhash = minhash(article.title, article.content)
+
+        with transaction.atomic():
+            Article.objects.bulk_update(articles, ['minhash'])
+            ArticleSignatureBucket.objects.filter(
+                article_id__in=[a.pk for a in articles]
+            ).delete()
+            ArticleSignatureBucket.objects.bulk_create([
+                ArticleSignatureBucket(article_id=article.pk, bucket=bucket)
+                for article in articles if article.minhash is not None
+                for bucket in set(band_buckets(article.minhash))
+            ])
+
+        return len(articles)
+    finally:
+        connection.close()
+
+
+def flag_range(first_pk: int, last_pk: int) -> int:
+    """Flag duplicates among signed articles with pk in [first_pk, last_pk],
+    against the signed articles before them; return the number flagged.
+
+    Runs in a pool process, so the process' connection is closed when done.
+    """
+
+    try:
+        articles = list(Article.objects.filter(
+            pk__gte=first_pk,
+            pk__lte=last_pk
+        ).only('pk', 'minhash'))
+
+        for article in articles:
+            article.duplicate_of, article.duplicate_similarity = (
+                find_duplicate(article.minhash, before_pk=article.pk)
+            )
+
+        Article.objects.bulk_update(
+            articles, ['duplicate_of', 'duplicate_similarity']
+        )
+
+        return sum(article.duplicate_of is not None for article in articles)
+    finally:
+        connection.close()
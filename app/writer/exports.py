@@ -0,0 +1,26 @@
+"""
+Export of the articles of a writer, as listed on My Articles, with their
+content and view counts. See core.exports.
+"""
+
+from core.exports import STREAMS, keyset_rows
+from writer.models import Article
+from writer.view_counts import with_view_counts
+
+ARTICLE_COLUMNS = ('id', 'title', 'slug', 'required_tier', 'date_posted',
+                   'last_modified', 'word_count', 'reading_time', 'views',
+                   'content')
+
+
+def article_rows(author):
+    """Rows of the articles of the author, fetched lazily."""
+
+    return keyset_rows(with_view_counts(
+        Article.objects.filter(author=author)
+    ).values_list(*ARTICLE_COLUMNS))
+
+
+def export_articles(author, export_format: str = 'csv'):
+    """Chunks of the export of the articles of the author."""
+
+    return STREAMS[export_format](ARTICLE_COLUMNS, article_rows(author))
@@ -1,9 +1,33 @@
 from django import forms
 
-from writer.models import Article
+from client.catalog import plan_catalog
+from writer.models import Article, BASIC_TIER, PREMIUM_TIER
+
+
+def tier_choices() -> list[tuple[int, str]]:
+    """Tiers of the subscription plans, named after their plans."""
+
+    names = {}
+    for plan in plan_catalog.all():
+        names.setdefault(plan.tier, []).append(plan.name.title())
+
+    if not names:
+        return [(BASIC_TIER, 'Basic'), (PREMIUM_TIER, 'Premium')]
+
+    return [(tier, ' / '.join(names[tier])) for tier in sorted(names)]
 
 
 class ArticleForm(forms.ModelForm):
     class Meta:
         model = Article
-        fields = ['title', 'slug', 'content', 'is_premium']
+        fields = ['title', 'slug', 'content', 'required_tier']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['required_tier'] = forms.TypedChoiceField(
+            choices=tier_choices(),
+            coerce=int,
+            required=False,
+            empty_value=BASIC_TIER,
+            label='Lowest plan that may read it'
+        )
@@ -0,0 +1,65 @@
+"""
+Django command to compute related articles.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from writer.related import (BLOCK_SIZE, MAX_DF, MIN_DF, build_related,
+                            update_related)
+
+
+class Command(BaseCommand):
+    """Django command to compute related articles by TF-IDF similarity"""
+
+    help = ('Fit TF-IDF vectors on all articles and store the nearest '
+            'articles of each; with --incremental, score only articles '
+            'created or edited since the last run against the stored '
+            'vocabulary.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Score modified articles against the last full build.'
+        )
+        parser.add_argument(
+            '--block-size',
+            type=int,
+            default=BLOCK_SIZE,
+            help='Articles whose similarities are computed at once.'
+        )
+        parser.add_argument(
+            '--min-df',
+            type=int,
+            default=MIN_DF,
+            help='Least number of articles a term must appear in.'
+        )
+        parser.add_argument(
+            '--max-df',
+            type=float,
+            default=MAX_DF,
+            help='Largest share of articles a term may appear in.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        start = time.monotonic()
+
+        if options['incremental']:
+            scored = update_related(block_size=options['block_size'])
+            if scored is None:
+                raise CommandError('No full build to score against yet, run '
+                                   'the command without --incremental.')
+            message = f'Scored {scored} modified articles'
+        else:
+            built = build_related(min_df=options['min_df'],
+                                  max_df=options['max_df'],
+                                  block_size=options['block_size'])
+            message = f'Built related articles of {built} articles'
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{message} in {time.monotonic() - start:.1f} s.'
+        ))
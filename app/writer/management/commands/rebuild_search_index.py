@@ -0,0 +1,24 @@
+"""
+Django command to rebuild the title words of the article search.
+"""
+
+from django.core.management.base import BaseCommand
+
+from writer.search import rebuild_title_words
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the title words suggested by autocompletion"""
+
+    help = ('Rebuild the title words suggested by autocompletion from the '
+            'current titles. Search vectors are generated by the database '
+            'and need no rebuild.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        words = rebuild_title_words()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {words} title words.'
+        ))
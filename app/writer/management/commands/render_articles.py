@@ -0,0 +1,98 @@
+"""
+Django command to render the content of articles to HTML.
+"""
+
+import multiprocessing
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from itertools import repeat
+
+from django.db import connections
+from django.db.models import Max, Min
+
+from django.core.management.base import BaseCommand
+
+from writer.models import Article
+from writer.rendering import RENDERER_VERSION, render_range
+
+
+class Command(BaseCommand):
+    """Django command to re-render stored HTML of articles"""
+
+    help = ('Render the content of articles rendered by an older renderer '
+            'version (or never), in pk ranges rendered by parallel '
+            'processes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count(),
+            help='Number of ranges rendered concurrently.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Articles rendered by one transaction.'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-render articles of the current renderer version too.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        queryset = Article.objects.all()
+        if not options['all']:
+            queryset = queryset.exclude(
+                content_renderer_version=RENDERER_VERSION
+            )
+
+        bounds = queryset.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            self.stdout.write('No articles to render.')
+            return
+
+        chunk_size = options['chunk_size']
+        ranges = [
+            (first, min(first + chunk_size - 1, bounds['last']))
+            for first in range(bounds['first'], bounds['last'] + 1, chunk_size)
+        ]
+
+        done = 0
+        start = time.monotonic()
+
+        # Rendering is CPU-bound, so ranges are rendered by processes. Forked
+        # ones would share the connections of this one: they are closed
+        # first, each process opens its own.
+        connections.close_all()
+
+        with ProcessPoolExecutor(
+            max_workers=options['processes'],
+            mp_context=multiprocessing.get_context('fork')
+        ) as executor:
+            for i, rendered in enumerate(
+                    executor.map(render_range, *zip(*ranges),
+                                 repeat(options['all'])), 1
+            ):
+                done += rendered
+                elapsed = time.monotonic() - start
+                rate = i / elapsed if elapsed else 0
+                eta = (timedelta(seconds=round((len(ranges) - i) / rate))
+                       if rate else '?')
+
+                self.stdout.write(
+                    f'{i}/{len(ranges)} ranges, {done} articles '
+                    f'({rate:.1f} ranges/s, ETA {eta})'
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {done} articles with renderer version '
+            f'{RENDERER_VERSION}.'
+        ))
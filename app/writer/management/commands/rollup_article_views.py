@@ -0,0 +1,57 @@
+"""
+Django command to fold raw article views into hourly and daily counts.
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from django.core.management.base import BaseCommand
+
+from writer.models import ArticleHourlyViews, ArticleView
+from writer.view_counts import rollup_views
+
+
+class Command(BaseCommand):
+    """Django command to roll up article views"""
+
+    help = ('Move raw article views into per-article hourly and daily '
+            'counts, one batch per statement, and prune old hourly counts.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10_000,
+            help='Raw views moved by one statement.'
+        )
+        parser.add_argument(
+            '--keep-hourly-days',
+            type=int,
+            default=30,
+            help='Days hourly counts are kept; daily counts are kept for good.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        # Rolled up views are deleted, so every run starts over from the
+        # lowest id and also picks up views committed after a later one.
+        after_id = 0
+        batches = 0
+
+        while ids := list(ArticleView.objects.filter(
+            id__gt=after_id
+        ).order_by('id').values_list('id', flat=True)[:options['batch_size']]):
+            rollup_views(after_id, ids[-1])
+            after_id = ids[-1]
+            batches += 1
+
+        pruned, _ = ArticleHourlyViews.objects.filter(
+            hour__lt=timezone.now() - timedelta(days=options['keep_hourly_days'])
+        ).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled up {batches} batches of views, pruned {pruned} hourly '
+            f'counts.'
+        ))
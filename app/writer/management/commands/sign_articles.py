@@ -0,0 +1,93 @@
+"""
+Django command to sign articles for near-duplicate detection.
+"""
+
+import multiprocessing
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.db import connections
+from django.db.models import Max, Min
+
+from django.core.management.base import BaseCommand
+
+from writer.duplicates import flag_range, sign_range
+from writer.models import Article
+
+
+class Command(BaseCommand):
+    """Django command to compute MinHash signatures of all articles"""
+
+    help = ('Compute the MinHash signature and LSH buckets of every article, '
+            'then flag near-duplicates, in pk ranges processed by parallel '
+            'processes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count(),
+            help='Number of ranges processed concurrently.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Articles processed by one transaction.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        bounds = Article.objects.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            self.stdout.write('No articles to sign.')
+            return
+
+        chunk_size = options['chunk_size']
+        ranges = [
+            (first, min(first + chunk_size - 1, bounds['last']))
+            for first in range(bounds['first'], bounds['last'] + 1, chunk_size)
+        ]
+
+        # Duplicates are looked up once every article has its buckets.
+        signed = self.run('Signing', sign_range, ranges,
+                          options['processes'])
+        flagged = self.run('Flagging', flag_range, ranges,
+                           options['processes'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Signed {signed} articles, flagged {flagged} duplicates.'
+        ))
+
+    def run(self, phase, func, ranges, processes) -> int:
+        done = 0
+        start = time.monotonic()
+
+        # Hashing is CPU-bound, so ranges are processed by processes.
+        # Forked ones would share the connections of this one: they are
+        # closed first, each process opens its own.
+        connections.close_all()
+
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('fork')
+        ) as executor:
+            for i, count in enumerate(
+                    executor.map(func, *zip(*ranges)), 1
+            ):
+                done += count
+                elapsed = time.monotonic() - start
+                rate = i / elapsed if elapsed else 0
+                eta = (timedelta(seconds=round((len(ranges) - i) / rate))
+                       if rate else '?')
+
+                self.stdout.write(
+                    f'{phase}: {i}/{len(ranges)} ranges, {done} articles '
+                    f'({rate:.1f} ranges/s, ETA {eta})'
+                )
+
+        return done
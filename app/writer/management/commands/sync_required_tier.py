@@ -0,0 +1,59 @@
+"""
+Django command to carry premium flags over to required tiers again.
+"""
+
+from django.db.models import Q
+
+from django.core.management.base import BaseCommand
+
+from client.listing_cache import listing_cache
+from client.tiers import plan_tiers
+from writer.models import BASIC_TIER, PREMIUM_TIER, Article
+
+
+class Command(BaseCommand):
+    """Django command to sync required tiers with premium flags"""
+
+    help = ('Set the required tier of articles whose premium flag was '
+            'changed by instances of the previous release during the '
+            'deploy; run once all instances are on this release.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Articles updated by one statement.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+
+        # The previous release only writes is_premium, this one mirrors
+        # required_tier into it on every save: where they disagree, the
+        # flag was set (or cleared) by the previous release.
+        queryset = Article.objects.filter(
+            Q(is_premium=True, required_tier__lte=BASIC_TIER) |
+            Q(is_premium=False, required_tier__gt=BASIC_TIER)
+        ).order_by('pk')
+        after_pk = 0
+        synced = 0
+
+        # One batch per statement, as in 0008_backfill_article_required_tier.
+        while batch := list(queryset.filter(
+            pk__gt=after_pk
+        ).values_list('pk', flat=True)[:options['batch_size']]):
+            for is_premium, tier in ((True, PREMIUM_TIER),
+                                     (False, BASIC_TIER)):
+                synced += queryset.filter(
+                    pk__in=batch,
+                    is_premium=is_premium
+                ).update(required_tier=tier)
+            after_pk = batch[-1]
+
+        if synced:
+            listing_cache.invalidate(*plan_tiers())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Synced the required tier of {synced} articles.'
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:07
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; it builds
+    # the indexes without blocking writes to the article table.
+    atomic = False
+
+    dependencies = [
+        ('writer', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='article',
+            index=models.Index(fields=['-date_posted', '-id'], name='article_date_posted_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='article',
+            index=models.Index(condition=models.Q(('is_premium', False)), fields=['-date_posted', '-id'], name='article_free_date_posted_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='article',
+            index=models.Index(fields=['author', '-date_posted', '-id'], name='article_author_date_posted_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+import math
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+# Frozen copy of Article.update_text_stats at the time of this migration.
+EXCERPT_LENGTH = 150
+WORDS_PER_MINUTE = 200
+
+
+def backfill_text_stats(apps, schema_editor):
+    """Fill excerpt, word count and reading time of existing articles,
+    one batch per transaction so that the table is never locked as a whole."""
+
+    Article = apps.get_model('writer', 'Article')
+    queryset = Article.objects.order_by('pk').only('pk', 'content')
+    after_pk = 0
+
+    while batch := list(queryset.filter(pk__gt=after_pk)[:BATCH_SIZE]):
+        for article in batch:
+            article.excerpt = article.content[:EXCERPT_LENGTH]
+            article.word_count = len(article.content.split())
+            article.reading_time = math.ceil(
+                article.word_count / WORDS_PER_MINUTE
+            )
+
+        Article.objects.bulk_update(
+            batch,
+            ['excerpt', 'word_count', 'reading_time']
+        )
+        after_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('writer', '0003_article_text_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_text_stats, migrations.RunPython.noop,
+                             atomic=False),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('writer', '0006_article_title_trgm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='required_tier',
+            field=models.PositiveSmallIntegerField(db_default=1, default=1, help_text='Lowest subscription plan tier that may read the article.'),
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='is_premium',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+# Frozen tier at the time of this migration.
+PREMIUM_TIER = 2
+
+
+def backfill_required_tier(apps, schema_editor):
+    """Carry premium flags of existing articles over to required tiers,
+    one batch per transaction so that the table is never locked as a whole."""
+
+    Article = apps.get_model('writer', 'Article')
+    queryset = Article.objects.filter(is_premium=True).order_by('pk')
+    after_pk = 0
+
+    while batch := list(queryset.filter(
+        pk__gt=after_pk
+    ).values_list('pk', flat=True)[:BATCH_SIZE]):
+        Article.objects.filter(pk__in=batch).update(required_tier=PREMIUM_TIER)
+        after_pk = batch[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('writer', '0007_article_required_tier'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_required_tier, migrations.RunPython.noop,
+                             atomic=False),
+    ]
@@ -0,0 +1,19 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Builds the index without blocking writes, see 0002_article_indexes.
+    # article_free_date_posted_idx goes together with is_premium.
+    atomic = False
+
+    dependencies = [
+        ('writer', '0008_backfill_article_required_tier'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='article',
+            index=models.Index(condition=models.Q(('required_tier__lte', 1)), fields=['-date_posted', '-id'], name='article_basic_date_posted_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('writer', '0009_article_basic_date_posted_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='content_renderer_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Renderer version of content_html, 0 if not rendered yet.'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('writer', '0010_article_content_html'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleView',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('viewed_at', models.DateTimeField()),
+                ('article', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='writer.article')),
+            ],
+            options={
+                'verbose_name': 'article view',
+                'verbose_name_plural': 'article views',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArticleDailyViews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='writer.article')),
+            ],
+            options={
+                'verbose_name': 'article daily views',
+                'verbose_name_plural': 'article daily views',
+                'unique_together': {('article', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArticleHourlyViews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_views', to='writer.article')),
+            ],
+            options={
+                'verbose_name': 'article hourly views',
+                'verbose_name_plural': 'article hourly views',
+                'unique_together': {('article', 'hour')},
+            },
+        ),
+    ]
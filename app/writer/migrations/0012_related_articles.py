@@ -0,0 +1,42 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('writer', '0011_article_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedArticlesModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('built_at', models.DateTimeField()),
+                ('scored_until', models.DateTimeField()),
+                ('data', models.BinaryField()),
+            ],
+            options={
+                'verbose_name': 'related articles model',
+                'verbose_name_plural': 'related articles models',
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedArticle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField(help_text='Cosine similarity')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_articles', to='writer.article')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='writer.article')),
+            ],
+            options={
+                'verbose_name': 'related article',
+                'verbose_name_plural': 'related articles',
+                'unique_together': {('article', 'rank')},
+            },
+        ),
+    ]
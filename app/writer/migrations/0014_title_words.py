@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:34
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+# Same split as writer.search.title_words().
+FILL_TITLE_WORDS = r"""
+INSERT INTO writer_titleword (word)
+SELECT DISTINCT word
+FROM writer_article, unnest(regexp_split_to_array(upper(title), '\W+')) AS word
+WHERE word <> ''
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('writer', '0013_article_duplicates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleWord',
+            fields=[
+                ('word', models.CharField(max_length=150, primary_key=True, serialize=False)),
+            ],
+            options={
+                'verbose_name': 'title word',
+                'verbose_name_plural': 'title words',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('word', name='gin_trgm_ops'), name='title_word_trgm_idx')],
+            },
+        ),
+        migrations.RunSQL(FILL_TITLE_WORDS, migrations.RunSQL.noop),
+    ]
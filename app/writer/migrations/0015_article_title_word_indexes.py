@@ -0,0 +1,33 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:34
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.contrib.postgres.operations import (AddIndexConcurrently,
+                                                RemoveIndexConcurrently)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Builds the indexes without blocking writes, see 0002_article_indexes.
+    atomic = False
+
+    dependencies = [
+        ('writer', '0014_title_words'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='article',
+            index=models.Index(django.db.models.functions.comparison.Collate(django.db.models.functions.text.Upper('title'), 'C'), name='article_title_prefix_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='article',
+            index=django.contrib.postgres.indexes.GinIndex(models.Func(django.db.models.functions.text.Upper('title'), models.Value('\\W+'), function='regexp_split_to_array', output_field=django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), size=None)), name='article_title_words_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='article',
+            name='article_title_trgm_idx',
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:41
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # A stored generated column cannot replace a plain one in place: the
+    # column is added again, which rewrites the table under an exclusive
+    # lock anyway, so the index is built in the same transaction rather
+    # than concurrently (see README, Rollout Notes).
+
+    dependencies = [
+        ('writer', '0015_article_title_word_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='article',
+            name='article_search_vector_idx',
+        ),
+        migrations.RemoveField(
+            model_name='article',
+            name='search_vector',
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector('content', config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='article_search_vector_idx'),
+        ),
+    ]
@@ -1,7 +1,22 @@
-from django.db import models
+import math
+
+from django.db import models, transaction
 from django.conf import settings
+from django.db.models.functions import Collate, Upper
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.text import slugify
 
+from writer.search import add_title_words, article_search_vector, title_words
+
+EXCERPT_LENGTH = 150
+WORDS_PER_MINUTE = 200
+
+# Access tiers are ranks: a subscription plan of tier n covers articles
+# requiring tier n or lower (see client.models.SubscriptionPlan.tier).
+BASIC_TIER = 1
+PREMIUM_TIER = 2
 
 
 class Article(models.Model):
@@ -14,20 +29,309 @@ class Article(models.Model):
     )
     date_posted = models.DateTimeField(auto_now_add=True)
     last_modified = models.DateTimeField(auto_now=True)
-    is_premium = models.BooleanField(
-        default=False,
-        verbose_name="Is it a premium article?"
+    # db_default: instances of the previous release insert articles
+    # without the column during deployment.
+    required_tier = models.PositiveSmallIntegerField(
+        default=BASIC_TIER,
+        db_default=BASIC_TIER,
+        help_text='Lowest subscription plan tier that may read the article.'
+    )
+    # Deprecated: mirrors required_tier for instances of the previous
+    # release during deployment; drop it in the next one.
+    is_premium = models.BooleanField(default=False, editable=False)
+
+    # Kept in sync with content on save, so that listings can defer content.
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True,
+                               editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        help_text='Minutes'
+    )
+
+    # Sanitized HTML of content, rendered on save, see writer.rendering
+    content_html = models.TextField(blank=True, editable=False)
+    content_renderer_version = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        help_text='Renderer version of content_html, 0 if not rendered yet.'
+    )
+
+    # Title weighted over content, see writer.search
+    search_vector = models.GeneratedField(
+        expression=article_search_vector(),
+        output_field=SearchVectorField(),
+        db_persist=True
     )
 
+    # MinHash of title and content, and the most similar other article
+    # when it looks like a copy, see writer.duplicates
+    minhash = ArrayField(models.IntegerField(), null=True, editable=False)
+    duplicate_of = models.ForeignKey(
+        to='self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+'
+    )
+    duplicate_similarity = models.FloatField(null=True, editable=False)
+
     class Meta:
         verbose_name = 'article'
         verbose_name_plural = 'articles'
+        # (slug, author) also serves lookups by slug alone.
         unique_together = ('slug', 'author')
+        indexes = [
+            models.Index(
+                fields=['-date_posted', '-id'],
+                name='article_date_posted_idx'
+            ),
+            models.Index(
+                fields=['-date_posted', '-id'],
+                condition=models.Q(is_premium=False),
+                name='article_free_date_posted_idx'
+            ),
+            models.Index(
+                fields=['-date_posted', '-id'],
+                condition=models.Q(required_tier__lte=BASIC_TIER),
+                name='article_basic_date_posted_idx'
+            ),
+            models.Index(
+                fields=['author', '-date_posted', '-id'],
+                name='article_author_date_posted_idx'
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='article_search_vector_idx'
+            ),
+            models.Index(
+                Collate(Upper('title'), 'C'),
+                name='article_title_prefix_idx'
+            ),
+            GinIndex(
+                title_words(),
+                name='article_title_words_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._rendered_content = instance.__dict__.get('content')
+        return instance
+
+    @property
+    def is_premium_tier(self) -> bool:
+        return self.required_tier > BASIC_TIER
+
     def save(self, *args, **kwargs):
+        # Buckets and title words follow the row, or neither is saved.
+        with transaction.atomic():
+            self._save(*args, **kwargs)
+
+    def _save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+
+        if 'required_tier' not in self.get_deferred_fields():
+            self.is_premium = self.is_premium_tier
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'required_tier' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'is_premium'}
+
+        if 'content' not in self.get_deferred_fields():
+            self.update_text_stats()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                self.update_content_html()
+            elif 'content' in update_fields:
+                kwargs['update_fields'] = {
+                    *update_fields, 'excerpt', 'word_count', 'reading_time'
+                }
+                if self.update_content_html():
+                    kwargs['update_fields'] |= {'content_html',
+                                                'content_renderer_version'}
+
+        update_fields = kwargs.get('update_fields')
+        signing = (
+            not {'title', 'content'} & self.get_deferred_fields() and
+            (update_fields is None or {'title', 'content'} & set(update_fields))
+        )
+        if signing:
+            self.update_minhash()
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'minhash', 'duplicate_of',
+                    'duplicate_similarity'
+                }
+
         super(Article, self).save(*args, **kwargs)
+
+        if signing:
+            from writer.duplicates import replace_buckets
+            replace_buckets(self.pk, self.minhash)
+
+        update_fields = kwargs.get('update_fields')
+        if ('title' not in self.get_deferred_fields() and
+                (update_fields is None or 'title' in update_fields)):
+            add_title_words(self.title)
+
+    def update_text_stats(self):
+        """Compute excerpt, word count and reading time from content."""
+
+        self.excerpt = self.content[:EXCERPT_LENGTH]
+        self.word_count = len(self.content.split())
+        self.reading_time = math.ceil(self.word_count / WORDS_PER_MINUTE)
+
+    def update_content_html(self) -> bool:
+        """Render content to HTML unless the stored HTML is already its
+        rendering by the current renderer; return whether it was rendered."""
+
+        from writer.rendering import RENDERER_VERSION, render_content
+
+        if (self.content_renderer_version == RENDERER_VERSION and
+                self.content == getattr(self, '_rendered_content', None)):
+            return False
+
+        self.content_html = render_content(self.content)
+        self.content_renderer_version = RENDERER_VERSION
+        self._rendered_content = self.content
+        return True
+
+    def update_minhash(self):
+        """Sign title and content and flag the most similar earlier article
+        if this one looks like a copy of it."""
+
+        from writer.duplicates import find_duplicate, minhash
+
+        self.minhash = minhash(self.title, self.content)
+        self.duplicate_of, self.duplicate_similarity = find_duplicate(
+            self.minhash, before_pk=self.pk
+        )
+
+
+class TitleWord(models.Model):
+    """Distinct upper-cased word of article titles, matched by title
+    suggestions; see writer.search."""
+
+    word = models.CharField(max_length=150, primary_key=True)
+
+    class Meta:
+        verbose_name = 'title word'
+        verbose_name_plural = 'title words'
+        indexes = [
+            GinIndex(
+                OpClass('word', name='gin_trgm_ops'),
+                name='title_word_trgm_idx'
+            ),
+        ]
+
+
+class ArticleSignatureBucket(models.Model):
+    """LSH bucket of one band of an article's MinHash; articles sharing a
+    bucket are candidate duplicates."""
+
+    article = models.ForeignKey(
+        to=Article,
+        on_delete=models.CASCADE,
+        related_name='signature_buckets'
+    )
+    bucket = models.BigIntegerField(db_index=True)
+
+    class Meta:
+        verbose_name = 'article signature bucket'
+        verbose_name_plural = 'article signature buckets'
+
+
+class ArticleView(models.Model):
+    """Raw view of an article, folded into the rollups below by the
+    `rollup_article_views` command and then deleted."""
+
+    id = models.BigAutoField(primary_key=True)
+    # No constraint: views are copied in batches after the request, when
+    # the article may be gone already; the rollup skips such views.
+    article = models.ForeignKey(
+        to=Article,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='+'
+    )
+    viewed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'article view'
+        verbose_name_plural = 'article views'
+
+
+class ArticleHourlyViews(models.Model):
+    article = models.ForeignKey(
+        to=Article,
+        on_delete=models.CASCADE,
+        related_name='hourly_views'
+    )
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'article hourly views'
+        verbose_name_plural = 'article hourly views'
+        unique_together = ('article', 'hour')
+
+
+class ArticleDailyViews(models.Model):
+    article = models.ForeignKey(
+        to=Article,
+        on_delete=models.CASCADE,
+        related_name='daily_views'
+    )
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'article daily views'
+        verbose_name_plural = 'article daily views'
+        unique_together = ('article', 'day')
+
+
+class RelatedArticle(models.Model):
+    """Precomputed nearest article by content, see writer.related."""
+
+    article = models.ForeignKey(
+        to=Article,
+        on_delete=models.CASCADE,
+        related_name='related_articles'
+    )
+    rank = models.PositiveSmallIntegerField()
+    related = models.ForeignKey(
+        to=Article,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField(help_text='Cosine similarity')
+
+    class Meta:
+        verbose_name = 'related article'
+        verbose_name_plural = 'related articles'
+        # Also serves reading an article's neighbours in rank order.
+        unique_together = ('article', 'rank')
+
+
+class RelatedArticlesModel(models.Model):
+    """Vocabulary and TF-IDF vectors of the last full build of related
+    articles, used to score new and edited articles until the next one."""
+
+    built_at = models.DateTimeField()
+    # Articles modified since were not scored against it yet.
+    scored_until = models.DateTimeField()
+    # npz archive: terms, idf, article ids and the row-normalized matrix.
+    data = models.BinaryField()
+
+    class Meta:
+        verbose_name = 'related articles model'
+        verbose_name_plural = 'related articles models'
@@ -0,0 +1,334 @@
+"""
+Related articles.
+
+The `build_related_articles` command builds TF-IDF vectors of all articles
+over their title and content as a SciPy sparse matrix, finds the
+RELATED_ARTICLES_STORED nearest articles of each by cosine similarity, one
+block of rows at a time, and stores them in RelatedArticle. Vocabulary and
+vectors are kept in RelatedArticlesModel; with --incremental, articles
+created or edited since are scored against them instead of rebuilding.
+Detail pages read the precomputed neighbours with one indexed query.
+"""
+
+import io
+import re
+
+from collections import Counter
+
+import numpy as np
+
+from scipy import sparse
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from writer.models import Article, RelatedArticle, RelatedArticlesModel
+
+TOKEN_RE = re.compile(r'[a-z0-9]{2,}')
+# Title words count as many times as in the content.
+TITLE_WEIGHT = 3
+
+# Terms in fewer articles than MIN_DF or in a larger share of them than
+# MAX_DF tell little about an article and are left out.
+MIN_DF = 2
+MAX_DF = 0.5
+MAX_FEATURES = 50_000
+
+BLOCK_SIZE = 256
+
+STOP_WORDS = frozenset((
+    'about', 'after', 'all', 'also', 'an', 'and', 'any', 'are', 'as', 'at',
+    'be', 'because', 'been', 'but', 'by', 'can', 'could', 'do', 'for',
+    'from', 'had', 'has', 'have', 'he', 'her', 'his', 'how', 'if', 'in',
+    'into', 'is', 'it', 'its', 'more', 'my', 'no', 'not', 'of', 'on', 'one',
+    'or', 'our', 'out', 'she', 'so', 'some', 'than', 'that', 'the', 'their',
+    'them', 'then', 'there', 'these', 'they', 'this', 'to', 'up', 'was',
+    'we', 'were', 'what', 'when', 'which', 'who', 'will', 'with', 'would',
+    'you', 'your',
+))
+
+
+def tokenize(title: str, content: str) -> Counter:
+    """Term counts of an article."""
+
+    counts = Counter(t for t in TOKEN_RE.findall(content.lower())
+                     if t not in STOP_WORDS)
+    for term in TOKEN_RE.findall(title.lower()):
+        if term not in STOP_WORDS:
+            counts[term] += TITLE_WEIGHT
+
+    return counts
+
+
+class TfidfModel:
+    """Vocabulary with inverse document frequencies, and the L2-normalized
+    TF-IDF vectors of the articles it was fitted on, one row each."""
+
+    def __init__(self, terms, idf, article_ids, matrix):
+        self.terms = list(terms)
+        self.index = {term: i for i, term in enumerate(self.terms)}
+        self.idf = idf
+        self.article_ids = article_ids
+        self.matrix = matrix
+
+    @classmethod
+    def fit(cls, documents, min_df: int = MIN_DF, max_df: float = MAX_DF,
+            max_features: int = MAX_FEATURES) -> 'TfidfModel':
+        """Fit on (pk, title, content) of articles."""
+
+        article_ids = []
+        counts = []
+        df = Counter()
+
+        for pk, title, content in documents:
+            article_counts = tokenize(title, content)
+            article_ids.append(pk)
+            counts.append(article_counts)
+            df.update(article_counts.keys())
+
+        n = len(article_ids)
+        kept = sorted(
+            (term for term, d in df.items() if min_df <= d <= max_df * n),
+            key=lambda term: (-df[term], term)
+        )[:max_features]
+        doc_freq = np.array([df[term] for term in kept], dtype=np.float64)
+        idf = np.log((1 + n) / (1 + doc_freq)) + 1
+
+        model = cls(kept, idf, np.array(article_ids, dtype=np.int64), None)
+        model.matrix = model.vectorize_counts(counts)
+        return model
+
+    def vectorize(self, documents) -> tuple[np.ndarray, sparse.csr_matrix]:
+        """Return ids and vectors of (pk, title, content) of articles,
+        with the vocabulary of the model."""
+
+        article_ids = []
+        counts = []
+        for pk, title, content in documents:
+            article_ids.append(pk)
+            counts.append(tokenize(title, content))
+
+        return (np.array(article_ids, dtype=np.int64),
+                self.vectorize_counts(counts))
+
+    def vectorize_counts(self, counts: list[Counter]) -> sparse.csr_matrix:
+        indptr = [0]
+        indices = []
+        data = []
+
+        for article_counts in counts:
+            for term, count in article_counts.items():
+                column = self.index.get(term)
+                if column is not None:
+                    indices.append(column)
+                    data.append(count)
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.array(data, dtype=np.float64),
+             np.array(indices, dtype=np.int32),
+             np.array(indptr, dtype=np.int64)),
+            shape=(len(counts), len(self.terms))
+        )
+        # Sublinear term frequency, weighted by rarity.
+        matrix.data = 1 + np.log(matrix.data)
+        matrix = matrix @ sparse.diags(self.idf)
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)))
+        norms[norms == 0] = 1
+        return sparse.csr_matrix(matrix.multiply(1 / norms))
+
+    def neighbours(self, article_ids, vectors, k: int) -> list[list[tuple]]:
+        """Return the k most similar (article id, cosine) of each vector,
+        best first, leaving out the article itself."""
+
+        similarities = (vectors @ self.matrix.T).tocsr()
+        result = []
+
+        for row, article_id in enumerate(article_ids):
+            start, end = similarities.indptr[row], similarities.indptr[row + 1]
+            ids = self.article_ids[similarities.indices[start:end]]
+            scores = similarities.data[start:end]
+
+            keep = (ids != article_id) & (scores > 0)
+            ids, scores = ids[keep], scores[keep]
+
+            if len(scores) > k:
+                top = np.argpartition(-scores, k)[:k]
+                ids, scores = ids[top], scores[top]
+
+            order = np.argsort(-scores, kind='stable')
+            result.append([(int(ids[i]), float(scores[i])) for i in order])
+
+        return result
+
+    def dumps(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            terms=np.array(self.terms, dtype=str),
+            idf=self.idf,
+            article_ids=self.article_ids,
+            data=self.matrix.data,
+            indices=self.matrix.indices,
+            indptr=self.matrix.indptr,
+            shape=np.array(self.matrix.shape),
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def loads(cls, data: bytes) -> 'TfidfModel':
+        arrays = np.load(io.BytesIO(data), allow_pickle=False)
+        matrix = sparse.csr_matrix(
+            (arrays['data'], arrays['indices'], arrays['indptr']),
+            shape=tuple(arrays['shape'])
+        )
+        return cls(arrays['terms'].tolist(), arrays['idf'],
+                   arrays['article_ids'], matrix)
+
+
+def article_documents(queryset):
+    return queryset.order_by('pk').values_list(
+        'pk', 'title', 'content'
+    ).iterator(chunk_size=2000)
+
+
+def build_related(min_df: int = MIN_DF, max_df: float = MAX_DF,
+                  block_size: int = BLOCK_SIZE) -> int:
+    """Fit a model on all articles, store the neighbours of every article
+    and the model; return the number of articles."""
+
+    k = settings.RELATED_ARTICLES_STORED
+    # Articles edited while building are scored by the next incremental run.
+    started_at = timezone.now()
+    model = TfidfModel.fit(article_documents(Article.objects.all()),
+                           min_df=min_df, max_df=max_df)
+
+    for start in range(0, len(model.article_ids), block_size):
+        article_ids = model.article_ids[start:start + block_size]
+        neighbours = model.neighbours(
+            article_ids, model.matrix[start:start + block_size], k
+        )
+        save_neighbours(dict(zip(article_ids.tolist(), neighbours)))
+
+    with transaction.atomic():
+        RelatedArticlesModel.objects.all().delete()
+        RelatedArticlesModel.objects.create(
+            built_at=started_at,
+            scored_until=started_at,
+            data=model.dumps()
+        )
+
+    return len(model.article_ids)
+
+
+def update_related(block_size: int = BLOCK_SIZE) -> int | None:
+    """Score articles modified since the last run against the stored
+    model; return their number, None without a model.
+
+    Scored articles also enter the lists of their neighbours they beat.
+    New articles become neighbours of the others only as far as that goes
+    until the next full build.
+    """
+
+    stored = RelatedArticlesModel.objects.order_by('-built_at').first()
+    if stored is None:
+        return None
+
+    k = settings.RELATED_ARTICLES_STORED
+    started_at = timezone.now()
+    model = TfidfModel.loads(bytes(stored.data))
+    article_ids, vectors = model.vectorize(article_documents(
+        Article.objects.filter(last_modified__gt=stored.scored_until)
+    ))
+
+    for start in range(0, len(article_ids), block_size):
+        block_ids = article_ids[start:start + block_size].tolist()
+        neighbours = dict(zip(block_ids, model.neighbours(
+            block_ids, vectors[start:start + block_size], k
+        )))
+        save_neighbours(neighbours)
+        save_neighbours(merge_into_neighbours(neighbours, k))
+
+    RelatedArticlesModel.objects.filter(pk=stored.pk).update(
+        scored_until=started_at
+    )
+
+    return len(article_ids)
+
+
+def merge_into_neighbours(neighbours: dict, k: int) -> dict:
+    """Return the lists of the articles found as neighbours, with the
+    articles they were found for added where they rank in the top k."""
+
+    lists = {}
+    for related in RelatedArticle.objects.filter(
+        article_id__in={pk for found in neighbours.values()
+                        for pk, _ in found}
+    ).order_by('rank'):
+        lists.setdefault(related.article_id, []).append(
+            (related.related_id, related.score)
+        )
+
+    changed = {}
+    for article_id, found in neighbours.items():
+        for pk, score in found:
+            current = [x for x in changed.get(pk, lists.get(pk, []))
+                       if x[0] != article_id]
+            merged = sorted(current + [(article_id, score)],
+                            key=lambda x: -x[1])[:k]
+            if (article_id, score) in merged:
+                changed[pk] = merged
+
+    return changed
+
+
+def save_neighbours(neighbours: dict):
+    """Replace stored neighbours of the articles; articles deleted since the
+    model was built are left out."""
+
+    if not neighbours:
+        return
+
+    existing = set(Article.objects.filter(pk__in={
+        pk for article_id, found in neighbours.items()
+        for pk in [article_id, *(related_id for related_id, _ in found)]
+    }).values_list('pk', flat=True))
+
+    with transaction.atomic():
+        RelatedArticle.objects.filter(article_id__in=neighbours).delete()
+        RelatedArticle.objects.bulk_create([
+            RelatedArticle(article_id=article_id, rank=rank,
+                           related_id=related_id, score=score)
+            for article_id, found in neighbours.items()
+            if article_id in existing
+            for rank, (related_id, score) in enumerate(
+                [x for x in found if x[0] in existing], 1
+            )
+        ])
+
+
+def related_updated_at():
+    """When stored neighbours last changed: the build of the stored model,
+    or the incremental run scoring articles against it since. None before
+    the first build."""
+
+    return RelatedArticlesModel.objects.aggregate(
+        updated_at=Max('scored_until')
+    )['updated_at']
+
+
+def related_articles(article, tier: int | None) -> list[dict]:
+    """Top related articles covered by the tier, best first."""
+
+    if tier is None:
+        return []
+
+    return list(RelatedArticle.objects.filter(
+        article=article,
+        related__required_tier__lte=tier
+    ).order_by('rank').values(
+        title=F('related__title'), slug=F('related__slug')
+    )[:settings.RELATED_ARTICLES_SHOWN])
@@ -0,0 +1,88 @@
+"""
+Article content rendering.
+
+Content is written in Markdown and rendered to sanitized HTML once, when
+the article is saved, into `Article.content_html`; detail pages output the
+stored HTML as is. Bump RENDERER_VERSION whenever the output of
+`render_content` changes, then run the `render_articles` command to
+re-render the stored HTML of existing articles in batches.
+"""
+
+import markdown
+import nh3
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+RENDERER_VERSION = 1
+
+MARKDOWN_EXTENSIONS = ['fenced_code', 'tables', 'sane_lists']
+
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'del', 'em', 'h1', 'h2',
+    'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 's',
+    'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'ul',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'abbr': {'title'},
+    'code': {'class'},
+    'img': {'src', 'alt', 'title'},
+}
+URL_SCHEMES = {'http', 'https', 'mailto'}
+
+
+def render_content(text: str) -> str:
+    """Return sanitized HTML of Markdown `text`."""
+
+    html = markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS)
+
+    return nh3.clean(
+        html,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        url_schemes=URL_SCHEMES,
+        link_rel='nofollow noopener noreferrer'
+    )
+
+
+def render_range(first_pk: int, last_pk: int, force: bool = False) -> int:
+    """Re-render articles with pk in [first_pk, last_pk] rendered by another
+    renderer version (all of them with `force`); return the number of
+    articles updated.
+
+    Rows are rendered without holding locks, then updated only if their
+    content is still the one rendered: articles edited meanwhile are
+    skipped, their save renders them. Runs in a pool process, so the
+    process' connection is closed when done.
+    """
+
+    from writer.models import Article
+
+    try:
+        queryset = Article.objects.filter(pk__gte=first_pk, pk__lte=last_pk)
+        if not force:
+            queryset = queryset.exclude(
+                content_renderer_version=RENDERER_VERSION
+            )
+
+        rendered = [(pk, content, render_content(content))
+                    for pk, content in queryset.values_list('pk', 'content')]
+        # Pages cached by browsers and the body cache are keyed on it.
+        now = timezone.now()
+        updated = 0
+
+        with transaction.atomic():
+            for pk, content, html in rendered:
+                updated += Article.objects.filter(
+                    pk=pk,
+                    content=content
+                ).update(
+                    content_html=html,
+                    content_renderer_version=RENDERER_VERSION,
+                    last_modified=now
+                )
+
+        return updated
+    finally:
+        connection.close()
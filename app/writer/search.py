@@ -0,0 +1,159 @@
+"""
+Full-text search over articles.
+
+Each article stores its tsvector in `Article.search_vector`, with the title
+weighted above the content, and a GIN index answers `@@` matches. The
+column is generated by PostgreSQL from the row, so it is always current.
+
+Title autocompletion never ranks all matching titles, which for a common
+fragment can be thousands. Titles starting with the typed text come first,
+straight from a btree on UPPER(title) in index order. The last typed word
+is then matched as a prefix or, with a typo, by trigram similarity against
+TitleWord, the distinct words of all titles (short rows under a pg_trgm
+GIN index), and titles containing the best words are read from a GIN
+index on the words of the title. Each step reads at most a handful of
+index entries beyond the rows it returns.
+"""
+
+import re
+
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, TrigramSimilarity)
+from django.db import connection, transaction
+from django.db.models import Case, F, Func, Q, TextField, Value, When
+from django.db.models.functions import Collate, Upper
+
+SEARCH_CONFIG = 'english'
+
+# Title words as split by PostgreSQL, see title_words().
+WORD_SEPARATOR = r'\W+'
+# Vocabulary words whose titles are suggested after the prefix matches.
+MAX_WORDS = 5
+
+ADD_TITLE_WORDS_SQL = """
+INSERT INTO {words} (word)
+SELECT DISTINCT word FROM unnest(regexp_split_to_array(upper(%s), %s)) AS word
+WHERE word <> ''
+ON CONFLICT (word) DO NOTHING
+"""
+
+REBUILD_TITLE_WORDS_SQL = """
+INSERT INTO {words} (word)
+SELECT DISTINCT word
+FROM {article}, unnest(regexp_split_to_array(upper(title), %s)) AS word
+WHERE word <> ''
+"""
+
+
+def article_search_vector() -> SearchVector:
+    """Expression computing the search vector of an article row, which
+    generates `Article.search_vector`."""
+
+    return (SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+            SearchVector('content', weight='B', config=SEARCH_CONFIG))
+
+
+def search_articles(queryset, text: str):
+    """Return articles of `queryset` matching `text`, best match first."""
+
+    query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+
+    return queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F('search_vector'), query)
+    ).order_by('-rank', '-date_posted', '-id')
+
+
+def title_words() -> Func:
+    """Expression of the upper-cased words of an article title, as indexed
+    by article_title_words_idx."""
+
+    return Func(
+        Upper('title'), Value(WORD_SEPARATOR),
+        function='regexp_split_to_array',
+        output_field=ArrayField(TextField())
+    )
+
+
+def autocomplete_titles(queryset, fragment: str, limit: int) -> list[tuple]:
+    """Return (title, slug) of up to `limit` articles whose title starts
+    with `fragment`, then of articles with the words of `fragment` in their
+    title, the last one possibly incomplete or misspelled."""
+
+    from writer.models import TitleWord
+
+    fragment = fragment.upper()
+    results = {}
+
+    def add(rows):
+        for pk, title, slug in rows:
+            results.setdefault(pk, (title, slug))
+
+    add(queryset.alias(
+        c_title=Collate(Upper('title'), 'C')
+    ).filter(
+        c_title__startswith=fragment
+    ).order_by('c_title', 'pk').values_list('pk', 'title', 'slug')[:limit])
+
+    words = [word for word in re.split(WORD_SEPARATOR, fragment) if word]
+    if len(results) >= limit or not words:
+        return list(results.values())
+
+    *words, last = words
+
+    candidates = list(TitleWord.objects.filter(
+        Q(word__startswith=last) | Q(word__trigram_similar=last)
+    ).annotate(
+        is_prefix=Case(
+            When(word__startswith=last, then=Value(True)),
+            default=Value(False)
+        ),
+        similarity=TrigramSimilarity('word', last)
+    ).order_by(
+        '-is_prefix', '-similarity', 'word'
+    ).values_list('word', flat=True)[:MAX_WORDS])
+    if not candidates:
+        return list(results.values())
+
+    # The planner reads titles from article_title_words_idx unless it
+    # expects matches to be common, when a scan stops at the limit early.
+    for word in candidates:
+        add(queryset.alias(
+            words=title_words()
+        ).filter(
+            words__contains=[*words, word]
+        ).order_by().values_list('pk', 'title', 'slug')[:limit])
+        if len(results) >= limit:
+            break
+
+    return list(results.values())[:limit]
+
+
+def add_title_words(title: str):
+    """Add the words of a saved title to TitleWord."""
+
+    from writer.models import TitleWord
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            ADD_TITLE_WORDS_SQL.format(words=TitleWord._meta.db_table),
+            [title, WORD_SEPARATOR]
+        )
+
+
+def rebuild_title_words() -> int:
+    """Replace TitleWord with the words of current titles, dropping words
+    of titles edited or deleted since; return the number of words."""
+
+    from writer.models import Article, TitleWord
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TitleWord._meta.db_table}')
+        cursor.execute(
+            REBUILD_TITLE_WORDS_SQL.format(
+                words=TitleWord._meta.db_table,
+                article=Article._meta.db_table
+            ),
+            [WORD_SEPARATOR]
+        )
+        return cursor.rowcount
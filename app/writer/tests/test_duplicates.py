@@ -0,0 +1,150 @@
+"""
+Tests for near-duplicate article detection.
+Command: pytest writer/tests/test_duplicates.py --cov=writer --cov-report term-missing:skip-covered
+"""
+
+import pytest
+
+from unittest.mock import patch
+
+from django.contrib.messages import get_messages
+from django.core.management import call_command
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+
+from writer.duplicates import (BANDS, NUM_PERMUTATIONS, band_buckets,
+                               find_duplicate, minhash, similarity)
+from writer.models import Article, ArticleSignatureBucket
+
+pytestmark = pytest.mark.django_db
+
+ORIGINAL = (
+    'The old lighthouse keeper climbed the spiral stairs every evening to '
+    'light the lamp, watching the ships pass the rocky cape while storms '
+    'gathered over the grey northern sea and gulls circled the tower.'
+)
+EDITED = ORIGINAL.replace('every evening', 'each evening')
+OTHER = (
+    'Sourdough bread needs a lively starter, strong flour, patience and a '
+    'hot oven; fold the dough gently and let it rise overnight in the cold.'
+)
+
+
+def test_minhash_similarity():
+    """Test signatures of alike texts agree on most positions."""
+
+    original = minhash('Lighthouse', ORIGINAL)
+
+    assert len(original) == NUM_PERMUTATIONS
+    assert original == minhash('Lighthouse', ORIGINAL)
+    assert similarity(original, minhash('Lighthouse', EDITED)) >= 0.8
+    assert similarity(original, minhash('Bread', OTHER)) < 0.2
+    assert minhash('', '') is None
+
+
+def test_save_flags_duplicate(user_writer, article):
+    """Test saving a lightly edited copy flags it, other articles not."""
+
+    original = article(user_writer, title='Lighthouse', slug='original',
+                       content=ORIGINAL)
+    other = article(user_writer, title='Bread', slug='bread', content=OTHER)
+    copy = article(user_writer, title='Lighthouse', slug='copy',
+                   content=EDITED)
+
+    assert copy.duplicate_of == original
+    assert copy.duplicate_similarity >= 0.8
+    assert other.duplicate_of is None
+    assert ArticleSignatureBucket.objects.filter(
+        article=copy
+    ).count() <= BANDS
+
+    copy.content = OTHER.upper()
+    copy.save(update_fields=['content'])
+    copy.refresh_from_db()
+
+    assert copy.duplicate_of == other
+
+    original.content = EDITED
+    original.save(update_fields=['content'])
+    original.refresh_from_db()
+
+    assert original.duplicate_of is None
+
+
+def test_duplicate_lookup_uses_buckets(user_writer, article):
+    """Test candidates are looked up by bucket, not by reading all rows."""
+
+    for i in range(5):
+        article(user_writer, title=f'Other {i}', slug=f'other-{i}',
+                content=f'{OTHER} {i}')
+    article(user_writer, title='Lighthouse', slug='original',
+            content=ORIGINAL)
+
+    with CaptureQueriesContext(connection) as queries:
+        copy = article(user_writer, title='Lighthouse', slug='copy',
+                       content=EDITED)
+
+    lookup = next(q['sql'] for q in queries
+                  if 'writer_articlesignaturebucket' in q['sql'] and
+                  q['sql'].startswith('SELECT'))
+
+    assert '"bucket" IN' in lookup
+    assert copy.duplicate_of.slug == 'original'
+
+
+def test_duplicate_candidates_sharing_most_buckets_first(user_writer,
+                                                         article):
+    """Test a copy is found when more candidates than compared share a
+    bucket with the signature, earlier ones sharing fewer."""
+
+    signature = minhash('Lighthouse', ORIGINAL)
+    for i in range(3):
+        other = article(user_writer, title=f'Other {i}', slug=f'other-{i}',
+                        content=f'{OTHER} {i}')
+        ArticleSignatureBucket.objects.create(
+            article=other, bucket=band_buckets(signature)[0]
+        )
+    copy = article(user_writer, title='Lighthouse', slug='copy',
+                   content=EDITED)
+
+    with patch('writer.duplicates.MAX_CANDIDATES', 2):
+        assert find_duplicate(signature)[0] == copy
+
+
+def test_create_article_warns_writer(client, user_writer, article):
+    """Test the writer is told when a new article looks like a copy."""
+
+    article(user_writer, title='Lighthouse', slug='original',
+            content=ORIGINAL)
+    client.force_login(user_writer)
+
+    r = client.post(
+        reverse('writer:create_article', kwargs={'writer_id': user_writer.id}),
+        data={'title': 'Lighthouse', 'slug': 'lighthouse-copy',
+              'content': EDITED}
+    )
+    texts = [m.message for m in get_messages(r.wsgi_request)]
+
+    assert any('alike "Lighthouse"' in text for text in texts)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sign_articles_command(user_writer, article, capsys):
+    """Test the backfill signs all articles, then flags duplicates."""
+
+    article(user_writer, title='Lighthouse', slug='original',
+            content=ORIGINAL)
+    article(user_writer, title='Lighthouse', slug='copy', content=EDITED)
+    article(user_writer, title='Bread', slug='bread', content=OTHER)
+    Article.objects.update(minhash=None, duplicate_of=None,
+                           duplicate_similarity=None)
+    ArticleSignatureBucket.objects.all().delete()
+
+    call_command('sign_articles', processes=2, chunk_size=1)
+
+    assert not Article.objects.filter(minhash__isnull=True).exists()
+    assert dict(Article.objects.values_list(
+        'slug', 'duplicate_of__slug'
+    )) == {'original': None, 'copy': 'original', 'bread': None}
+    assert 'Signed 3 articles, flagged 1 duplicates.' in capsys.readouterr().out
@@ -0,0 +1,132 @@
+"""
+Tests that hot article queries use their indexes.
+Command: pytest writer/tests/test_indexes.py
+"""
+
+import pytest
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.pagination import encode_cursor, paginate_keyset
+from writer.models import BASIC_TIER, Article
+from writer.search import autocomplete_titles, search_articles
+
+pytestmark = pytest.mark.django_db
+
+
+def explain(queryset) -> str:
+    """Return the query plan, with sequential scans and sorts discouraged
+    so that the tiny test table is planned like a large one."""
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute('SET LOCAL enable_sort = off')
+        return queryset.explain()
+
+
+@pytest.mark.parametrize(
+    'filters,index',
+    [({}, 'article_date_posted_idx'),
+     ({'is_premium': False}, 'article_free_date_posted_idx'),
+     ({'required_tier__lte': BASIC_TIER}, 'article_basic_date_posted_idx')]
+)
+def test_article_list_uses_index(filters, index, article, user_writer):
+    """Test browse queries read the index in order, without sorting."""
+
+    article(user_writer)
+    plan = explain(
+        Article.objects.filter(**filters).order_by('-date_posted', '-id')[:21]
+    )
+
+    assert index in plan
+    assert 'Sort' not in plan
+
+
+def test_my_articles_uses_index(article, user_writer):
+    """Test writer's articles are read from the author index in order."""
+
+    article(user_writer)
+    plan = explain(
+        Article.objects.filter(author=user_writer)
+        .order_by('-date_posted', '-id')[:21]
+    )
+
+    assert 'article_author_date_posted_idx' in plan
+    assert 'Sort' not in plan
+
+
+def test_slug_lookup_uses_index(article, user_writer):
+    """Test slug lookups use the (slug, author) unique index."""
+
+    a = article(user_writer)
+    plan = explain(Article.objects.filter(slug=a.slug))
+
+    assert 'Index' in plan
+    assert 'slug' in plan
+
+
+def test_article_next_page_starts_at_cursor(article, user_writer):
+    """Test a later page starts the index scan at the cursor."""
+
+    a = article(user_writer)
+    page_cursor = encode_cursor(a.date_posted, a.pk)
+
+    with CaptureQueriesContext(connection) as queries:
+        paginate_keyset(
+            Article.objects.filter(required_tier__lte=BASIC_TIER),
+            page_cursor, 20
+        )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute('SET LOCAL enable_sort = off')
+        cursor.execute(f'EXPLAIN {queries[0]["sql"]}')
+        plan = '\n'.join(row[0] for row in cursor.fetchall())
+
+    assert 'article_basic_date_posted_idx' in plan
+    assert 'Index Cond: (date_posted <=' in plan
+
+
+def test_article_search_uses_gin_index(article, user_writer):
+    """Test full-text matches are answered from the GIN index."""
+
+    article(user_writer)
+    plan = explain(search_articles(Article.objects.all(), 'sample'))
+
+    assert 'article_search_vector_idx' in plan
+
+
+def test_autocomplete_reads_title_indexes(article, user_writer):
+    """Test title suggestions read the prefix and title words indexes
+    when the typed words are rare, as planned from table statistics."""
+
+    Article.objects.bulk_create(
+        Article(title=f'Common story {i}', slug=f'common-{i}',
+                author=user_writer)
+        for i in range(3000)
+    )
+    article(user_writer, title='Garden by the river')
+    # As autovacuum would, moves pending GIN entries into the index.
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT gin_clean_pending_list("
+                       "'article_title_words_idx')")
+        cursor.execute(f'ANALYZE {Article._meta.db_table}')
+
+    with CaptureQueriesContext(connection) as queries:
+        titles = autocomplete_titles(
+            Article.objects.filter(required_tier__lte=BASIC_TIER),
+            'river gar', 10
+        )
+    plans = {}
+    with connection.cursor() as cursor:
+        for query in queries:
+            cursor.execute(f'EXPLAIN {query["sql"]}')
+            plans[query['sql']] = '\n'.join(row[0]
+                                            for row in cursor.fetchall())
+    article_plans = [plan for sql, plan in plans.items()
+                     if '"writer_article"' in sql]
+
+    assert titles == [('Garden by the river', 'garden-by-the-river')]
+    assert 'article_title_prefix_idx' in article_plans[0]
+    assert 'article_title_words_idx' in article_plans[1]
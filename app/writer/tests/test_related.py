@@ -0,0 +1,136 @@
+"""
+Tests for related articles.
+Command: pytest writer/tests/test_related.py --cov=writer --cov-report term-missing:skip-covered
+"""
+
+import pytest
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+
+from writer.models import PREMIUM_TIER, RelatedArticle, RelatedArticlesModel
+from writer.related import TfidfModel, related_articles, tokenize
+
+pytestmark = pytest.mark.django_db
+
+TOPICS = {
+    'bread-baking': ('Baking bread', 'Flour yeast dough oven crust loaf'),
+    'sourdough': ('Sourdough loaf', 'Starter flour dough crust oven'),
+    'alpine-hikes': ('Alpine hikes', 'Mountain trail summit boots ridge'),
+    'mountain-trails': ('Mountain trails', 'Trail summit ridge boots map'),
+}
+
+
+@pytest.fixture
+def topics(user_writer, article):
+    return {
+        slug: article(user_writer, title=title, slug=slug, content=content)
+        for slug, (title, content) in TOPICS.items()
+    }
+
+
+def neighbour_slugs(a) -> list:
+    return list(RelatedArticle.objects.filter(article=a).order_by(
+        'rank'
+    ).values_list('related__slug', flat=True))
+
+
+def test_tokenize_weighs_title():
+    """Test title words count more and stop words are left out."""
+
+    counts = tokenize('The bread', 'bread and butter')
+
+    assert counts == {'bread': 4, 'butter': 1}
+
+
+def test_model_neighbours_by_cosine():
+    """Test nearest articles share terms, the article itself left out."""
+
+    model = TfidfModel.fit(
+        [(pk, title, content)
+         for pk, (title, content) in enumerate(TOPICS.values(), 1)],
+        min_df=1, max_df=1.0
+    )
+    neighbours = model.neighbours(model.article_ids, model.matrix, k=1)
+
+    assert [found[0][0] for found in neighbours] == [2, 1, 4, 3]
+    assert 0 < neighbours[0][0][1] <= 1
+
+    loaded = TfidfModel.loads(model.dumps())
+
+    assert loaded.terms == model.terms
+    assert (loaded.matrix != model.matrix).nnz == 0
+
+
+def test_build_related_articles_command(topics, settings, capsys):
+    """Test the command stores neighbours of every article in blocks."""
+
+    settings.RELATED_ARTICLES_STORED = 2
+
+    call_command('build_related_articles', block_size=3, min_df=1,
+                 max_df=1.0)
+
+    assert neighbour_slugs(topics['bread-baking'])[0] == 'sourdough'
+    assert neighbour_slugs(topics['alpine-hikes'])[0] == 'mountain-trails'
+    assert all(len(neighbour_slugs(a)) <= 2 for a in topics.values())
+    assert RelatedArticlesModel.objects.count() == 1
+    assert 'Built related articles of 4 articles' in capsys.readouterr().out
+
+
+def test_incremental_scores_new_articles(topics, user_writer, article):
+    """Test new articles get neighbours without a full build and join the
+    lists of their neighbours."""
+
+    call_command('build_related_articles', min_df=1, max_df=1.0)
+    new = article(user_writer, title='Rye bread', slug='rye-bread',
+                  content='Rye flour dough loaf crust')
+
+    call_command('build_related_articles', incremental=True)
+
+    assert neighbour_slugs(new)[0] in ('bread-baking', 'sourdough')
+    assert 'rye-bread' in neighbour_slugs(topics['sourdough'])
+    assert 'rye-bread' not in neighbour_slugs(topics['alpine-hikes'])
+
+
+def test_incremental_requires_full_build():
+    """Test incremental runs need a stored model."""
+
+    with pytest.raises(CommandError):
+        call_command('build_related_articles', incremental=True)
+
+
+def test_related_articles_respect_tier(topics, user_writer, article):
+    """Test only related articles covered by the tier are listed."""
+
+    topics['sourdough'].required_tier = PREMIUM_TIER
+    topics['sourdough'].save()
+    call_command('build_related_articles', min_df=1, max_df=1.0)
+
+    assert 'Sourdough loaf' not in [
+        a['title'] for a in related_articles(topics['bread-baking'], 1)
+    ]
+    assert related_articles(topics['bread-baking'], PREMIUM_TIER)[0] == {
+        'title': 'Sourdough loaf', 'slug': 'sourdough'
+    }
+    assert related_articles(topics['bread-baking'], None) == []
+
+
+def test_article_detail_shows_related(topics, client, sample_user,
+                                      subscription, standard):
+    """Test the detail page lists related articles with one query."""
+
+    call_command('build_related_articles', min_df=1, max_df=1.0)
+    subscription(user=sample_user, plan=standard)
+    client.force_login(sample_user)
+
+    with CaptureQueriesContext(connection) as queries:
+        r = client.get(reverse('client:article_detail',
+                               kwargs={'slug': 'bread-baking'}))
+
+    assert r.context['related_articles'][0]['slug'] == 'sourdough'
+    assert 'Related articles' in r.content.decode('utf-8')
+    assert len([q for q in queries
+                if '"writer_relatedarticle"' in q['sql']]) == 1
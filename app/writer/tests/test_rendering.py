@@ -0,0 +1,125 @@
+"""
+Tests for rendering article content to HTML.
+Command: pytest writer/tests/test_rendering.py --cov=writer --cov-report term-missing:skip-covered
+"""
+
+import pytest
+
+from unittest.mock import patch
+
+from django.core.management import call_command
+
+from writer.models import Article
+from writer.rendering import RENDERER_VERSION, render_content, render_range
+
+pytestmark = pytest.mark.django_db
+
+
+def test_render_content_markdown():
+    """Test Markdown is rendered to HTML."""
+
+    html = render_content('# Title\n\nSome *words* and [a link](https://a.io)')
+
+    assert '<h1>Title</h1>' in html
+    assert '<em>words</em>' in html
+    assert 'href="https://a.io"' in html
+    assert 'rel="nofollow noopener noreferrer"' in html
+
+
+@pytest.mark.parametrize('text', [
+    '<script>alert(1)</script>',
+    '<img src="x.png" onerror="alert(1)">',
+    '[click](javascript:alert(1))',
+])
+def test_render_content_sanitized(text):
+    """Test scripts, event handlers and script links are removed."""
+
+    html = render_content(text)
+
+    assert '<script' not in html
+    assert 'onerror' not in html
+    assert 'javascript:' not in html
+
+
+def test_article_rendered_on_save(user_writer, article):
+    """Test the stored HTML follows the content."""
+
+    a = article(user_writer, content='**Bold**')
+
+    assert a.content_html == '<p><strong>Bold</strong></p>'
+    assert a.content_renderer_version == RENDERER_VERSION
+
+    a.content = '_Italic_'
+    a.save(update_fields=['content'])
+    a.refresh_from_db()
+
+    assert a.content_html == '<p><em>Italic</em></p>'
+
+
+def test_article_not_rendered_again_when_content_unchanged(user_writer,
+                                                           article):
+    """Test saving other fields of a loaded article does not render it."""
+
+    a = article(user_writer, content='**Bold**')
+    a = Article.objects.get(pk=a.pk)
+
+    with patch('writer.rendering.render_content') as mock_render:
+        a.title = 'New title'
+        a.save()
+
+    mock_render.assert_not_called()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_render_articles_command(user_writer, article, capsys):
+    """Test the command renders articles of older renderer versions only."""
+
+    for i in range(5):
+        article(user_writer, title=f'Article {i}', slug=f'article-{i}',
+                content='*Rendered*')
+    Article.objects.exclude(slug='article-0').update(
+        content_html='', content_renderer_version=0
+    )
+    Article.objects.filter(slug='article-0').update(content_html='kept')
+
+    call_command('render_articles', processes=2, chunk_size=2)
+
+    assert set(Article.objects.values_list('content_html', flat=True)) == {
+        'kept', '<p><em>Rendered</em></p>'
+    }
+    assert 'Rendered 4 articles' in capsys.readouterr().out
+
+    call_command('render_articles', all=True)
+
+    assert set(Article.objects.values_list('content_html', flat=True)) == {
+        '<p><em>Rendered</em></p>'
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_render_range_skips_articles_edited_meanwhile(user_writer, article):
+    """Test an article whose content changes while it is rendered keeps the
+    HTML of its save."""
+
+    a = article(user_writer, content='*Old*')
+    Article.objects.update(content_renderer_version=0)
+
+    def edit_and_render(text):
+        Article.objects.filter(pk=a.pk).update(content='*New*',
+                                               content_html='saved')
+        return render_content(text)
+
+    with patch('writer.rendering.render_content',
+               side_effect=edit_and_render):
+        assert render_range(a.pk, a.pk) == 0
+
+    a.refresh_from_db()
+    assert a.content_html == 'saved'
+
+
+def test_render_articles_command_nothing_to_render(capsys):
+    """Test the command reports when all articles are rendered."""
+
+    call_command('render_articles')
+
+    assert 'No articles to render.' in capsys.readouterr().out
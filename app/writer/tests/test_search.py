@@ -0,0 +1,80 @@
+"""
+Tests for full-text search over articles.
+Command: pytest writer/tests/test_search.py --cov=writer --cov-report term-missing:skip-covered
+"""
+
+import pytest
+
+from django.core.management import call_command
+
+from writer.models import Article, TitleWord
+from writer.search import search_articles
+
+pytestmark = pytest.mark.django_db
+
+
+def titles(queryset) -> list:
+    return [a.title for a in queryset]
+
+
+def test_search_vector_kept_current_on_save(user_writer, article):
+    """Test an article is found by its new words once saved."""
+
+    a = article(user_writer, title='Gardening', content='Tomatoes and basil')
+
+    assert titles(search_articles(Article.objects.all(), 'tomato')) == [
+        'Gardening'
+    ]
+
+    a.content = 'Cucumbers and dill'
+    a.save(update_fields=['content'])
+
+    assert not search_articles(Article.objects.all(), 'tomato').exists()
+    assert search_articles(Article.objects.all(), 'cucumbers').exists()
+
+
+def test_search_ranks_title_over_content(user_writer, article):
+    """Test a match in the title outranks a match in the content."""
+
+    article(user_writer, title='Notes', content='All about the violin')
+    article(user_writer, title='Violin', content='Some notes')
+
+    result = search_articles(Article.objects.all(), 'violin')
+
+    assert titles(result) == ['Violin', 'Notes']
+    assert result[0].rank > result[1].rank
+
+
+def test_search_websearch_syntax(user_writer, article):
+    """Test queries accept quotes and exclusions like a search engine."""
+
+    article(user_writer, title='Baking bread', content='Sourdough starter')
+    article(user_writer, title='Baking cakes', content='Sugar and butter')
+
+    result = search_articles(Article.objects.all(), 'baking -bread')
+
+    assert titles(result) == ['Baking cakes']
+
+
+def test_rebuild_search_index_command(user_writer, article, capsys):
+    """Test the command rebuilds title words from current titles."""
+
+    for i in range(5):
+        article(user_writer, title=f'Lighthouse {i}', slug=f'lighthouse-{i}')
+    TitleWord.objects.create(word='GONE')
+
+    call_command('rebuild_search_index')
+
+    assert set(TitleWord.objects.values_list('word', flat=True)) == {
+        'LIGHTHOUSE', '0', '1', '2', '3', '4'
+    }
+    assert 'Indexed 6 title words.' in capsys.readouterr().out
+
+
+def test_search_vector_generated_by_bulk_writes(user_writer, article):
+    """Test articles written without Article.save are found too."""
+
+    a = article(user_writer, title='Gardening', content='Tomatoes')
+    Article.objects.filter(pk=a.pk).update(content='Cucumbers and dill')
+
+    assert search_articles(Article.objects.all(), 'cucumbers').exists()
@@ -0,0 +1,161 @@
+"""
+Tests for article view counting.
+Command: pytest writer/tests/test_view_counts.py --cov=writer --cov-report term-missing:skip-covered
+"""
+
+import time
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from django.core.management import call_command
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+
+from writer.models import (Article, ArticleDailyViews, ArticleHourlyViews,
+                           ArticleView)
+from writer.view_counts import ViewBuffer, view_buffer
+
+pytestmark = pytest.mark.django_db
+
+
+def test_view_buffer_flush(user_writer, article):
+    """Test views are saved on flush only."""
+
+    a = article(user_writer)
+    buffer = ViewBuffer(flush_interval=0, flush_size=10)
+
+    for _ in range(3):
+        buffer.record(a.pk)
+
+    assert not ArticleView.objects.exists()
+    assert buffer.flush() == 3
+    assert ArticleView.objects.filter(article=a).count() == 3
+    assert buffer.stats() == {'recorded': 3, 'flushed': 3, 'flushes': 1,
+                              'dropped': 0, 'pending': 0}
+
+
+def test_view_buffer_flushed_at_size(user_writer, article):
+    """Test reaching the flush size saves the buffered views."""
+
+    a = article(user_writer)
+    buffer = ViewBuffer(flush_interval=0, flush_size=2)
+
+    buffer.record(a.pk)
+    buffer.record(a.pk)
+
+    assert ArticleView.objects.count() == 2
+    assert buffer.stats()['pending'] == 0
+
+
+def test_view_buffer_drops_views_when_full(user_writer, article):
+    """Test a full buffer drops new views instead of growing."""
+
+    a = article(user_writer)
+    buffer = ViewBuffer(flush_interval=0, flush_size=10, max_size=2)
+
+    for _ in range(3):
+        buffer.record(a.pk)
+
+    assert buffer.stats()['pending'] == 2
+    assert buffer.stats()['dropped'] == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_view_buffer_flushed_by_thread(user_writer, article):
+    """Test the flushing thread saves views without an explicit flush."""
+
+    a = article(user_writer)
+    buffer = ViewBuffer(flush_interval=0.05, flush_size=10)
+
+    buffer.record(a.pk)
+
+    deadline = time.monotonic() + 5
+    while not ArticleView.objects.exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert ArticleView.objects.filter(article=a).count() == 1
+
+
+def test_article_detail_records_view_without_write(
+        client, sample_user, user_writer, article, subscription, standard
+):
+    """Test detail pages buffer a view and leave the database alone."""
+
+    a = article(user_writer)
+    subscription(user=sample_user, plan=standard)
+    client.force_login(sample_user)
+    recorded = view_buffer.recorded
+
+    with CaptureQueriesContext(connection) as queries:
+        client.get(reverse('client:article_detail', kwargs={'slug': a.slug}))
+
+    assert view_buffer.recorded == recorded + 1
+    assert not any('writer_articleview' in q['sql'] for q in queries)
+
+    client.force_login(user_writer)
+    client.get(reverse('client:article_detail', kwargs={'slug': a.slug}))
+
+    assert view_buffer.recorded == recorded + 1
+
+
+def test_rollup_article_views_command(user_writer, article, capsys):
+    """Test raw views are moved into hourly and daily counts."""
+
+    a = article(user_writer, title='Counted', slug='counted')
+    gone = article(user_writer, title='Deleted', slug='deleted')
+    day = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    ArticleView.objects.bulk_create(
+        [ArticleView(article=a, viewed_at=day + timedelta(minutes=10))] * 2 +
+        [ArticleView(article=a, viewed_at=day + timedelta(hours=5))] +
+        [ArticleView(article=gone, viewed_at=day)]
+    )
+    gone.delete()
+
+    call_command('rollup_article_views', batch_size=2, keep_hourly_days=10000)
+
+    assert not ArticleView.objects.exists()
+    assert dict(ArticleHourlyViews.objects.values_list('hour', 'views')) == {
+        day: 2, day + timedelta(hours=5): 1
+    }
+    assert list(ArticleDailyViews.objects.values_list('day', 'views')) == [
+        (day.date(), 3)
+    ]
+
+    ArticleView.objects.create(article=a, viewed_at=day)
+    call_command('rollup_article_views')
+
+    assert ArticleDailyViews.objects.get().views == 4
+    assert not ArticleHourlyViews.objects.exists()
+    assert 'pruned 2 hourly counts' in capsys.readouterr().out
+
+
+def test_writer_dashboard_shows_views(client, user_writer, article):
+    """Test the dashboard lists views per article with one query."""
+
+    a = article(user_writer, title='Popular', slug='popular')
+    article(user_writer, title='Quiet', slug='quiet')
+    now = datetime.now(timezone.utc)
+    ArticleDailyViews.objects.create(article=a, day=now.date(), views=7)
+    ArticleDailyViews.objects.create(article=a, day=(now - timedelta(days=3))
+                                     .date(), views=5)
+    ArticleHourlyViews.objects.create(
+        article=a, hour=now.replace(minute=0, second=0, microsecond=0),
+        views=7
+    )
+    client.force_login(user_writer)
+
+    with CaptureQueriesContext(connection) as queries:
+        r = client.get(reverse('writer:dashboard',
+                               kwargs={'writer_id': user_writer.id}))
+
+    articles = list(r.context['articles'])
+    article_queries = [q for q in queries
+                       if Article._meta.db_table in q['sql']]
+
+    assert [(x.title, x.recent_views, x.views) for x in articles] == [
+        ('Popular', 7, 12), ('Quiet', 0, 0)
+    ]
+    assert len(article_queries) == 1
@@ -3,12 +3,21 @@ Tests for writer app models.
 Command: pytest writer/tests/test_writer_models.py --cov=writer --cov-report term-missing:skip-covered
 """
 
+import importlib
+
+from io import StringIO
+
 import pytest
 
+from unittest.mock import patch
+
+from django.apps import apps as django_apps
+from django.core.management import call_command
+from django.db import DatabaseError, connection
 from django.utils.text import slugify
 from django.db.utils import IntegrityError
 
-from writer.models import Article
+from writer.models import BASIC_TIER, PREMIUM_TIER, Article
 
 pytestmark = pytest.mark.django_db
 
@@ -76,3 +85,152 @@ def test_create_article_with_custom_slug_success(user_writer):
     article = Article.objects.create(**data)
     assert article.title == data['title']
     assert article.slug == data['slug']
+
+
+def test_article_text_stats_on_save(user_writer):
+    """Test excerpt, word count and reading time follow the content."""
+
+    article = Article.objects.create(title='Test title', content='word ' * 450,
+                                     author=user_writer)
+
+    assert article.excerpt == ('word ' * 30)
+    assert article.word_count == 450
+    assert article.reading_time == 3
+
+    article.content = 'Short content'
+    article.save(update_fields=['content'])
+    article.refresh_from_db()
+
+    assert article.excerpt == 'Short content'
+    assert article.word_count == 2
+    assert article.reading_time == 1
+
+
+def test_article_text_stats_kept_when_content_deferred(user_writer):
+    """Test saving an article loaded without content keeps its stats."""
+
+    Article.objects.create(title='Test title', content='Some content',
+                           author=user_writer)
+
+    article = Article.objects.defer('content').get()
+    article.required_tier = PREMIUM_TIER
+    article.save()
+    article.refresh_from_db()
+
+    assert article.word_count == 2
+    assert article.excerpt == 'Some content'
+
+
+def test_backfill_article_text_stats(user_writer, article):
+    """Test data migration fills stats of existing articles in batches."""
+
+    migration = importlib.import_module(
+        'writer.migrations.0004_backfill_article_text_stats'
+    )
+    for i in range(3):
+        article(user_writer, title=f'Article {i}', content='one two three')
+    Article.objects.update(excerpt='', word_count=0, reading_time=0)
+
+    with patch.object(migration, 'BATCH_SIZE', 2):
+        migration.backfill_text_stats(django_apps, None)
+
+    assert set(Article.objects.values_list(
+        'excerpt', 'word_count', 'reading_time'
+    )) == {('one two three', 3, 1)}
+
+
+def test_article_premium_flag_mirrors_tier(user_writer):
+    """Test the deprecated premium flag follows the required tier."""
+
+    article = Article.objects.create(title='Test title', author=user_writer)
+
+    assert article.is_premium is False
+
+    article.required_tier = PREMIUM_TIER
+    article.save(update_fields=['required_tier'])
+    article.refresh_from_db()
+
+    assert article.is_premium is True
+    assert article.is_premium_tier is True
+
+
+def test_backfill_article_required_tier(user_writer, article):
+    """Test data migration carries premium flags over to tiers in batches."""
+
+    migration = importlib.import_module(
+        'writer.migrations.0008_backfill_article_required_tier'
+    )
+    for i in range(3):
+        article(user_writer, title=f'Premium {i}', slug=f'premium-{i}')
+    article(user_writer, title='Free', slug='free')
+    Article.objects.update(required_tier=BASIC_TIER)
+    Article.objects.exclude(slug='free').update(is_premium=True)
+
+    with patch.object(migration, 'BATCH_SIZE', 2):
+        migration.backfill_required_tier(django_apps, None)
+
+    assert dict(Article.objects.values_list('slug', 'required_tier')) == {
+        'premium-0': PREMIUM_TIER,
+        'premium-1': PREMIUM_TIER,
+        'premium-2': PREMIUM_TIER,
+        'free': BASIC_TIER,
+    }
+
+
+def test_sync_required_tier_command(user_writer, article):
+    """Test articles flagged by the previous release after the backfill
+    get the matching tier, in batches."""
+
+    for i in range(3):
+        article(user_writer, title=f'Premium {i}', slug=f'premium-{i}')
+    article(user_writer, title='Free', slug='free')
+    article(user_writer, title='Unflagged', slug='unflagged',
+            required_tier=PREMIUM_TIER)
+    Article.objects.filter(slug__startswith='premium').update(is_premium=True)
+    Article.objects.filter(slug='unflagged').update(is_premium=False)
+    out = StringIO()
+
+    call_command('sync_required_tier', batch_size=2, stdout=out)
+
+    assert dict(Article.objects.values_list('slug', 'required_tier')) == {
+        'premium-0': PREMIUM_TIER,
+        'premium-1': PREMIUM_TIER,
+        'premium-2': PREMIUM_TIER,
+        'unflagged': BASIC_TIER,
+        'free': BASIC_TIER,
+    }
+    assert 'Synced the required tier of 4 articles.' in out.getvalue()
+
+
+def test_article_inserted_without_tier_is_basic(user_writer, article):
+    """Test articles inserted by the previous release, which does not know
+    the required_tier column, get the basic tier from the database."""
+
+    a = article(user_writer, required_tier=PREMIUM_TIER)
+    columns = ', '.join(
+        field.column for field in Article._meta.concrete_fields
+        if field.name not in ('id', 'slug', 'required_tier') and
+        not field.generated
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO writer_article (slug, {columns}) '
+            f'SELECT %s, {columns} FROM writer_article WHERE id = %s',
+            ['old-release', a.pk]
+        )
+
+    assert Article.objects.get(slug='old-release').required_tier == (
+        BASIC_TIER
+    )
+
+
+def test_article_save_rolls_back_with_follow_up_writes(user_writer):
+    """Test an article is not saved without its buckets and title words."""
+
+    with patch('writer.models.add_title_words', side_effect=DatabaseError):
+        with pytest.raises(DatabaseError):
+            Article.objects.create(title='Lighthouse', content='Keeper',
+                                   author=user_writer)
+
+    assert not Article.objects.exists()
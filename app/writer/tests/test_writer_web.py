@@ -79,7 +79,7 @@ def test_create_article_form_fields_correct(client, user_writer):
     assert 'for="id_title"' in page_body
     assert 'for="id_slug"' in page_body
     assert 'for="id_content"' in page_body
-    assert 'type="checkbox"' in page_body
+    assert 'for="id_required_tier"' in page_body
     assert 'type="submit"' in page_body
 
 
@@ -177,6 +177,24 @@ def test_my_articles_get_only_logged_user_articles(client, user, article):
     assert len(r.context['articles']) == 2
 
 
+def test_my_articles_paginated(client, user_writer, article, settings):
+    settings.ARTICLES_PAGE_SIZE = 1
+    article(user_writer, title='Article 1')
+    article(user_writer, title='Article 2')
+    url = reverse('writer:my_articles', kwargs={'writer_id': user_writer.id})
+
+    client.force_login(user_writer)
+    r = client.get(url)
+    next_cursor = r.context['page'].next_cursor
+
+    assert [a.title for a in r.context['articles']] == ['Article 2']
+
+    r = client.get(url, {'cursor': next_cursor})
+
+    assert [a.title for a in r.context['articles']] == ['Article 1']
+    assert r.context['page'].has_previous is True
+
+
 def test_update_article_has_form_with_content(client, user_writer, article):
     a = article(user_writer)
     client.force_login(user_writer)
@@ -269,3 +287,53 @@ def test_delete_article_that_does_not_exist(client, user_writer):
     assert len(messages_received) == 1
     assert messages_received[0].level == 20
     assert messages_received[0].message == 'Article not found.'
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'ndjson'])
+def test_export_my_articles(client, user_writer, user, article,
+                            export_format):
+    """Test the export streams the articles of the writer only."""
+
+    article(user_writer, title='Mine', slug='mine')
+    article(user(email='other@example.com', is_writer=True),
+            title='Theirs', slug='theirs')
+    client.force_login(user_writer)
+
+    r = client.get(reverse('writer:export_articles',
+                           kwargs={'writer_id': user_writer.id}),
+                   {'format': export_format})
+    content = b''.join(r.streaming_content).decode()
+
+    assert r.status_code == 200
+    assert r['Content-Disposition'] == (f'attachment; '
+                                        f'filename="articles.{export_format}"')
+    assert 'Mine' in content
+    assert 'Theirs' not in content
+
+
+def test_export_my_articles_unknown_format(client, user_writer):
+    """Test an unknown export format is not found."""
+
+    client.force_login(user_writer)
+    r = client.get(reverse('writer:export_articles',
+                           kwargs={'writer_id': user_writer.id}),
+                   {'format': 'xml'})
+
+    assert r.status_code == 404
+
+
+def test_export_my_articles_of_writer_only(client, user_writer, sample_user):
+    """Test clients and other writers cannot export the articles."""
+
+    client.force_login(sample_user)
+    r = client.get(reverse('writer:export_articles',
+                           kwargs={'writer_id': sample_user.id}))
+
+    assert r.status_code == 302
+    assert r.url == reverse('client:dashboard')
+
+    client.force_login(user_writer)
+    r = client.get(reverse('writer:export_articles',
+                           kwargs={'writer_id': sample_user.id}))
+
+    assert r.status_code == 404
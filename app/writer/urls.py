@@ -20,6 +20,11 @@ urlpatterns = [
         views.MyArticlesView.as_view(),
         name='my_articles'
     ),
+    path(
+        '<int:writer_id>/export-articles/',
+        views.export_my_articles,
+        name='export_articles'
+    ),
     path(
         '<int:writer_id>/update-article/<slug:slug>/',
         views.UpdateArticleView.as_view(),
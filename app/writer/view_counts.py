@@ -0,0 +1,226 @@
+"""
+Article view counting.
+
+Detail page hits are recorded into a per-process buffer (`view_buffer`)
+and copied to the raw ArticleView table in batches by a background thread,
+with COPY, so that no request waits for a write. The
+`rollup_article_views` command folds raw views into hourly and daily
+per-article counts, which the writer dashboard reads.
+
+Views still buffered when a process is killed are lost; a graceful exit
+flushes them.
+"""
+
+import atexit
+import io
+import logging
+import threading
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection
+from django.db.models import IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from writer.models import (Article, ArticleDailyViews, ArticleHourlyViews,
+                           ArticleView)
+
+logger = logging.getLogger(__name__)
+
+
+class ViewBuffer:
+    """Keep recorded views in memory until the next flush.
+
+    The flushing thread wakes every `flush_interval` seconds
+    (VIEW_BUFFER_FLUSH_INTERVAL by default), or as soon as `flush_size`
+    views are buffered; without an interval, the request reaching
+    `flush_size` flushes. Beyond `max_size` views, new ones are dropped.
+    """
+
+    def __init__(self, flush_interval: float | None = None,
+                 flush_size: int | None = None, max_size: int | None = None):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_size = max_size
+
+        self.recorded = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.dropped = 0
+
+        self._views = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def record(self, article_id: int):
+        max_size = (self.max_size if self.max_size is not None
+                    else settings.VIEW_BUFFER_MAX_SIZE)
+        flush_size = (self.flush_size if self.flush_size is not None
+                      else settings.VIEW_BUFFER_FLUSH_SIZE)
+
+        with self._lock:
+            if len(self._views) >= max_size:
+                is_full = True
+            else:
+                is_full = False
+                self._views.append((article_id, timezone.now()))
+                pending = len(self._views)
+
+        if is_full:
+            self._count('dropped')
+            return
+
+        self._count('recorded')
+
+        if self.interval():
+            self._ensure_thread()
+            if pending >= flush_size:
+                self._wake.set()
+        elif pending >= flush_size:
+            self.flush()
+
+    def flush(self) -> int:
+        """Copy buffered views to the database; return their number."""
+
+        with self._lock:
+            views, self._views = self._views, []
+
+        if not views:
+            return 0
+
+        try:
+            copy_views(views)
+        except DatabaseError:
+            logger.exception('Failed to save %s article views', len(views))
+            self._count('dropped', len(views))
+            return 0
+
+        self._count('flushed', len(views))
+        self._count('flushes')
+        return len(views)
+
+    def clear(self):
+        with self._lock:
+            self._views = []
+
+    def interval(self) -> float:
+        return (self.flush_interval if self.flush_interval is not None
+                else settings.VIEW_BUFFER_FLUSH_INTERVAL)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._views)
+
+        return {
+            'recorded': self.recorded,
+            'flushed': self.flushed,
+            'flushes': self.flushes,
+            'dropped': self.dropped,
+            'pending': pending,
+        }
+
+    def _ensure_thread(self):
+        # Also restarts the thread in a process forked from one running it.
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name='article-view-buffer',
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval())
+            self._wake.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+
+def copy_views(views: list[tuple]):
+    """Insert (article_id, viewed_at) rows with one COPY."""
+
+    data = io.StringIO(''.join(
+        f'{article_id}\t{viewed_at.isoformat()}\n'
+        for article_id, viewed_at in views
+    ))
+
+    with connection.cursor() as cursor:
+        cursor.copy_from(data, ArticleView._meta.db_table,
+                         columns=('article_id', 'viewed_at'))
+
+
+ROLLUP_SQL = """
+WITH moved AS (
+    DELETE FROM {raw} WHERE id > %(after_id)s AND id <= %(last_id)s
+    RETURNING article_id, viewed_at
+), counted AS (
+    SELECT moved.article_id, date_trunc('hour', moved.viewed_at) AS hour,
+           count(*) AS views
+    FROM moved JOIN {article} ON {article}.id = moved.article_id
+    GROUP BY 1, 2
+), hourly AS (
+    INSERT INTO {hourly} AS h (article_id, hour, views)
+    SELECT article_id, hour, views FROM counted
+    ON CONFLICT (article_id, hour) DO UPDATE SET views = h.views + excluded.views
+)
+INSERT INTO {daily} AS d (article_id, day, views)
+SELECT article_id, hour::date, sum(views) FROM counted GROUP BY 1, 2
+ON CONFLICT (article_id, day) DO UPDATE SET views = d.views + excluded.views
+"""
+
+
+def rollup_views(after_id: int, last_id: int):
+    """Move raw views with id in (after_id, last_id] into the hourly and
+    daily counts, in one statement.
+
+    Views of deleted articles are dropped.
+    """
+
+    sql = ROLLUP_SQL.format(
+        raw=ArticleView._meta.db_table,
+        article=Article._meta.db_table,
+        hourly=ArticleHourlyViews._meta.db_table,
+        daily=ArticleDailyViews._meta.db_table,
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {'after_id': after_id, 'last_id': last_id})
+
+
+def with_view_counts(queryset, recent_hours: int = 24):
+    """Annotate articles with `views`, all views counted so far, and
+    `recent_views`, those of the last `recent_hours` hours."""
+
+    since = timezone.now() - timedelta(hours=recent_hours)
+
+    def total(model, **filters):
+        return Coalesce(Subquery(
+            model.objects.filter(
+                article=OuterRef('pk'), **filters
+            ).values('article').annotate(total=Sum('views')).values('total'),
+            output_field=IntegerField()
+        ), 0)
+
+    return queryset.annotate(
+        views=total(ArticleDailyViews),
+        recent_views=total(ArticleHourlyViews, hour__gte=since),
+    )
+
+
+view_buffer = ViewBuffer()
+atexit.register(view_buffer.flush)
@@ -5,12 +5,29 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 
+from django.http import Http404
 from django.utils.decorators import method_decorator
 
 from django.shortcuts import redirect, reverse, render, get_object_or_404
 
+from core.exports import STREAMS, export_response
+from core.pagination import KeysetPaginationMixin
+from writer.exports import export_articles
 from writer.forms import ArticleForm
 from writer.models import Article
+from writer.view_counts import with_view_counts
+
+
+def warn_duplicate(request, article):
+    """Tell the writer when the saved article looks like a copy of another
+    one, see writer.duplicates."""
+
+    if article.duplicate_of is not None:
+        messages.warning(
+            request,
+            f'This article is {article.duplicate_similarity:.0%} alike '
+            f'"{article.duplicate_of.title}". Please avoid reposting articles.'
+        )
 
 
 class WriterDashboardView(TemplateView):
@@ -34,6 +51,11 @@ class WriterDashboardView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Edenthought | Writer Dashboard'
+        context['articles'] = with_view_counts(
+            Article.objects.filter(author=self.request.user).only(
+                'title', 'slug', 'date_posted'
+            )
+        ).order_by('-views', '-date_posted', '-id')
         return context
 
 
@@ -60,6 +82,7 @@ class CreateArticleView(LoginRequiredMixin, View):
             article.author = user
             article.save()
             messages.success(request, 'Article created successfully!')
+            warn_duplicate(request, article)
             return redirect(reverse('writer:my_articles', kwargs={'writer_id': writer_id}))
 
         messages.error(request, 'Something went wrong!')
@@ -70,7 +93,7 @@ class CreateArticleView(LoginRequiredMixin, View):
         )
 
 
-class MyArticlesView(LoginRequiredMixin, ListView):
+class MyArticlesView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     login_url = 'login'
     redirect_field_name = 'redirect_to'
     model = Article
@@ -91,7 +114,29 @@ class MyArticlesView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         return (super().get_queryset().filter(author=self.request.user)
-                .order_by('-date_posted'))
+                .defer('content', 'search_vector'))
+
+
+@login_required(redirect_field_name='redirect_to', login_url='login')
+def export_my_articles(request, writer_id):
+    """Stream the articles of the writer as CSV, or NDJSON with
+    ?format=ndjson."""
+
+    if not request.user.is_writer:  # noqa
+        return redirect('client:dashboard')
+
+    if writer_id != request.user.id:
+        raise Http404('Articles of another writer.')
+
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in STREAMS:
+        raise Http404('Unknown export format.')
+
+    return export_response(
+        export_articles(request.user, export_format),
+        f'articles.{export_format}',
+        export_format
+    )
 
 
 class UpdateArticleView(LoginRequiredMixin, View):
@@ -115,8 +160,9 @@ class UpdateArticleView(LoginRequiredMixin, View):
         form = ArticleForm(request.POST, instance=article)
 
         if form.is_valid():
-            form.save()
+            article = form.save()
             messages.success(request, 'Article updated successfully!')
+            warn_duplicate(request, article)
             return redirect(reverse('writer:my_articles',
                                     kwargs={'writer_id': self.request.user.id}))
 